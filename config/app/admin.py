@@ -1,7 +1,144 @@
-from django.contrib import admin
-from .models import UserDetails,Issue, SiteNotification
-admin.site.register(Issue)
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.auth.password_validation import validate_password
+from django.core.handlers.asgi import ASGIRequest
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from . import auth, transfer
+from .models import UserDetails, Issue, Solution, SiteNotification, BackgroundJob, GenerationCall, ChatSession, ChatTurn
+
 admin.site.register(SiteNotification)
 
-# Register your models here.
-admin.site.register(UserDetails)
\ No newline at end of file
+
+class TransferAdmin(admin.ModelAdmin):
+    """Streaming CSV / JSON Lines export actions and an import page (app/transfer.py)."""
+
+    dataset = None
+    change_list_template = 'admin/app/change_list_transfer.html'
+    actions = ['export_csv', 'export_jsonl']
+
+    def _export(self, request, queryset, fmt):
+        return transfer.export_response(self.dataset, fmt, queryset, asynchronous=isinstance(request, ASGIRequest))
+
+    @admin.action(description="Export selected as CSV")
+    def export_csv(self, request, queryset):
+        return self._export(request, queryset, 'csv')
+
+    @admin.action(description="Export selected as JSON Lines")
+    def export_jsonl(self, request, queryset):
+        return self._export(request, queryset, 'jsonl')
+
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view),
+                 name=f'{opts.app_label}_{opts.model_name}_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            return redirect('admin:index')
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f"Import {self.model._meta.verbose_name_plural}",
+            'columns': [column for column, _ in transfer.EXPORT_COLUMNS[self.dataset]],
+        }
+        upload = request.FILES.get('file') if request.method == 'POST' else None
+        if upload is not None:
+            fmt = 'jsonl' if upload.name.endswith('.jsonl') else 'csv'
+            dry_run = bool(request.POST.get('dry_run'))
+            result = transfer.import_rows(self.dataset, transfer.read_rows(transfer.open_text(upload.file), fmt),
+                                          dry_run=dry_run)
+            if result.committed:
+                self.message_user(request, f"Imported {result.created} {self.dataset}.", messages.SUCCESS)
+                return redirect(f'admin:{self.model._meta.app_label}_{self.model._meta.model_name}_changelist')
+            if not result.error_count:
+                self.message_user(request, f"{result.rows} row(s) valid (dry run, nothing imported).", messages.INFO)
+            context['result'] = result
+        return TemplateResponse(request, 'admin/app/import_form.html', context)
+
+
+class ResidentAdminForm(forms.ModelForm):
+    """The stored hash is never shown; a new password is hashed through app/auth.py."""
+
+    new_password = forms.CharField(
+        required=False, strip=False, widget=forms.PasswordInput,
+        help_text="Leave blank to keep the current password. A resident added without one "
+                  "cannot log in until a password is set here.",
+    )
+
+    class Meta:
+        model = UserDetails
+        exclude = ('password',)
+
+    def clean_new_password(self):
+        password = self.cleaned_data['new_password']
+        if password:
+            validate_password(password)
+        return password
+
+    def save(self, commit=True):
+        resident = super().save(commit=False)
+        if self.cleaned_data['new_password']:
+            auth.set_password(resident, self.cleaned_data['new_password'])
+        elif not resident.password:
+            auth.set_password(resident, None)  # Unusable, as for imported residents without one
+        if commit:
+            resident.save()
+        return resident
+
+
+@admin.register(UserDetails)
+class UserDetailsAdmin(TransferAdmin):
+    dataset = 'residents'
+    form = ResidentAdminForm
+    list_display = ('email', 'full_name', 'flat_number', 'role')
+    search_fields = ('email', 'full_name', 'flat_number')
+
+
+@admin.register(Issue)
+class IssueAdmin(TransferAdmin):
+    dataset = 'issues'
+    list_display = ('id', 'title', 'status', 'reported_date', 'reported_by_id')
+    list_filter = ('status',)
+    list_select_related = ('reported_by_id',)
+
+
+@admin.register(Solution)
+class SolutionAdmin(TransferAdmin):
+    dataset = 'solutions'
+    list_display = ('id', 'title', 'issue', 'status', 'upvotes', 'downvotes', 'is_ai')
+    list_filter = ('status', 'is_ai')
+    list_select_related = ('issue',)
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'issue', 'status', 'attempts', 'run_after', 'last_error')
+    list_filter = ('kind', 'status')
+
+
+@admin.register(GenerationCall)
+class GenerationCallAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'model', 'issues', 'solutions', 'rejected',
+                    'prompt_tokens', 'completion_tokens', 'latency_ms', 'error')
+    list_filter = ('model', 'prompt_version')
+    date_hierarchy = 'created_at'
+
+
+class ChatTurnInline(admin.TabularInline):
+    model = ChatTurn
+    fields = ('created_at', 'role', 'content', 'tokens')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+
+@admin.register(ChatSession)
+class ChatSessionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'created_at', 'updated_at', 'summary_tokens')
+    readonly_fields = ('summarized_through',)
+    inlines = [ChatTurnInline]
@@ -0,0 +1,205 @@
+"""
+Building-wide metrics for managers, computed in the database.
+
+  * time to resolution: resolved_at - reported_date, mean overall and per week
+  * issues per flat, ranked with a window function
+  * AI vs. human solutions: how many are proposed and accepted, and AI
+    acceptance by confidence band
+  * weekly trends: reported, resolved, a 4-week moving average and the
+    open backlog (running totals, window functions over the weekly rows)
+
+Weekly figures come from WeeklyIssueStats rollups. refresh() only
+recomputes weeks from the latest rollup week or the earliest dirty week,
+whichever comes first. An Issue save marks its reported week dirty
+(app/signals.py); resolution always falls on or after that week. So the
+cost of a refresh follows recent activity, not the length of the history.
+
+summary() is cached for ANALYTICS_CACHE_SECONDS through app/fragments.py.
+`manage.py refresh_analytics` refreshes the rollups (run it from cron after
+imports or edits to old issues) and drops the cached summary.
+"""
+from datetime import datetime, time as dt_time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Avg, Case, Count, DateField, DateTimeField, DurationField, ExpressionWrapper, F, FloatField,
+    Max, Min, Q, RowRange, Sum, Value, When, Window,
+)
+from django.db.models.functions import Cast, Floor, Least, Rank, TruncWeek
+from django.utils import timezone
+
+from . import fragments
+from .models import Issue, Solution, UserDetails, WeeklyIssueStats
+
+MAX_WEEKS = 520
+CONFIDENCE_BANDS = 5  # Confidence is a percentage: 0-20, 20-40, ...
+
+RESOLUTION_TIME = ExpressionWrapper(
+    F('resolved_at') - Cast('reported_date', DateTimeField()), output_field=DurationField(),
+)
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def mark_dirty(reported_date):
+    """Have the next refresh() recompute from the week of `reported_date`."""
+    week = week_start(reported_date)
+    if week >= week_start(timezone.localdate()):
+        return  # The current week is recomputed on every refresh anyway
+    now = timezone.now()
+    if not WeeklyIssueStats.objects.filter(week=week).update(dirty_at=now):
+        # Week before the rollups start (or never computed): add it as dirty
+        WeeklyIssueStats.objects.bulk_create(
+            [WeeklyIssueStats(week=week, computed_at=now - timedelta(seconds=1), dirty_at=now)],
+            ignore_conflicts=True,
+        )
+
+
+def refresh(full=False):
+    """Recompute the weekly rollups that may have changed. Returns the number of weeks written."""
+    started = timezone.now()
+    since = None
+    if not full:
+        bounds = WeeklyIssueStats.objects.aggregate(
+            last=Max('week'), dirty=Min('week', filter=Q(dirty_at__gt=F('computed_at'))),
+        )
+        candidates = [week for week in (bounds['last'], bounds['dirty']) if week is not None]
+        since = min(candidates) if candidates else None
+
+    reported = Issue.objects.all()
+    resolved = Issue.objects.filter(resolved_at__isnull=False)
+    if since is not None:
+        reported = reported.filter(reported_date__gte=since)
+        resolved = resolved.filter(
+            resolved_at__gte=timezone.make_aware(datetime.combine(since, dt_time.min)))
+    weeks = {}
+    for row in reported.annotate(week=TruncWeek('reported_date')).values('week').annotate(n=Count('id')):
+        weeks.setdefault(row['week'], {})['reported'] = row['n']
+    rows = (resolved.annotate(week=TruncWeek('resolved_at', output_field=DateField()))
+            .values('week').annotate(n=Count('id'), seconds=Sum(RESOLUTION_TIME)))
+    for row in rows:
+        entry = weeks.setdefault(row['week'], {})
+        entry['resolved'] = row['n']
+        entry['resolution_seconds'] = int(row['seconds'].total_seconds()) if row['seconds'] else 0
+
+    first = since if since is not None else min(weeks, default=None)
+    if first is None:
+        return 0
+    # Every week in the range gets a row, zeros included, so the trend has no gaps
+    objects = []
+    week, last = first, week_start(timezone.localdate())
+    while week <= last:
+        entry = weeks.get(week, {})
+        objects.append(WeeklyIssueStats(
+            week=week, reported=entry.get('reported', 0), resolved=entry.get('resolved', 0),
+            resolution_seconds=entry.get('resolution_seconds', 0), computed_at=started,
+        ))
+        week += timedelta(days=7)
+    with transaction.atomic():
+        if full:
+            WeeklyIssueStats.objects.exclude(week__in=[o.week for o in objects]).delete()
+        # dirty_at is left alone: a mark made after `started` keeps its week dirty
+        WeeklyIssueStats.objects.bulk_create(
+            objects, batch_size=500, update_conflicts=True, unique_fields=['week'],
+            update_fields=['reported', 'resolved', 'resolution_seconds', 'computed_at'],
+        )
+    return len(objects)
+
+
+def _days(seconds, count):
+    return round(seconds / count / 86400, 2) if count else None
+
+
+def weekly_trend(weeks):
+    """The last `weeks` weeks, with running totals computed over the whole history."""
+    rows = WeeklyIssueStats.objects.annotate(
+        reported_4wk=Window(Avg('reported'), order_by=F('week').asc(), frame=RowRange(start=-3, end=0)),
+        total_reported=Window(Sum('reported'), order_by=F('week').asc()),
+        total_resolved=Window(Sum('resolved'), order_by=F('week').asc()),
+    ).order_by('-week')[:weeks]
+    return [{
+        'week': row.week.isoformat(),
+        'reported': row.reported,
+        'resolved': row.resolved,
+        'reported_4wk_avg': round(row.reported_4wk, 2),
+        'backlog': row.total_reported - row.total_resolved,
+        'mean_days_to_resolve': _days(row.resolution_seconds, row.resolved),
+    } for row in reversed(rows)]
+
+
+def resolution_time():
+    totals = WeeklyIssueStats.objects.aggregate(seconds=Sum('resolution_seconds'), resolved=Sum('resolved'))
+    return {
+        'resolved': totals['resolved'] or 0,
+        'mean_days': _days(totals['seconds'] or 0, totals['resolved'] or 0),
+    }
+
+
+def issues_per_flat(top=10):
+    flats = (Issue.objects.values(flat=F('reported_by_id__flat_number'))
+             .annotate(issues=Count('id'), open=Count('id', filter=~Q(status='Resolved')),
+                       rank=Window(Rank(), order_by=Count('id').desc()))
+             .order_by('-issues', 'flat')[:top])
+    totals = Issue.objects.aggregate(issues=Count('id'))
+    flat_count = UserDetails.objects.values('flat_number').distinct().count()
+    return {
+        'flats': flat_count,
+        'mean_per_flat': round(totals['issues'] / flat_count, 2) if flat_count else None,
+        'top': list(flats),
+    }
+
+
+def ai_vs_human():
+    source = Case(When(Q(is_ai=True) | Q(is_ai_generated=True), then=Value('ai')), default=Value('human'))
+    by_source = {
+        row['source']: row for row in
+        Solution.objects.annotate(source=source).values('source').annotate(
+            proposed=Count('id'),
+            accepted=Count('id', filter=Q(status='Accepted')),
+            mean_confidence=Avg('confidence'),
+        )
+    }
+    result = {}
+    for name in ('ai', 'human'):
+        row = by_source.get(name, {'proposed': 0, 'accepted': 0, 'mean_confidence': None})
+        result[name] = {
+            'proposed': row['proposed'],
+            'accepted': row['accepted'],
+            'acceptance_rate': round(row['accepted'] / row['proposed'], 3) if row['proposed'] else None,
+        }
+    result['ai']['mean_confidence'] = (round(by_source['ai']['mean_confidence'], 3)
+                                       if 'ai' in by_source else None)
+    # Is the model's confidence worth anything? Acceptance per confidence band
+    # Confidence 100 belongs in the top band
+    capped = Least(F('confidence'), Value(100 - 1e-9))
+    width = 100 / CONFIDENCE_BANDS
+    band = Cast(Floor(capped / width), FloatField()) * width
+    result['ai_by_confidence'] = [
+        {'band': round(row['band']), 'proposed': row['proposed'],
+         'acceptance_rate': round(row['accepted'] / row['proposed'], 3)}
+        for row in Solution.objects.filter(Q(is_ai=True) | Q(is_ai_generated=True))
+        .annotate(band=band).values('band')
+        .annotate(proposed=Count('id'), accepted=Count('id', filter=Q(status='Accepted')))
+        .order_by('band')
+    ]
+    return result
+
+
+def build_summary(weeks=26):
+    refresh()
+    return {
+        'generated_at': timezone.now().isoformat(),
+        'resolution_time': resolution_time(),
+        'issues_per_flat': issues_per_flat(),
+        'solutions': ai_vs_human(),
+        'weekly': weekly_trend(weeks),
+    }
+
+
+def summary(weeks=26):
+    weeks = max(1, min(weeks, MAX_WEEKS))
+    return fragments.cached('analytics', [fragments.ANALYTICS], lambda: build_summary(weeks),
+                            vary=[weeks], timeout=settings.ANALYTICS_CACHE_SECONDS)
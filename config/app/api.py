@@ -0,0 +1,292 @@
+"""
+Versioned JSON API (Django REST Framework) for issues, solutions, votes and
+notifications, mounted at /api/<version>/ (ALLOWED_VERSIONS in
+REST_FRAMEWORK). Meant for the mobile client, which syncs from here instead
+of scraping the HTML pages.
+
+  * Residents sign in with the site's session (request.resident, see
+    app/middleware.py). Unsafe methods need the CSRF token, as the forms do.
+  * Lists are cursor-paginated (?cursor=, ?limit=), so a page costs the same
+    at any depth and rows inserted meanwhile do not shift it. They are
+    newest first; ?ordering=updated_at with ?updated_since= walks changes
+    in the order they happened.
+  * ?fields=id,title,status trims every object to the named fields.
+  * Conditional GET: responses carry an ETag and Last-Modified taken from the
+    rows' updated_at stamps (created_at for votes and notifications, which
+    never change). The stamps of the requested page are read with one narrow
+    query before anything else, so a matching If-None-Match or
+    If-Modified-Since is answered 304 without loading or serializing rows.
+
+updated_at is set by auto_now on save(); code that writes with update()
+sets it itself (app/voting.py, app/generation.py, app/images.py).
+"""
+import hashlib
+
+from django.db.models import Exists, OuterRef
+from django.urls import include, re_path
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from rest_framework import mixins, permissions, serializers, status, viewsets
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.routers import SimpleRouter
+
+from . import metrics, notifications, voting
+from .models import Issue, SiteNotification, Solution, Vote
+
+PAGE_SIZE = 20
+MAX_PAGE = 100
+
+VOTE_STATUS_CODES = {
+    voting.RECORDED: status.HTTP_201_CREATED,
+    voting.DUPLICATE: status.HTTP_409_CONFLICT,
+    voting.NOT_ALLOWED: status.HTTP_403_FORBIDDEN,
+    voting.INVALID: status.HTTP_400_BAD_REQUEST,
+}
+
+
+# Authentication
+
+class ResidentAuthentication(SessionAuthentication):
+    """request.user is the logged-in resident (UserDetails); None when signed out."""
+
+    def authenticate(self, request):
+        resident = request._request.resident
+        if not resident:
+            return None
+        self.enforce_csrf(request)
+        return resident, None
+
+    def authenticate_header(self, request):
+        # Any value turns "not signed in" into 401 rather than 403
+        return 'Session'
+
+
+class IsResident(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return request.user is not None
+
+
+# Pagination and conditional GET
+
+class Pagination(CursorPagination):
+    page_size = PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE
+    ordering = '-id'
+
+
+def requested_fields(request):
+    fields = request.query_params.get('fields')
+    return [name for name in (part.strip() for part in fields.split(',')) if name] if fields else None
+
+
+class ConditionalMixin:
+    """
+    ETag / Last-Modified for list() and retrieve(), from the stamps
+    (stamp_field) of the rows the response would hold and the fields chosen
+    with ?fields=, which are validated first: a bad list is a 400, never a 304.
+    """
+    stamp_field = 'updated_at'
+
+    def projection(self):
+        """The serializer's fields after ?fields= (ValidationError for unknown ones)."""
+        return tuple(self.get_serializer().fields)
+
+    def list(self, request, *args, **kwargs):
+        fields = self.projection()
+        queryset = self.filter_queryset(self.get_queryset())
+        ordering = self.paginator.get_ordering(request, queryset, self)
+        columns = dict.fromkeys(['id', self.stamp_field, *(field.lstrip('-') for field in ordering)])
+        # The same page as the real query below, but only its keys and stamps
+        rows = self.paginator.paginate_queryset(queryset.values(*columns), request, view=self)
+        stamps = [(row['id'], row[self.stamp_field]) for row in rows]
+        edges = (self.paginator.has_previous, self.paginator.has_next)
+        return self.conditional(request, fields, stamps, edges,
+                                lambda: super(ConditionalMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        fields = self.projection()
+        stamp = (self.filter_queryset(self.get_queryset()).filter(pk=kwargs[self.lookup_field])
+                 .values_list(self.stamp_field, flat=True).first())
+        if stamp is None:
+            raise NotFound()
+        return self.conditional(request, fields, [(kwargs[self.lookup_field], stamp)], (),
+                                lambda: super(ConditionalMixin, self).retrieve(request, *args, **kwargs))
+
+    def conditional(self, request, fields, stamps, edges, respond):
+        # The path carries the version, cursor and filters; has_voted varies by
+        # resident; each projection of the same rows gets its own validator
+        key = repr((request.user.id, request.get_full_path(), fields, edges,
+                    [(pk, stamp.isoformat()) for pk, stamp in stamps]))
+        etag = f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+        last_modified = max((stamp for _, stamp in stamps), default=None)
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = respond()
+        else:
+            metrics.incr('api.not_modified')
+        response.headers['ETag'] = etag
+        if last_modified is not None:
+            response.headers['Last-Modified'] = http_date(last_modified)
+        # Per resident: browsers may keep it, shared caches may not, and both revalidate
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class BaseViewSet(ConditionalMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    # Here rather than in REST_FRAMEWORK: DRF imports its defaults while this
+    # module is still importing rest_framework.views
+    authentication_classes = [ResidentAuthentication]
+    permission_classes = [IsResident]
+    pagination_class = Pagination
+    lookup_value_regex = r'\d+'
+    filter_backends = [OrderingFilter]
+    ordering = '-id'
+    ordering_fields = ['id', 'updated_at']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        since = self.request.query_params.get('updated_since')
+        if since:
+            stamp = parse_datetime(since)
+            if stamp is None:
+                raise ValidationError({'updated_since': "Not an ISO 8601 date and time."})
+            queryset = queryset.filter(**{f'{self.stamp_field}__gt': stamp})
+        return queryset
+
+
+# Serializers
+
+class SparseFieldsMixin:
+    """Drops every field not named in ?fields= (all of them when it is absent)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        wanted = requested_fields(request) if request else None
+        if not wanted:
+            return
+        unknown = set(wanted) - set(self.fields)
+        if unknown:
+            raise ValidationError({'fields': f"Unknown field(s): {', '.join(sorted(unknown))}."})
+        for name in set(self.fields) - set(wanted):
+            self.fields.pop(name)
+
+
+class IssueSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    reported_by = serializers.PrimaryKeyRelatedField(source='reported_by_id', read_only=True)
+
+    class Meta:
+        model = Issue
+        fields = ['id', 'title', 'description', 'status', 'reported_date', 'reported_by', 'image',
+                  'resolved_at', 'updated_at']
+
+
+class SolutionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    has_voted = serializers.BooleanField(read_only=True)  # By the current resident
+
+    class Meta:
+        model = Solution
+        fields = ['id', 'issue', 'title', 'description', 'status', 'upvotes', 'downvotes', 'confidence',
+                  'is_ai', 'is_voting_enabled', 'suggested_by', 'suggested_date', 'has_voted', 'updated_at']
+
+
+class VoteSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Vote
+        fields = ['id', 'solution', 'vote_type', 'created_at']
+
+
+class CastVoteSerializer(serializers.Serializer):
+    solution = serializers.IntegerField()
+    vote_type = serializers.ChoiceField(choices=list(voting.VOTE_FIELDS))
+
+
+class NotificationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = SiteNotification
+        fields = ['id', 'title', 'message', 'issue', 'created_at']
+
+
+# Views
+
+class IssueViewSet(BaseViewSet):
+    """Every issue in the building. ?status= filters."""
+    queryset = Issue.objects.all()
+    serializer_class = IssueSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.query_params.get('status'):
+            queryset = queryset.filter(status=self.request.query_params['status'])
+        return queryset
+
+
+class SolutionViewSet(BaseViewSet):
+    """Solutions, with ?issue=<id> for one issue's."""
+    queryset = Solution.objects.all()
+    serializer_class = SolutionSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset().annotate(
+            has_voted=Exists(Vote.objects.filter(solution=OuterRef('pk'), voter_id=self.request.user.id)),
+        )
+        issue = self.request.query_params.get('issue')
+        if issue:
+            if not issue.isdigit():
+                raise ValidationError({'issue': "Must be an issue id."})
+            queryset = queryset.filter(issue_id=issue)
+        return queryset
+
+
+class VoteViewSet(BaseViewSet):
+    """The current resident's votes; POST casts one (see app/voting.py)."""
+    queryset = Vote.objects.all()
+    serializer_class = VoteSerializer
+    stamp_field = 'created_at'
+    ordering_fields = ['id', 'created_at']
+
+    def get_queryset(self):
+        return super().get_queryset().filter(voter_id=self.request.user.id)
+
+    def create(self, request, *args, **kwargs):
+        vote = CastVoteSerializer(data=request.data)
+        vote.is_valid(raise_exception=True)
+        try:
+            result = voting.cast_vote(vote.validated_data['solution'], request.user, vote.validated_data['vote_type'])
+        except Solution.DoesNotExist:
+            raise NotFound("No such solution.")
+        return Response({
+            'status': result.status,
+            'solution': vote.validated_data['solution'],
+            'issue': result.issue_id,
+            'upvotes': result.upvotes,
+            'downvotes': result.downvotes,
+            'accepted': result.accepted,
+        }, status=VOTE_STATUS_CODES[result.status])
+
+
+class NotificationViewSet(BaseViewSet):
+    """The notification feed: notifications of resolved issues are left out, as on the dashboard."""
+    queryset = notifications.visible().select_related(None)
+    serializer_class = NotificationSerializer
+    stamp_field = 'created_at'
+    ordering = ('-created_at', '-id')
+    ordering_fields = ['created_at']
+
+
+router = SimpleRouter()
+router.register('issues', IssueViewSet, basename='api-issue')
+router.register('solutions', SolutionViewSet, basename='api-solution')
+router.register('votes', VoteViewSet, basename='api-vote')
+router.register('notifications', NotificationViewSet, basename='api-notification')
+
+urlpatterns = [
+    re_path(r'^(?P<version>v\d+)/', include(router.urls)),
+]
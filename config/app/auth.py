@@ -0,0 +1,139 @@
+"""
+Resident authentication on top of UserDetails.
+
+Passwords are stored with Django's hashers (PASSWORD_HASHERS). Rows written
+before that hold the plaintext password; ResidentBackend still accepts them
+and re-hashes on the first successful login, as it does for hashes whose
+algorithm or work factor is out of date. The PBKDF2 work factor is
+PASSWORD_PBKDF2_ITERATIONS.
+
+The logged-in resident is request.resident (see app/middleware.py), loaded
+through get_resident(): a short-lived cache entry per resident, so views do
+not pay a query for identity on every request. Saves and deletes of a
+UserDetails row drop its entry (app/signals.py); code that writes with
+update() calls forget() itself.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    UNUSABLE_PASSWORD_PREFIX,
+    PBKDF2PasswordHasher,
+    check_password,
+    identify_hasher,
+    make_password,
+)
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.crypto import constant_time_compare
+
+from . import metrics
+from .models import UserDetails
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """pbkdf2_sha256 with the iteration count taken from settings."""
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+def is_hashed(encoded):
+    try:
+        identify_hasher(encoded)
+    except ValueError:
+        return False
+    return True
+
+
+def set_password(resident, raw_password):
+    """Hash `raw_password` onto the resident; None stores an unusable password (no login)."""
+    resident.password = make_password(raw_password)
+
+
+def verify_password(resident, raw_password):
+    """
+    Check `raw_password` against the resident's stored one, upgrading the
+    stored value (plaintext, old algorithm or work factor) when it matches.
+    """
+    def upgrade(raw):
+        set_password(resident, raw)
+        UserDetails.objects.filter(pk=resident.pk).update(password=resident.password)
+        metrics.incr('auth.password_upgrades')
+
+    if not resident.password or resident.password.startswith(UNUSABLE_PASSWORD_PREFIX):
+        return False  # No password set (admin, import): one has to be set in the admin first
+    if not is_hashed(resident.password):
+        # Legacy row from before hashing
+        if raw_password is None or not constant_time_compare(raw_password, resident.password):
+            return False
+        upgrade(raw_password)
+        return True
+    return check_password(raw_password, resident.password, setter=upgrade)
+
+
+class ResidentBackend:
+    """
+    Authentication backend for residents: authenticate(request, email=..., password=...).
+    Registered in AUTHENTICATION_BACKENDS next to ModelBackend (used by the admin).
+    """
+
+    def authenticate(self, request, email=None, password=None):
+        if email is None or password is None:
+            return None
+        resident = UserDetails.objects.filter(email=email).first()
+        if resident is None:
+            # Same hashing cost as a wrong password, so timing does not reveal
+            # which emails are registered
+            make_password(password)
+            return None
+        if verify_password(resident, password):
+            return resident
+        return None
+
+    def get_user(self, user_id):
+        return get_resident(user_id)
+
+
+def _cache_key(user_id):
+    return f"resident:{user_id}"
+
+
+def _load(user_id):
+    # The password hash never needs to leave the database for page rendering
+    return UserDetails.objects.defer('password').filter(pk=user_id).first()
+
+
+def get_resident(user_id):
+    """The UserDetails row for `user_id` (None if it does not exist), cached for RESIDENT_CACHE_SECONDS."""
+    if not user_id:
+        return None
+    key = _cache_key(user_id)
+    resident = cache.get(key)
+    if resident is not None:
+        metrics.incr('auth.resident_cache.hit')
+        return resident
+    metrics.incr('auth.resident_cache.miss')
+    resident = _load(user_id)
+    if resident is not None:
+        cache.set(key, resident, settings.RESIDENT_CACHE_SECONDS)
+    return resident
+
+
+async def aget_resident(user_id):
+    if not user_id:
+        return None
+    key = _cache_key(user_id)
+    resident = await cache.aget(key)
+    if resident is not None:
+        metrics.incr('auth.resident_cache.hit')
+        return resident
+    metrics.incr('auth.resident_cache.miss')
+    resident = await UserDetails.objects.defer('password').filter(pk=user_id).afirst()
+    if resident is not None:
+        await cache.aset(key, resident, settings.RESIDENT_CACHE_SECONDS)
+    return resident
+
+
+def forget(user_id):
+    """Drop the cached row once the current transaction commits."""
+    transaction.on_commit(lambda: cache.delete(_cache_key(user_id)))
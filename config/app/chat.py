@@ -0,0 +1,200 @@
+"""
+Conversation memory for the chat widget (chat_api / chat_stream).
+
+A signed-in resident's messages and the replies are kept as ChatTurn rows of
+a ChatSession; after CHAT_SESSION_IDLE_SECONDS without a message the next one
+starts a new session. Sending the whole transcript would make every reply
+dearer than the last, so a prompt is built from (build_context):
+
+  the system prompt
+  + the session's rolling summary of older turns
+  + the newest turns, verbatim: at most CHAT_HISTORY_TURNS, and only as many
+    as fit in CHAT_CONTEXT_TOKENS together with the rest
+  + the new message
+
+Once CHAT_COMPACT_BATCH_TURNS turns have piled up beyond the verbatim window,
+compact() folds them into the summary with one LLM call, as a
+'chat_compaction' job (CHAT_COMPACTION_MODE). Until it runs, turns that do
+not fit are left out, so the budget holds either way.
+
+Token counts are estimates (count_tokens); the API's own prompt_tokens are
+recorded next to them in app.metrics (chat.*) for tuning the budget.
+"""
+import re
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import metrics, ratelimit
+from .llm import get_client
+from .models import ChatSession, ChatTurn
+
+SYSTEM_PROMPT = ("You are the help assistant of a residential building's issue tracker. Residents ask "
+                 "about repairs, maintenance and their reported issues. Answer briefly and practically.")
+SUMMARY_PROMPT = ("Summarize this conversation between a resident and the building's help assistant, for "
+                  "the assistant to pick it up later. Keep what the resident told us (their flat, issue "
+                  "numbers, the problem) and anything we promised. Plain text, at most {words} words.")
+MESSAGE_OVERHEAD = 4  # Tokens the API adds around each message (role, separators)
+PIECE_RE = re.compile(r"\w+|[^\w\s]")
+
+Context = namedtuple('Context', 'session messages tokens turns')
+
+
+def count_tokens(text):
+    """
+    Estimated tokens in `text`: one per punctuation mark and one per word,
+    plus one per further six letters. Close to OpenAI's tokenizers on English
+    and on the high side elsewhere, which is the safe side for a budget.
+    """
+    return sum(1 + len(piece) // 6 for piece in PIECE_RE.findall(text or ''))
+
+
+def message_tokens(messages):
+    return sum(count_tokens(message['content']) + MESSAGE_OVERHEAD for message in messages)
+
+
+def current_session(resident):
+    """The resident's ongoing conversation, or a new one if the last went idle."""
+    cutoff = timezone.now() - timedelta(seconds=settings.CHAT_SESSION_IDLE_SECONDS)
+    session = (ChatSession.objects.filter(user=resident, updated_at__gte=cutoff)
+               .order_by('-updated_at').first())
+    return session or ChatSession.objects.create(user=resident)
+
+
+def build_context(session, user_message):
+    """Context whose messages are the prompt for `user_message` within CHAT_CONTEXT_TOKENS."""
+    messages = [{'role': 'system', 'content': SYSTEM_PROMPT}]
+    if session.summary:
+        messages.append({'role': 'system', 'content': f"Earlier in this conversation: {session.summary}"})
+    question = {'role': 'user', 'content': user_message}
+    used = message_tokens(messages + [question])
+
+    history = []
+    recent = (ChatTurn.objects.filter(session=session, id__gt=session.summarized_through)
+              .order_by('-id').values_list('role', 'content', 'tokens')[:settings.CHAT_HISTORY_TURNS])
+    for role, content, tokens in recent:
+        if used + tokens + MESSAGE_OVERHEAD > settings.CHAT_CONTEXT_TOKENS:
+            metrics.incr('chat.context_truncated')
+            break
+        used += tokens + MESSAGE_OVERHEAD
+        history.append({'role': role, 'content': content})
+    history.reverse()
+
+    metrics.observe('chat.prompt_tokens', used)
+    metrics.observe('chat.context_turns', len(history))
+    if session.summary:
+        metrics.incr('chat.summary_used')
+    return Context(session, messages + history + [question], used, len(history))
+
+
+def prepare(resident, user_message):
+    """The prompt for a message: with the conversation so far for a resident, on its own otherwise."""
+    if not resident:
+        messages = [{'role': 'user', 'content': user_message}]
+        return Context(None, messages, message_tokens(messages), 0)
+    return build_context(current_session(resident), user_message)
+
+
+def record(session, user_message, reply):
+    """Store one exchange, and have the summary catch up once enough turns are past the window."""
+    ChatTurn.objects.bulk_create([
+        ChatTurn(session=session, role='user', content=user_message, tokens=count_tokens(user_message)),
+        ChatTurn(session=session, role='assistant', content=reply, tokens=count_tokens(reply)),
+    ])
+    ChatSession.objects.filter(id=session.id).update(updated_at=timezone.now())
+    pending = ChatTurn.objects.filter(session=session, id__gt=session.summarized_through).count()
+    if pending >= settings.CHAT_HISTORY_TURNS + settings.CHAT_COMPACT_BATCH_TURNS:
+        schedule_compaction(session)
+
+
+def finish(context, user_message, reply, seconds, response=None):
+    """Metrics for an LLM reply, and the exchange stored if it belongs to a session."""
+    metrics.observe('chat.reply_seconds', seconds)
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        metrics.incr('chat.api_prompt_tokens', usage.prompt_tokens)
+        metrics.incr('chat.api_completion_tokens', usage.completion_tokens)
+        metrics.incr('chat.estimated_prompt_tokens', context.tokens)
+        ratelimit.spend(usage.prompt_tokens, usage.completion_tokens)
+    else:
+        # Streamed replies come without usage
+        ratelimit.spend(context.tokens, count_tokens(reply))
+    if context.session is not None and reply:
+        record(context.session, user_message, reply)
+
+
+def remember(resident, user_message, reply):
+    """Store an exchange answered locally (chatbot/utils.py), so follow-ups have it in context."""
+    if resident:
+        record(current_session(resident), user_message, reply)
+
+
+# Compaction
+
+def schedule_compaction(session):
+    mode = settings.CHAT_COMPACTION_MODE
+    if mode == 'sync':
+        compact(session)
+    elif mode == 'job':
+        from .jobs import enqueue
+        enqueue('chat_compaction', user=session.user)  # One live job per resident
+
+
+def compact(session):
+    """
+    Fold the turns before the verbatim window into the session's summary
+    (at most about CHAT_CONTEXT_TOKENS of them per call; the rest on the next
+    one). Returns the number of turns folded.
+    """
+    session.refresh_from_db(fields=['summary', 'summary_tokens', 'summarized_through'])
+    turns = list(ChatTurn.objects.filter(session=session, id__gt=session.summarized_through)
+                 .order_by('-id')[settings.CHAT_HISTORY_TURNS:])
+    turns.reverse()
+    folded, size = [], session.summary_tokens
+    for turn in turns:
+        if folded and size + turn.tokens > settings.CHAT_CONTEXT_TOKENS:
+            break
+        folded.append(turn)
+        size += turn.tokens
+    if not folded:
+        return 0
+    if ratelimit.budget().exhausted:
+        return 0  # The context budget still holds; the turns are folded once there is budget again
+
+    transcript = '\n'.join(f"{'Resident' if turn.role == 'user' else 'Assistant'}: {turn.content}"
+                           for turn in folded)
+    if session.summary:
+        transcript = f"Summary so far: {session.summary}\n\n{transcript}"
+    started = time.perf_counter()
+    response = get_client().chat.completions.create(
+        model=settings.AI_MODEL,
+        messages=[
+            {'role': 'system', 'content': SUMMARY_PROMPT.format(words=settings.CHAT_SUMMARY_TOKENS * 3 // 4)},
+            {'role': 'user', 'content': transcript},
+        ],
+        max_tokens=settings.CHAT_SUMMARY_TOKENS,
+    )
+    summary = response.choices[0].message.content.strip()
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        ratelimit.spend(usage.prompt_tokens, usage.completion_tokens)
+    metrics.observe('chat.compaction_seconds', time.perf_counter() - started)
+
+    # Conditional on summarized_through: a concurrent compaction that got there first wins
+    saved = ChatSession.objects.filter(id=session.id, summarized_through=session.summarized_through).update(
+        summary=summary, summary_tokens=count_tokens(summary), summarized_through=folded[-1].id,
+    )
+    if not saved:
+        return 0
+    metrics.incr('chat.compactions')
+    metrics.incr('chat.compacted_turns', len(folded))
+    return len(folded)
+
+
+def compact_for(resident):
+    """compact() the resident's latest session (the job handler)."""
+    session = ChatSession.objects.filter(user=resident).order_by('-updated_at').first()
+    return compact(session) if session else 0
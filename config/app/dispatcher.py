@@ -0,0 +1,211 @@
+"""
+In-process dispatcher for the Issue post_save AI hook.
+
+reportIssue only pushes the new issue id onto a bounded queue. A collector
+thread groups ids that arrive within AI_DISPATCH_BATCH_WINDOW seconds (up to
+AI_DISPATCH_BATCH_SIZE) into a single prompt and hands the batch to a thread
+pool of AI_DISPATCH_MAX_CONCURRENCY workers, which is also the cap on
+concurrent OpenAI calls. AI_DISPATCH_MODE = 'async' runs the batches as
+coroutines on AsyncOpenAI instead. When the queue is full the issue falls
+back to the durable BackgroundJob queue instead of blocking the request.
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import generation, metrics, ratelimit
+from .models import Issue
+
+logger = logging.getLogger(__name__)
+
+
+def process_batch(issue_ids):
+    return generation.generate(issue_ids)
+
+
+async def process_batch_async(issue_ids):
+    return await generation.agenerate(issue_ids)
+
+
+class AIDispatcher:
+    """
+    Batches submitted issues and runs them with at most `max_concurrency`
+    OpenAI calls in flight. With use_async=True the batches run as coroutines
+    on one event-loop thread (AsyncOpenAI) instead of a thread pool.
+    """
+
+    def __init__(self, max_concurrency=2, batch_size=5, batch_window=0.5, max_queue=500, use_async=False):
+        self.max_concurrency = max_concurrency
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.use_async = use_async
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pool = None
+        self._loop = None
+        if use_async:
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(target=self._loop.run_forever, name='ai-dispatch-loop', daemon=True).start()
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='ai-dispatch')
+        self._in_flight = threading.Semaphore(max_concurrency)
+        self._pending = 0
+        self._running = 0
+        self._pending_lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._collector = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, issue_id):
+        """Queue an issue for AI suggestion. Never blocks the caller."""
+        self._ensure_started()
+        with self._pending_lock:
+            self._pending += 1
+            self._idle.clear()
+        try:
+            self._queue.put_nowait((issue_id, time.monotonic()))
+        except queue.Full:
+            self._done(1)
+            metrics.incr('ai_dispatch.overflow')
+            from .jobs import enqueue_ai_solution
+            issue = Issue.objects.filter(id=issue_id).first()
+            if issue:
+                enqueue_ai_solution(issue)
+            return False
+        metrics.incr('ai_dispatch.submitted')
+        metrics.gauge('ai_dispatch.queue_depth', self._queue.qsize())
+        return True
+
+    def flush(self, timeout=None):
+        """Wait until everything submitted so far has been processed."""
+        return self._idle.wait(timeout)
+
+    def _ensure_started(self):
+        if self._collector is None:
+            with self._start_lock:
+                if self._collector is None:
+                    self._collector = threading.Thread(target=self._collect, name='ai-dispatch-collector', daemon=True)
+                    self._collector.start()
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            metrics.gauge('ai_dispatch.queue_depth', self._queue.qsize())
+            # Block the collector (not the request) while all workers are busy,
+            # so the queue keeps filling and the next batch is larger
+            self._in_flight.acquire()
+            if self.use_async:
+                asyncio.run_coroutine_threadsafe(self._run_batch_async(batch), self._loop)
+            else:
+                self._pool.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch):
+        issue_ids = self._batch_started(batch)
+        close_old_connections()
+        try:
+            started = time.perf_counter()
+            solutions = process_batch(issue_ids)
+            metrics.observe('ai_dispatch.call_seconds', time.perf_counter() - started)
+            metrics.incr('ai_dispatch.solutions', len(solutions))
+        except Exception as e:
+            _batch_failed(issue_ids, e)
+        finally:
+            close_old_connections()
+            self._batch_finished(batch)
+
+    async def _run_batch_async(self, batch):
+        issue_ids = self._batch_started(batch)
+        try:
+            started = time.perf_counter()
+            solutions = await process_batch_async(issue_ids)
+            metrics.observe('ai_dispatch.call_seconds', time.perf_counter() - started)
+            metrics.incr('ai_dispatch.solutions', len(solutions))
+        except Exception as e:
+            await sync_to_async(_batch_failed)(issue_ids, e)
+        finally:
+            self._batch_finished(batch)
+
+    def _batch_started(self, batch):
+        metrics.observe('ai_dispatch.batch_size', len(batch))
+        with self._pending_lock:
+            self._running += 1
+            metrics.gauge('ai_dispatch.in_flight', self._running)
+        return [issue_id for issue_id, _ in batch]
+
+    def _batch_finished(self, batch):
+        now = time.monotonic()
+        for _, queued_at in batch:
+            metrics.observe('ai_dispatch.latency_seconds', now - queued_at)
+        with self._pending_lock:
+            self._running -= 1
+            metrics.gauge('ai_dispatch.in_flight', self._running)
+        self._in_flight.release()
+        self._done(len(batch))
+
+    def _done(self, count):
+        with self._pending_lock:
+            self._pending -= count
+            if self._pending <= 0:
+                self._pending = 0
+                self._idle.set()
+
+
+def _batch_failed(issue_ids, error):
+    logger.warning("AI dispatch batch %s failed: %s", issue_ids, error)
+    metrics.incr('ai_dispatch.failed_batches')
+    # Leave it to the durable queue; it retries with backoff
+    from .jobs import enqueue_ai_solution
+    for issue in Issue.objects.filter(id__in=issue_ids):
+        enqueue_ai_solution(issue)
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = AIDispatcher(
+                    max_concurrency=settings.AI_DISPATCH_MAX_CONCURRENCY,
+                    batch_size=settings.AI_DISPATCH_BATCH_SIZE,
+                    batch_window=settings.AI_DISPATCH_BATCH_WINDOW,
+                    max_queue=settings.AI_DISPATCH_MAX_QUEUE,
+                    use_async=settings.AI_DISPATCH_MODE == 'async',
+                )
+    return _dispatcher
+
+
+def dispatch_issue(issue_id, user_id=None):
+    """Entry point for the post_save hook; honours AI_DISPATCH_MODE, RATE_LIMITS and the daily budget."""
+    mode = settings.AI_DISPATCH_MODE
+    if mode == 'off':
+        return
+    if not ratelimit.allow_ai('ai_suggest', f'user:{user_id}'):
+        # Not lost: issue_details_view queues the suggestion when the issue is viewed
+        return
+    if mode == 'sync':
+        try:
+            process_batch([issue_id])
+        except Exception as e:
+            logger.warning("AI suggestion for issue %s failed: %s", issue_id, e)
+        return
+    get_dispatcher().submit(issue_id)
@@ -0,0 +1,126 @@
+"""
+Local stand-in for the OpenAI HTTP API, used by the benchmark commands.
+
+Unlike llm.FakeOpenAI this is a real HTTP server, so requests go through the
+actual openai SDK and its connection pool. It answers
+POST /v1/chat/completions after `latency` seconds (plain JSON or SSE when
+"stream": true) and runs on its own event loop thread:
+
+    server = FakeLLMServer(latency=0.5).start()
+    OpenAI(base_url=server.base_url, api_key='fake')
+"""
+import asyncio
+import json
+import threading
+import time
+
+
+class FakeLLMServer:
+    def __init__(self, latency=0.5, reply="Please contact building maintenance.", host='127.0.0.1', port=0):
+        self.latency = latency
+        self.reply = reply
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self._loop = None
+        self._server = None
+        self._ready = threading.Event()
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}/v1"
+
+    def start(self):
+        threading.Thread(target=self._run, name='fake-llm-server', daemon=True).start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    async def _shutdown(self):
+        self._server.close()
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port, backlog=4096)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _handle(self, reader, writer):
+        # Minimal HTTP/1.1 with keep-alive: enough for httpx
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0) or 0))
+                self.requests += 1
+                payload = json.loads(body or b'{}')
+                await asyncio.sleep(self.latency)
+                if payload.get('stream'):
+                    await self._stream(writer, payload)
+                else:
+                    self._respond(writer, 200, self._completion(payload))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # CancelledError: stop() is shutting the server down
+            pass
+        finally:
+            writer.close()
+
+    def _completion(self, payload):
+        return {
+            'id': 'chatcmpl-fake',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': payload.get('model', 'fake'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': self.reply},
+                'finish_reason': 'stop',
+            }],
+            'usage': {'prompt_tokens': 10, 'completion_tokens': 10, 'total_tokens': 20},
+        }
+
+    def _respond(self, writer, status, data):
+        body = json.dumps(data).encode()
+        writer.write(
+            f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n".encode() + body
+        )
+
+    async def _stream(self, writer, payload):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Transfer-Encoding: chunked\r\nConnection: keep-alive\r\n\r\n")
+        for word in self.reply.split(' '):
+            chunk = {
+                'id': 'chatcmpl-fake', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                'model': payload.get('model', 'fake'),
+                'choices': [{'index': 0, 'delta': {'content': word + ' '}, 'finish_reason': None}],
+            }
+            self._chunk(writer, f"data: {json.dumps(chunk)}\n\n".encode())
+            await writer.drain()
+        self._chunk(writer, b"data: [DONE]\n\n")
+        writer.write(b"0\r\n\r\n")
+
+    def _chunk(self, writer, data):
+        writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
@@ -0,0 +1,121 @@
+"""
+Rendered-fragment cache with version stamps.
+
+A fragment (the notification panel, a resident's recent-issues table, an
+issue's solution list) is cached under a key built from its name, the
+current stamps of the scopes it depends on and anything it varies on (the
+viewing resident). Signals in app/signals.py bump a scope's stamp after a
+write commits, so the next render misses and rebuilds; stale entries are
+never read again and simply age out. Nothing is deleted, which is what makes
+this work the same on the locmem and file backends.
+
+Stamps live in the same cache as the fragments. With locmem that is per
+process, so several workers need a shared backend (DJANGO_CACHE=file, the
+default under gunicorn.conf.py once it runs more than one worker).
+Hit/miss counts go to app.metrics and are summarised by stats().
+"""
+import hashlib
+import time
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import metrics
+
+NOTIFICATIONS = 'notifications'
+ANALYTICS = 'analytics'  # Bumped by `manage.py refresh_analytics`; otherwise the TTL applies
+_MISSING = object()
+
+
+def user_issues_scope(user_id):
+    return f"user-issues:{user_id}"
+
+
+def issue_scope(issue_id):
+    return f"issue:{issue_id}"
+
+
+def _stamp_key(scope):
+    return f"fragment-stamp:{scope}"
+
+
+def _new_stamp():
+    return f"{time.time_ns():x}"
+
+
+def stamps(scopes):
+    """Current stamp per scope, creating any that are missing (or were evicted)."""
+    keys = [_stamp_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: _new_stamp() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def bump(*scopes):
+    """Invalidate every fragment depending on `scopes`, once the current transaction commits."""
+    transaction.on_commit(partial(_bump_now, scopes))
+
+
+def _bump_now(scopes):
+    cache.set_many({_stamp_key(scope): _new_stamp() for scope in scopes}, timeout=None)
+
+
+def _key(name, scopes, vary):
+    parts = [name, *stamps(scopes), *map(str, vary)]
+    return f"fragment:{name}:{hashlib.sha1('|'.join(parts).encode()).hexdigest()}"
+
+
+def cached(name, scopes, build, vary=(), timeout=None):
+    """
+    build()'s result for this name/scopes/vary, from the cache when the
+    stamps are unchanged. The value can be any picklable object, typically
+    rendered HTML.
+    """
+    if not settings.FRAGMENT_CACHE_ENABLED:
+        return build()
+    key = _key(name, scopes, vary)
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        metrics.incr(f'fragments.{name}.hit')
+        return value
+    metrics.incr(f'fragments.{name}.miss')
+    value = build()
+    cache.set(key, value, timeout or settings.FRAGMENT_CACHE_TIMEOUT)
+    return value
+
+
+async def acached(name, scopes, build, vary=(), timeout=None):
+    """cached() for async views: `build` is a coroutine function."""
+    if not settings.FRAGMENT_CACHE_ENABLED:
+        return await build()
+    key = await sync_to_async(_key)(name, scopes, vary)
+    value = await cache.aget(key, _MISSING)
+    if value is not _MISSING:
+        metrics.incr(f'fragments.{name}.hit')
+        return value
+    metrics.incr(f'fragments.{name}.miss')
+    value = await build()
+    await cache.aset(key, value, timeout or settings.FRAGMENT_CACHE_TIMEOUT)
+    return value
+
+
+def stats():
+    """{fragment name: {'hits', 'misses', 'hit_rate'}} for this process."""
+    counters = metrics.snapshot()['counters']
+    result = {}
+    for counter, value in counters.items():
+        if not counter.startswith('fragments.'):
+            continue
+        name, outcome = counter[len('fragments.'):].rsplit('.', 1)
+        entry = result.setdefault(name, {'hits': 0, 'misses': 0})
+        entry['hits' if outcome == 'hit' else 'misses'] = value
+    for entry in result.values():
+        total = entry['hits'] + entry['misses']
+        entry['hit_rate'] = round(entry['hits'] / total, 3) if total else 0.0
+    return result
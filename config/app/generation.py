@@ -0,0 +1,303 @@
+"""
+AI solution generation: N ranked suggestions per issue from one OpenAI call.
+
+One prompt covers up to AI_GENERATION_BATCH_SIZE issues and asks for
+AI_SOLUTIONS_PER_ISSUE suggestions each, using structured output
+(response_format json_schema, RESPONSE_SCHEMA). The reply is still checked
+here: a suggestion that names an issue outside the prompt, lacks a title or
+description, or has a confidence outside 0-100 is dropped and counted. It
+does not sink the rest of the batch.
+
+Before any call, issues that already have AI solutions are skipped. Issues
+with a near-duplicate resolved issue, or with a cached answer
+(app/llm_cache.py), are answered without OpenAI. Everything that remains
+is stored with one bulk_create, and the issues move to 'In Review'.
+
+Every call is logged as a GenerationCall row with its token usage and
+latency, failed calls included, and is also counted in app.metrics
+(ai_generation.*). Used by the post_save dispatcher (app/dispatcher.py),
+the job queue (app/jobs.py, which folds queued issues into shared prompts)
+and `manage.py llm_cache warm`.
+"""
+import json
+import logging
+import time
+from collections import Counter, defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import fragments, llm_cache, metrics, ratelimit, similarity, stats
+from .llm import get_async_client, get_client
+from .models import GenerationCall, Issue, Solution, UserDetails
+
+logger = logging.getLogger(__name__)
+
+AI_USER_EMAIL = "ai_assistant@apartment.com"
+TITLE_MAX_LENGTH = Solution._meta.get_field('title').max_length
+
+# Strict structured output: every property required, nothing else allowed
+RESPONSE_SCHEMA = {
+    'type': 'object',
+    'additionalProperties': False,
+    'required': ['solutions'],
+    'properties': {
+        'solutions': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'additionalProperties': False,
+                'required': ['issue_id', 'rank', 'title', 'description', 'confidence'],
+                'properties': {
+                    'issue_id': {'type': 'integer'},
+                    'rank': {'type': 'integer', 'minimum': 1},
+                    'title': {'type': 'string'},
+                    'description': {'type': 'string'},
+                    'confidence': {'type': 'number', 'minimum': 0, 'maximum': 100},
+                },
+            },
+        },
+    },
+}
+
+
+def build_prompt(issues, per_issue):
+    lines = [
+        f"Suggest {per_issue} distinct, practical solutions for each of the following apartment "
+        "maintenance issues, ranked best first (rank 1 is the one to try first).",
+        "confidence is how likely (0-100) the solution fixes the issue. "
+        "Answer every issue, with its issue_id on each solution.",
+        "",
+    ]
+    for issue in issues:
+        lines.append(f"Issue {issue.id}: title: '{issue.title}'. Description: '{issue.description}'")
+    return "\n".join(lines)
+
+
+def build_request(issues, per_issue):
+    return {
+        'model': settings.AI_MODEL,
+        'response_format': {
+            'type': 'json_schema',
+            'json_schema': {'name': 'ranked_solutions', 'strict': True, 'schema': RESPONSE_SCHEMA},
+        },
+        'messages': [{"role": "user", "content": build_prompt(issues, per_issue)}],
+    }
+
+
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def clean_suggestion(item):
+    """The suggestion with its fields normalized, or a ValueError saying what is wrong with it."""
+    if not isinstance(item, dict):
+        raise ValueError("not an object")
+    title = item.get('title')
+    description = item.get('description')
+    confidence = item.get('confidence')
+    rank = item.get('rank', 1)
+    if not isinstance(title, str) or not title.strip():
+        raise ValueError("missing title")
+    if not isinstance(description, str) or not description.strip():
+        raise ValueError("missing description")
+    if not _number(confidence) or not 0 <= confidence <= 100:
+        raise ValueError(f"confidence {confidence!r} is not a number from 0 to 100")
+    if not _number(rank) or rank < 1:
+        raise ValueError(f"rank {rank!r} is not a positive integer")
+    return {
+        'title': title.strip()[:TITLE_MAX_LENGTH],
+        'description': description.strip(),
+        'confidence': float(confidence),
+        'rank': int(rank),
+    }
+
+
+def parse_reply(raw_content, issues, per_issue):
+    """
+    ({issue id: [suggestion, ...] best first, at most per_issue}, rejected count).
+    A reply that is not JSON or does not have the top-level shape raises ValueError.
+    """
+    data = json.loads(raw_content)
+    items = data.get('solutions') if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        raise ValueError("reply has no 'solutions' list")
+    by_id = {issue.id for issue in issues}
+    answers = defaultdict(list)
+    rejected = 0
+    for item in items:
+        try:
+            issue_id = item.get('issue_id') if isinstance(item, dict) else None
+            if not _number(issue_id) or int(issue_id) not in by_id:
+                raise ValueError(f"issue_id {issue_id!r} was not asked about")
+            answers[int(issue_id)].append(clean_suggestion(item))
+        except ValueError as e:
+            rejected += 1
+            logger.info("Dropped AI suggestion: %s", e)
+    ranked = {}
+    for issue_id, suggestions in answers.items():
+        seen, kept = set(), []
+        for suggestion in sorted(suggestions, key=lambda s: s['rank']):
+            if suggestion['title'].lower() in seen:
+                rejected += 1  # Same suggestion twice
+                continue
+            seen.add(suggestion['title'].lower())
+            kept.append(suggestion)
+        rejected += max(len(kept) - per_issue, 0)
+        ranked[issue_id] = kept[:per_issue]
+    return ranked, rejected
+
+
+def _usage(response):
+    usage = getattr(response, 'usage', None)
+    return (getattr(usage, 'prompt_tokens', 0) or 0), (getattr(usage, 'completion_tokens', 0) or 0)
+
+
+def log_call(issues, seconds, response=None, solutions=0, rejected=0, error=''):
+    prompt_tokens, completion_tokens = _usage(response) if response is not None else (0, 0)
+    metrics.incr('ai_generation.calls')
+    metrics.incr('ai_generation.prompt_tokens', prompt_tokens)
+    metrics.incr('ai_generation.completion_tokens', completion_tokens)
+    metrics.incr('ai_generation.rejected', rejected)
+    metrics.observe('ai_generation.call_seconds', seconds)
+    if error:
+        metrics.incr('ai_generation.failed_calls')
+    ratelimit.spend(prompt_tokens, completion_tokens)
+    return GenerationCall.objects.create(
+        model=settings.AI_MODEL,
+        prompt_version=llm_cache.SOLUTION_PROMPT_VERSION,
+        issues=len(issues),
+        solutions=solutions,
+        rejected=rejected,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        latency_ms=round(seconds * 1000),
+        error=error[:1000],
+    )
+
+
+def accept_reply(issues, response, seconds, per_issue):
+    """Validate a reply, log the call and cache each issue's answer."""
+    try:
+        answers, rejected = parse_reply(response.choices[0].message.content, issues, per_issue)
+    except ValueError as e:
+        log_call(issues, seconds, response, error=f"Invalid reply: {e}")
+        raise
+    log_call(issues, seconds, response, solutions=sum(map(len, answers.values())), rejected=rejected)
+    for issue in issues:
+        if answers.get(issue.id):
+            llm_cache.put_solutions(issue.title, issue.description, answers[issue.id])
+    return answers
+
+
+def request_solutions(issues, per_issue=None):
+    """One OpenAI call for `issues`: {issue id: ranked suggestions}. Errors are logged, then raised."""
+    per_issue = per_issue or settings.AI_SOLUTIONS_PER_ISSUE
+    started = time.perf_counter()
+    try:
+        response = get_client().chat.completions.create(**build_request(issues, per_issue))
+    except Exception as e:
+        log_call(issues, time.perf_counter() - started, error=str(e))
+        raise
+    return accept_reply(issues, response, time.perf_counter() - started, per_issue)
+
+
+async def arequest_solutions(issues, per_issue=None):
+    per_issue = per_issue or settings.AI_SOLUTIONS_PER_ISSUE
+    started = time.perf_counter()
+    try:
+        response = await get_async_client().chat.completions.create(**build_request(issues, per_issue))
+    except Exception as e:
+        await sync_to_async(log_call)(issues, time.perf_counter() - started, error=str(e))
+        raise
+    return await sync_to_async(accept_reply)(issues, response, time.perf_counter() - started, per_issue)
+
+
+def known_answers(issues):
+    """
+    Answers we already have: the accepted solution of a near-duplicate
+    resolved issue first, then the LLM response cache. Only the rest need OpenAI.
+    """
+    answers = {}
+    for issue in issues:
+        reused = similarity.reused_answer(issue)
+        answer = [reused] if reused else llm_cache.get_solutions(issue.title, issue.description)
+        if answer:
+            answers[issue.id] = answer
+    return answers
+
+
+def _prepare(issue_ids):
+    """(issues still without AI solutions, answers known without OpenAI, issues to ask about)."""
+    issues = list(Issue.objects.filter(id__in=issue_ids)
+                  .exclude(solutions__is_ai=True).order_by('id'))
+    answers = known_answers(issues)
+    return issues, answers, [issue for issue in issues if issue.id not in answers]
+
+
+def _batches(issues):
+    size = settings.AI_GENERATION_BATCH_SIZE
+    return [issues[start:start + size] for start in range(0, len(issues), size)]
+
+
+def record_solutions(issues, answers):
+    """Store every issue's suggestions with one bulk_create and move the issues to 'In Review'."""
+    ai_user = UserDetails.objects.filter(email=AI_USER_EMAIL).first()
+    with transaction.atomic():
+        # Another worker may have answered some of them while we waited on OpenAI
+        already_done = set(Solution.objects.filter(
+            issue__in=[i.id for i in issues], is_ai=True,
+        ).values_list('issue_id', flat=True))
+        solutions = [
+            Solution(
+                issue=issue,
+                title=suggestion['title'],
+                description=suggestion['description'],
+                confidence=suggestion['confidence'],
+                suggested_by=ai_user,
+                status='Pending',
+                is_ai=True,
+                is_ai_generated=True,
+            )
+            for issue in issues
+            if issue.id not in already_done
+            # Ranked best first; insertion (id) order is the rank on the issue page
+            for suggestion in answers.get(issue.id, ())
+        ]
+        Solution.objects.bulk_create(solutions)
+        # update() rather than issue.save(): does not re-fire post_save, so the
+        # dashboard counters are moved here instead of by the signal
+        flipped = list(Issue.objects.filter(
+            id__in={s.issue_id for s in solutions}, status='Open',
+        ).values_list('id', 'reported_by_id'))
+        Issue.objects.filter(id__in=[i for i, _ in flipped], status='Open').update(
+            status='In Review', updated_at=timezone.now())
+        for user_id, count in Counter(user_id for _, user_id in flipped).items():
+            stats.apply_change(user_id, 'Open', 'In Review', count=count)
+        # bulk_create and update() skip the signals that invalidate cached fragments
+        fragments.bump(*{fragments.issue_scope(s.issue_id) for s in solutions},
+                       *[fragments.user_issues_scope(user_id) for user_id in {user_id for _, user_id in flipped}])
+    metrics.incr('ai_generation.solutions', len(solutions))
+    return solutions
+
+
+def generate(issue_ids):
+    """
+    AI suggestions for the given issues, batched into as few OpenAI calls as
+    AI_GENERATION_BATCH_SIZE allows. Returns the Solutions created. A failed
+    call raises (after logging it), so callers can retry.
+    """
+    issues, answers, todo = _prepare(issue_ids)
+    for batch in _batches(todo):
+        answers.update(request_solutions(batch))
+    return record_solutions(issues, answers)
+
+
+async def agenerate(issue_ids):
+    """generate() on AsyncOpenAI; the database work runs through sync_to_async."""
+    issues, answers, todo = await sync_to_async(_prepare)(issue_ids)
+    for batch in _batches(todo):
+        answers.update(await arequest_solutions(batch))
+    return await sync_to_async(record_solutions)(issues, answers)
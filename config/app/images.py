@@ -0,0 +1,193 @@
+"""
+Upload pipeline for Issue.image and UserDetails.profile_picture.
+
+Uploads are saved as they arrive. A background job (see app/jobs.py) then:
+
+  * applies the EXIF orientation and re-encodes without any metadata, so
+    phone GPS tags and camera details never reach other residents;
+  * stores the cleaned original under a content-hashed name and swaps the
+    field to it, deleting the raw upload;
+  * writes one resized rendition per template slot in each enabled format
+    (AVIF, WebP, JPEG fallback) under variants/<hash>/.
+
+Names derive from the content hash, so the same photo uploaded twice is
+stored once, and files never change once written, which is what allows them
+to be cached for a year (see app/media.py). The {% picture %} tag in
+templatetags/images.py picks the variant for a slot, falling back to the
+original until the job has run.
+"""
+import hashlib
+import logging
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from . import auth, fragments
+from .models import Issue, UserDetails
+
+logger = logging.getLogger(__name__)
+
+# (width, height, crop): crop fills the box exactly, otherwise fit inside it.
+# Sizes are about twice the CSS size for high-density screens.
+SLOTS = {
+    'avatar': (96, 96, True),
+    'thumb': (128, 96, True),
+    'detail': (1200, 900, False),
+}
+ISSUE_IMAGE_SLOTS = ('thumb', 'detail')  # Issue tables (home, board) and the issue page
+PROFILE_PICTURE_SLOTS = ('avatar',)
+
+# extension -> (Pillow format, MIME type, save options)
+FORMATS = {
+    'avif': ('AVIF', 'image/avif', {'quality': 55}),
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+ORIGINAL_MAX_SIDE = 2560
+
+
+def enabled_formats():
+    """Configured formats this Pillow build can write, best first; JPEG always last."""
+    available = []
+    for ext in settings.IMAGE_VARIANT_FORMATS:
+        if ext == 'jpeg':
+            continue
+        try:
+            if features.check(ext):
+                available.append(ext)
+        except ValueError:  # Pillow too old to know the codec
+            pass
+    return available + ['jpeg']
+
+
+def _load(data):
+    image = Image.open(BytesIO(data))
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        # Flatten transparency onto white: the JPEG fallback has no alpha channel
+        rgba = image.convert('RGBA')
+        flattened = Image.new('RGB', rgba.size, (255, 255, 255))
+        flattened.paste(rgba, mask=rgba.getchannel('A'))
+        return flattened
+    return image.convert('RGB')
+
+
+def _encode(image, ext):
+    fmt, _, options = FORMATS[ext]
+    out = BytesIO()
+    # A fresh save with no exif= / icc_profile= argument writes no metadata
+    image.save(out, fmt, **options)
+    return out.getvalue()
+
+
+def _resize(image, slot):
+    width, height, crop = SLOTS[slot]
+    if crop:
+        return ImageOps.fit(image, (width, height), Image.Resampling.LANCZOS)
+    resized = image.copy()
+    resized.thumbnail((width, height), Image.Resampling.LANCZOS)
+    return resized
+
+
+def _store(name, encode):
+    """Write `name` unless it already exists (same hash, same bytes)."""
+    if default_storage.exists(name):
+        return name
+    saved = default_storage.save(name, ContentFile(encode()))
+    if saved != name:
+        # Written concurrently by another worker; keep theirs
+        default_storage.delete(saved)
+    return name
+
+
+def build_variants(data, upload_dir, slots):
+    """Clean original plus per-slot renditions for image bytes; returns the variants record."""
+    digest = hashlib.sha256(data).hexdigest()
+    image = _load(data)
+
+    original = image.copy()
+    original.thumbnail((ORIGINAL_MAX_SIDE, ORIGINAL_MAX_SIDE), Image.Resampling.LANCZOS)
+    original_name = _store(f"{upload_dir}/{digest[:32]}.jpg", lambda: _encode(original, 'jpeg'))
+
+    record = {'hash': digest, 'original': original_name, 'slots': {}}
+    for slot in slots:
+        resized = _resize(image, slot)
+        entry = {'width': resized.width, 'height': resized.height}
+        for ext in enabled_formats():
+            entry[ext] = _store(f"variants/{digest[:2]}/{digest}/{slot}.{ext}",
+                                lambda resized=resized, ext=ext: _encode(resized, ext))
+        record['slots'][slot] = entry
+    return record
+
+
+def process(instance, field_name, variants_field, upload_dir, slots):
+    """
+    Build variants for instance.<field_name> and point the field at the cleaned
+    original. Returns the variants record, or None if there is no image.
+    """
+    model = type(instance)
+    for _ in range(3):
+        field_file = getattr(instance, field_name)
+        if not field_file:
+            return None
+        current = getattr(instance, variants_field) or {}
+        if current.get('original') == field_file.name:
+            return current  # Already processed
+        raw_name = field_file.name
+        with default_storage.open(raw_name, 'rb') as f:
+            data = f.read()
+        record = build_variants(data, upload_dir, slots)
+
+        # Conditional on the field still holding the upload we processed;
+        # update() on purpose, so the model's post_save work is not repeated
+        changes = {field_name: record['original'], variants_field: record}
+        if hasattr(model, 'updated_at'):
+            changes['updated_at'] = timezone.now()  # The image URL is part of the API's representation
+        updated = model.objects.filter(pk=instance.pk, **{field_name: raw_name}).update(**changes)
+        if updated:
+            if raw_name != record['original'] and not model.objects.filter(**{field_name: raw_name}).exists():
+                default_storage.delete(raw_name)  # The raw upload still carries its EXIF
+            logger.info("Processed %s %s image %s", model.__name__, instance.pk, record['hash'][:12])
+            return record
+        # Replaced by a new upload while we worked: go again with the new file
+        instance.refresh_from_db(fields=[field_name, variants_field])
+    return None
+
+
+def process_issue_image(issue):
+    record = process(issue, 'image', 'image_variants', 'issue_images', ISSUE_IMAGE_SLOTS)
+    # Written with update(): no post_save to bump the recent-issues table showing the thumb
+    fragments.bump(fragments.user_issues_scope(issue.reported_by_id_id))
+    return record
+
+
+def process_profile_picture(user):
+    record = process(user, 'profile_picture', 'profile_picture_variants', 'profile_pics', PROFILE_PICTURE_SLOTS)
+    auth.forget(user.pk)  # Written with update(): no post_save to drop the cached resident
+    return record
+
+
+def needs_processing(field_file, variants):
+    return bool(field_file) and (variants or {}).get('original') != field_file.name
+
+
+def schedule(instance):
+    """Queue (or, with IMAGE_PIPELINE_MODE='sync', run) the pipeline for an Issue or UserDetails."""
+    from .jobs import enqueue
+    mode = settings.IMAGE_PIPELINE_MODE
+    if mode == 'off':
+        return
+    if isinstance(instance, Issue):
+        if mode == 'sync':
+            process_issue_image(instance)
+        else:
+            enqueue('issue_image', issue=instance)
+    elif isinstance(instance, UserDetails):
+        if mode == 'sync':
+            process_profile_picture(instance)
+        else:
+            enqueue('profile_picture', user=instance)
@@ -0,0 +1,261 @@
+"""
+Database-backed job queue.
+
+Jobs are BackgroundJob rows. enqueue() is safe to call on every request: the
+partial unique constraints keep one live job per (kind, issue) and per
+(kind, user). Workers claim
+rows with a conditional UPDATE, so several worker processes can share a
+database without locking support beyond what SQLite offers.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BackgroundJob, Issue, Solution, UserDetails
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('pending', 'running')
+NO_SUGGESTIONS = "No usable suggestions in the reply"
+
+
+class GiveUp(Exception):
+    """Raised by a handler when retrying straight away would not help: the job fails without retries."""
+
+
+def _handle_ai_solution(job):
+    # A backlog of AI jobs is answered a prompt at a time, not an issue at a
+    # time: take up to AI_GENERATION_BATCH_SIZE - 1 more queued issues along
+    from .generation import generate
+    riders = claim_riders(job, settings.AI_GENERATION_BATCH_SIZE - 1)
+    issue_ids = [job.issue_id, *[rider.issue_id for rider in riders]]
+    try:
+        generate(issue_ids)
+    except Exception:
+        release(riders)
+        raise
+    # An issue left without AI suggestions (all rejected by validation) fails,
+    # so enqueue_ai_solution() waits out the cooldown instead of queueing
+    # another paid call on the next page view
+    answered = set(Solution.objects.filter(issue_id__in=issue_ids, is_ai=True).values_list('issue_id', flat=True))
+    for rider in riders:
+        _finish(rider, *(('done', '') if rider.issue_id in answered else ('failed', NO_SUGGESTIONS)))
+    if job.issue_id not in answered:
+        raise GiveUp(NO_SUGGESTIONS)
+
+
+def _handle_issue_image(job):
+    from .images import process_issue_image
+    process_issue_image(job.issue)
+
+
+def _handle_profile_picture(job):
+    from .images import process_profile_picture
+    process_profile_picture(job.user)
+
+
+def _handle_chat_compaction(job):
+    from .chat import compact_for
+    compact_for(job.user)
+
+
+HANDLERS = {
+    'ai_solution': _handle_ai_solution,
+    'issue_image': _handle_issue_image,
+    'profile_picture': _handle_profile_picture,
+    'chat_compaction': _handle_chat_compaction,
+}
+
+
+def enqueue(kind, issue=None, max_attempts=None, user=None):
+    """Create a pending job, or return the live one already queued for this issue (or user)."""
+    existing = BackgroundJob.objects.filter(kind=kind, issue=issue, user=user, status__in=ACTIVE_STATUSES).first()
+    if existing:
+        return existing
+    try:
+        with transaction.atomic():
+            return BackgroundJob.objects.create(
+                kind=kind,
+                issue=issue,
+                user=user,
+                max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+            )
+    except IntegrityError:
+        # Lost the race to a concurrent enqueue; theirs is as good as ours
+        return BackgroundJob.objects.filter(kind=kind, issue=issue, user=user, status__in=ACTIVE_STATUSES).first()
+
+
+def enqueue_ai_solution(issue, allow=None):
+    """
+    Make sure an AI suggestion is on its way for `issue`.
+
+    A job that already gave up (the API kept failing, or its replies held no
+    usable suggestion) is not retried until JOB_RETRY_COOLDOWN_SECONDS have
+    passed, so every page view does not turn into another OpenAI call. `allow`,
+    if given, is asked before a new job is queued (see app/ratelimit.py);
+    None is returned when it says no.
+    """
+    last = BackgroundJob.objects.filter(kind='ai_solution', issue=issue).order_by('-id').first()
+    if last and last.status in ACTIVE_STATUSES:
+        return last
+    if last and last.status == 'failed':
+        cooldown = timedelta(seconds=settings.JOB_RETRY_COOLDOWN_SECONDS)
+        if last.finished_at and timezone.now() - last.finished_at < cooldown:
+            return last
+    if allow is not None and not allow():
+        return None
+    return enqueue('ai_solution', issue=issue)
+
+
+def backoff_delay(attempts):
+    """Exponential backoff with jitter, capped at JOB_BACKOFF_MAX_SECONDS."""
+    delay = min(settings.JOB_BACKOFF_BASE_SECONDS * (2 ** (attempts - 1)), settings.JOB_BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_next(worker_id):
+    """Atomically take the oldest runnable job, or return None."""
+    now = timezone.now()
+    candidates = (BackgroundJob.objects
+                  .filter(status='pending', run_after__lte=now)
+                  .order_by('run_after', 'id')
+                  .values_list('id', flat=True)[:10])
+    for job_id in candidates:
+        claimed = BackgroundJob.objects.filter(id=job_id, status='pending').update(
+            status='running', locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return BackgroundJob.objects.select_related('issue', 'user').get(id=job_id)
+    return None
+
+
+def claim_riders(job, limit):
+    """
+    Claim up to `limit` more runnable jobs of the same kind to run with `job`.
+    Their attempts are not counted: only the job that leads the batch retries.
+    """
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    candidates = (BackgroundJob.objects
+                  .filter(kind=job.kind, status='pending', run_after__lte=now)
+                  .order_by('run_after', 'id')
+                  .values_list('id', flat=True)[:limit])
+    claimed = []
+    for job_id in candidates:
+        if BackgroundJob.objects.filter(id=job_id, status='pending').update(
+                status='running', locked_by=job.locked_by, locked_at=now):
+            claimed.append(job_id)
+    return list(BackgroundJob.objects.filter(id__in=claimed))
+
+
+def release(jobs):
+    """Put claimed riders back in the queue untouched."""
+    BackgroundJob.objects.filter(id__in=[job.id for job in jobs], status='running').update(
+        status='pending', locked_by='', locked_at=None,
+    )
+
+
+def run_job(job):
+    handler = HANDLERS[job.kind]
+    try:
+        handler(job)
+    except (Issue.DoesNotExist, UserDetails.DoesNotExist):
+        _finish(job, 'failed', "Target no longer exists")
+    except GiveUp as e:
+        logger.warning("Job %s gave up: %s", job.pk, e)
+        _finish(job, 'failed', str(e))
+    except Exception as e:
+        logger.warning("Job %s attempt %s failed: %s", job.pk, job.attempts, e)
+        if job.attempts >= job.max_attempts:
+            _finish(job, 'failed', str(e))
+        else:
+            BackgroundJob.objects.filter(id=job.id).update(
+                status='pending',
+                run_after=timezone.now() + timedelta(seconds=backoff_delay(job.attempts)),
+                locked_by='',
+                locked_at=None,
+                last_error=str(e),
+            )
+    else:
+        _finish(job, 'done', '')
+
+
+def _finish(job, status, error):
+    BackgroundJob.objects.filter(id=job.id).update(
+        status=status, last_error=error, finished_at=timezone.now(), locked_by='', locked_at=None,
+    )
+
+
+def requeue_stale():
+    """Put back jobs whose worker died mid-run (locked for longer than JOB_STALE_SECONDS)."""
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_STALE_SECONDS)
+    return BackgroundJob.objects.filter(status='running', locked_at__lt=cutoff).update(
+        status='pending', locked_by='', locked_at=None,
+    )
+
+
+def run_pending(worker_id=None, limit=None):
+    """Run runnable jobs in this thread until the queue is empty (or `limit` is hit)."""
+    worker_id = worker_id or default_worker_id()
+    done = 0
+    while limit is None or done < limit:
+        job = claim_next(worker_id)
+        if job is None:
+            break
+        run_job(job)
+        done += 1
+    return done
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+class Worker:
+    """
+    Pool of threads polling the queue. Each thread claims and runs one job at a
+    time; the OpenAI calls are I/O-bound so threads are enough.
+    """
+
+    def __init__(self, concurrency=4, poll_interval=1.0):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self, once=False):
+        requeue_stale()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='job-worker') as pool:
+            futures = [pool.submit(self._loop, once) for _ in range(self.concurrency)]
+            try:
+                for future in futures:
+                    future.result()
+            except KeyboardInterrupt:
+                # Let the threads finish their current job before the pool shuts down
+                self.stop()
+                raise
+
+    def _loop(self, once):
+        worker_id = default_worker_id()
+        try:
+            while not self._stop.is_set():
+                close_old_connections()
+                ran = run_pending(worker_id, limit=1)
+                if not ran:
+                    if once:
+                        break
+                    self._stop.wait(self.poll_interval)
+        finally:
+            connection.close()
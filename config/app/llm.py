@@ -0,0 +1,215 @@
+"""
+OpenAI client factory.
+
+Everything that talks to OpenAI goes through get_client() so the real client
+is only built when first needed and can be swapped for FakeOpenAI
+(AI_CLIENT = 'fake' in settings) when running locally or in tests.
+"""
+import asyncio
+import json
+import re
+import ssl
+import threading
+import time
+import weakref
+from types import SimpleNamespace
+
+from django.conf import settings
+
+_client = None
+_async_client = None  # Explicit override (tests); otherwise one client per event loop
+_async_clients = weakref.WeakKeyDictionary()
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = build_client()
+    return _client
+
+
+def build_client():
+    if getattr(settings, 'AI_CLIENT', 'openai') == 'fake':
+        return FakeOpenAI(latency=getattr(settings, 'AI_FAKE_LATENCY', 0.0))
+    from openai import OpenAI
+    return OpenAI(api_key=settings.OPEN_API_KEY, base_url=settings.AI_BASE_URL)
+
+
+def set_client(client):
+    """Replace the shared client (e.g. with a FakeOpenAI). Pass None to reset."""
+    global _client
+    with _client_lock:
+        _client = client
+
+
+def get_async_client():
+    """
+    AsyncOpenAI counterpart of get_client(), for async views and streaming.
+
+    The underlying HTTP pool belongs to the event loop it was created on, so
+    there is one client per loop: one per worker under ASGI, one per request
+    when async views run under WSGI.
+    """
+    if _async_client is not None:
+        return _async_client
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = build_async_client()
+    return client
+
+
+def build_async_client():
+    if getattr(settings, 'AI_CLIENT', 'openai') == 'fake':
+        return FakeAsyncOpenAI(latency=getattr(settings, 'AI_FAKE_LATENCY', 0.0))
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+    # Loading the CA bundle dominates client start-up; share one SSL context
+    # so per-loop clients (WSGI) stay cheap
+    return AsyncOpenAI(
+        api_key=settings.OPEN_API_KEY,
+        base_url=settings.AI_BASE_URL,
+        http_client=DefaultAsyncHttpxClient(verify=_shared_ssl_context()),
+    )
+
+
+_ssl_context = None
+
+
+def _shared_ssl_context():
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = ssl.create_default_context()
+    return _ssl_context
+
+
+def set_async_client(client):
+    """Use `client` on every event loop (e.g. a FakeAsyncOpenAI). Pass None to reset."""
+    global _async_client
+    with _client_lock:
+        _async_client = client
+        _async_clients.clear()
+
+
+class FakeOpenAI:
+    """
+    Offline stand-in for openai.OpenAI exposing chat.completions.create().
+
+    Replies are canned: JSON requests get ranked solution objects (as many as
+    the prompt asks for, for every issue it lists), anything else gets a plain
+    sentence. Token usage is estimated from the text. `fail_times` makes the
+    first N calls raise so retry paths can be exercised, and `latency`
+    simulates a slow API.
+    """
+
+    def __init__(self, latency=0.0, fail_times=0, reply=None):
+        self.latency = latency
+        self.fail_times = fail_times
+        self.reply = reply
+        self.calls = []
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model=None, messages=None, response_format=None, **kwargs):
+        with self._lock:
+            self.calls.append({'model': model, 'messages': messages, 'response_format': response_format})
+            should_fail = self.fail_times > 0
+            if should_fail:
+                self.fail_times -= 1
+        if self.latency:
+            time.sleep(self.latency)
+        if should_fail:
+            raise RuntimeError("FakeOpenAI: simulated API failure")
+        return _completion(self._content(messages, response_format), _prompt_text(messages))
+
+    def _content(self, messages, response_format):
+        if self.reply is not None:
+            return self.reply
+        if response_format and response_format.get('type') in ('json_object', 'json_schema'):
+            # Batched prompts list issues as "Issue <id>: ..." and ask for
+            # "Suggest <n> ..." each; answer every issue with n ranked solutions
+            prompt = messages[-1]['content'] if messages else ''
+            issue_ids = [int(i) for i in re.findall(r'^Issue (\d+):', prompt, re.MULTILINE)]
+            count = re.match(r'Suggest (\d+) ', prompt)
+            solutions = [
+                {
+                    'rank': rank,
+                    'title': title,
+                    'description': 'Shut off the local supply if safe and log a maintenance visit.',
+                    'confidence': 70 - 15 * (rank - 1),
+                }
+                for rank, title in enumerate(FAKE_TITLES[:int(count.group(1)) if count else 1], start=1)
+            ]
+            if issue_ids:
+                return json.dumps({'solutions': [dict(solution, issue_id=i) for i in issue_ids
+                                                 for solution in solutions]})
+            return json.dumps({'solutions': solutions})
+        return "Please contact building maintenance; they will follow up shortly."
+
+
+FAKE_TITLES = ['Call building maintenance', 'Check the shut-off valve', 'Ask a neighbour to check theirs',
+               'Photograph the damage', 'Contact the insurer']
+
+
+def _completion(content, prompt=''):
+    message = SimpleNamespace(role='assistant', content=content)
+    # Roughly four characters per token, like English text on OpenAI's tokenizers
+    prompt_tokens, completion_tokens = len(prompt) // 4, len(content) // 4
+    usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                            total_tokens=prompt_tokens + completion_tokens)
+    return SimpleNamespace(choices=[SimpleNamespace(index=0, message=message, finish_reason='stop')], usage=usage)
+
+
+def _prompt_text(messages):
+    return ''.join(message.get('content') or '' for message in messages or ())
+
+
+class FakeAsyncOpenAI(FakeOpenAI):
+    """
+    Async variant of FakeOpenAI. With stream=True the reply is delivered word by
+    word, `token_delay` seconds apart, like the real streaming API.
+    """
+
+    def __init__(self, latency=0.0, fail_times=0, reply=None, token_delay=0.0):
+        super().__init__(latency=latency, fail_times=fail_times, reply=reply)
+        self.token_delay = token_delay
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._acreate))
+
+    async def _acreate(self, model=None, messages=None, response_format=None, stream=False, **kwargs):
+        with self._lock:
+            self.calls.append({'model': model, 'messages': messages, 'response_format': response_format})
+            should_fail = self.fail_times > 0
+            if should_fail:
+                self.fail_times -= 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if should_fail:
+            raise RuntimeError("FakeOpenAI: simulated API failure")
+        content = self._content(messages, response_format)
+        if stream:
+            return _FakeStream(content, self.token_delay)
+        return _completion(content, _prompt_text(messages))
+
+
+class _FakeStream:
+    def __init__(self, content, token_delay):
+        self._tokens = re.findall(r'\S+\s*', content)
+        self._token_delay = token_delay
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for token in self._tokens:
+            if self.closed:
+                return
+            if self._token_delay:
+                await asyncio.sleep(self._token_delay)
+            delta = SimpleNamespace(content=token, role=None)
+            yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=delta, finish_reason=None)])
+
+    async def close(self):
+        self.closed = True
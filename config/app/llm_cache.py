@@ -0,0 +1,139 @@
+"""
+Persistent cache in front of the OpenAI client.
+
+Answers are stored in LLMCacheEntry keyed on the normalized issue text plus
+the model and prompt version, so "Pipe is leaking!" and "pipe leaking" share
+one paid call. Entries expire after LLM_CACHE_TTL_SECONDS and the least
+recently used ones are evicted once the table grows past
+LLM_CACHE_MAX_ENTRIES. Hits and misses are counted in app.metrics.
+"""
+import hashlib
+import json
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from . import metrics
+from .models import LLMCacheEntry
+
+# Bump when the solution prompts change in a way that makes old answers stale
+SOLUTION_PROMPT_VERSION = 'solution-v2'
+
+STOPWORDS = frozenset("""
+a an the is are was were be been being am in on at of to for from with by and or but
+my our your their his her its this that these there here it i we you they me us
+please help very so too not no any some has have had do does did can could would should
+""".split())
+# Stopwords that change what is being asked ("heater not working", "can I
+# reset it"): search and similarity drop them, the cache key keeps them
+MEANINGFUL = frozenset("not no can could would should".split())
+KEY_STOPWORDS = STOPWORDS - MEANINGFUL
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+_SUFFIXES = ('ing', 'ed', 'es', 's')
+
+
+def stem(word):
+    for suffix in _SUFFIXES:
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def normalize(*parts):
+    """
+    Lowercase, drop punctuation and filler words, crude-stem. The words keep
+    their order and repeats: "door won't lock" is not "lock won't door".
+    """
+    words = WORD_RE.findall(" ".join(p or '' for p in parts).lower())
+    return " ".join(stem(w) for w in words if w not in KEY_STOPWORDS)
+
+
+def make_key(normalized_text, model, prompt_version):
+    raw = f"{model}\x1f{prompt_version}\x1f{normalized_text}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def get(normalized_text, model=None, prompt_version=SOLUTION_PROMPT_VERSION):
+    """Return the cached response text, or None on a miss."""
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    model = model or settings.AI_MODEL
+    key = make_key(normalized_text, model, prompt_version)
+    now = timezone.now()
+    entry = LLMCacheEntry.objects.filter(key=key, expires_at__gt=now).only('id', 'response').first()
+    if entry is None:
+        metrics.incr('llm_cache.miss')
+        return None
+    LLMCacheEntry.objects.filter(id=entry.id).update(hits=F('hits') + 1, last_used_at=now)
+    metrics.incr('llm_cache.hit')
+    return entry.response
+
+
+def put(normalized_text, response, model=None, prompt_version=SOLUTION_PROMPT_VERSION):
+    if not settings.LLM_CACHE_ENABLED:
+        return
+    model = model or settings.AI_MODEL
+    key = make_key(normalized_text, model, prompt_version)
+    now = timezone.now()
+    values = {
+        'model': model,
+        'prompt_version': prompt_version,
+        'normalized_text': normalized_text,
+        'response': response,
+        'last_used_at': now,
+        'expires_at': now + timedelta(seconds=settings.LLM_CACHE_TTL_SECONDS),
+    }
+    try:
+        with transaction.atomic():
+            _, created = LLMCacheEntry.objects.update_or_create(key=key, defaults=values)
+    except IntegrityError:
+        # A concurrent writer stored the same key first
+        return
+    metrics.incr('llm_cache.store')
+    if created:
+        evict()
+
+
+def get_solutions(title, description, model=None):
+    """Cached solution list (parsed) for an issue's text, or None."""
+    cached = get(normalize(title, description), model=model)
+    return json.loads(cached) if cached is not None else None
+
+
+def put_solutions(title, description, solutions, model=None):
+    put(normalize(title, description), json.dumps(solutions), model=model)
+
+
+def evict(max_entries=None):
+    """Delete expired rows, then the least recently used beyond `max_entries`."""
+    max_entries = max_entries if max_entries is not None else settings.LLM_CACHE_MAX_ENTRIES
+    removed, _ = LLMCacheEntry.objects.filter(expires_at__lte=timezone.now()).delete()
+    overflow = LLMCacheEntry.objects.count() - max_entries
+    if overflow > 0:
+        stale_ids = list(LLMCacheEntry.objects.order_by('last_used_at').values_list('id', flat=True)[:overflow])
+        removed += LLMCacheEntry.objects.filter(id__in=stale_ids).delete()[0]
+    if removed:
+        metrics.incr('llm_cache.evicted', removed)
+    return removed
+
+
+def purge():
+    return LLMCacheEntry.objects.all().delete()[0]
+
+
+def stats():
+    counters = metrics.snapshot()['counters']
+    hits, misses = counters.get('llm_cache.hit', 0), counters.get('llm_cache.miss', 0)
+    return {
+        'entries': LLMCacheEntry.objects.count(),
+        'expired': LLMCacheEntry.objects.filter(expires_at__lte=timezone.now()).count(),
+        'lifetime_hits': LLMCacheEntry.objects.aggregate(total=Sum('hits'))['total'] or 0,
+        'process_hits': hits,
+        'process_misses': misses,
+        'process_hit_rate': round(hits / (hits + misses), 3) if hits + misses else 0.0,
+    }
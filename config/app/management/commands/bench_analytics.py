@@ -0,0 +1,104 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from app import analytics
+from app.models import Issue, Solution, UserDetails, WeeklyIssueStats
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the manager analytics on a throwaway test database with a multi-year issue history: "
+        "full rollup build, the summary, and the incremental refresh after new activity."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=int, default=3)
+        parser.add_argument('--per-day', type=int, default=40, help="Issues reported per day.")
+        parser.add_argument('--flats', type=int, default=300)
+
+    def handle(self, *args, **options):
+        runner = DiscoverRunner(interactive=False, verbosity=0)
+        old_config = runner.setup_databases()  # The test runner's database (see DATABASES TEST)
+        try:
+            with override_settings(AI_DISPATCH_MODE='off', FRAGMENT_CACHE_ENABLED=False):
+                total = self.seed(options['years'], options['per_day'], options['flats'])
+                self.stdout.write(f"{total} issues over {options['years']} year(s), "
+                                  f"{Solution.objects.count()} solutions, {options['flats']} flats")
+
+                weeks = self.timed("full refresh", lambda: analytics.refresh(full=True))
+                self.stdout.write(f"  {weeks} weeks written")
+                with CaptureQueriesContext(connection) as queries:
+                    summary = self.timed("summary", analytics.build_summary)
+                self.stdout.write(f"  {len(queries)} queries, mean {summary['resolution_time']['mean_days']} days "
+                                  f"to resolve, AI acceptance {summary['solutions']['ai']['acceptance_rate']}")
+
+                # New activity: an issue today, and one from a month ago resolved
+                reporter = UserDetails.objects.first()
+                Issue.objects.create(title='New', description='today', reported_by_id=reporter)
+                old = (Issue.objects.exclude(status='Resolved')
+                       .filter(reported_date__lte=timezone.localdate() - timedelta(days=30))
+                       .order_by('-reported_date').first())
+                old.status = 'Resolved'
+                old.save()
+                weeks = self.timed("incremental refresh", analytics.refresh)
+                expected = (analytics.week_start(timezone.localdate()) - analytics.week_start(old.reported_date)).days // 7 + 1
+                self.stdout.write(f"  {weeks} weeks written (back to {old.reported_date})")
+                self.timed("refresh, nothing changed", analytics.refresh)
+
+                fresh = {row.week: row for row in WeeklyIssueStats.objects.all()}
+                analytics.refresh(full=True)
+                rebuilt = {row.week: row for row in WeeklyIssueStats.objects.all()}
+                differs = [week for week, row in rebuilt.items()
+                           if (row.reported, row.resolved, row.resolution_seconds)
+                           != (fresh[week].reported, fresh[week].resolved, fresh[week].resolution_seconds)]
+                if weeks != expected or differs:
+                    raise CommandError(f"Incremental refresh wrote {weeks} weeks (expected {expected}); "
+                                       f"{len(differs)} week(s) differ from a full rebuild.")
+                self.stdout.write(self.style.SUCCESS("Incremental refresh matches a full rebuild."))
+        finally:
+            runner.teardown_databases(old_config)
+
+    def timed(self, label, fn):
+        start = time.perf_counter()
+        result = fn()
+        self.stdout.write(f"{label:28} {(time.perf_counter() - start) * 1000:8.1f}ms")
+        return result
+
+    def seed(self, years, per_day, flats):
+        rng = random.Random(7)
+        residents = UserDetails.objects.bulk_create([
+            UserDetails(email=f'resident{i}@example.com', password='x', flat_number=str(i), role='owner')
+            for i in range(flats)
+        ])
+        today = timezone.localdate()
+        total = 0
+        for offset in range(years * 365, 0, -1):
+            day = today - timedelta(days=offset)
+            reported = timezone.make_aware(timezone.datetime.combine(day, timezone.datetime.min.time()))
+            issues = []
+            for _ in range(per_day):
+                resolved = rng.random() < 0.8
+                issues.append(Issue(
+                    title='Leak', description='history', reported_by_id=rng.choice(residents),
+                    status='Resolved' if resolved else rng.choice(['Open', 'In Review']),
+                    resolved_at=reported + timedelta(hours=rng.expovariate(1 / 72)) if resolved else None,
+                ))
+            issues = Issue.objects.bulk_create(issues)
+            # reported_date is auto_now_add, so bulk_create stamps today
+            Issue.objects.filter(id__in=[issue.id for issue in issues]).update(reported_date=day)
+            Solution.objects.bulk_create([
+                Solution(title='Fix', description='history', issue=issue, is_ai=is_ai, is_ai_generated=is_ai,
+                         confidence=rng.random() * 100 if is_ai else 0.0,
+                         status='Accepted' if issue.status == 'Resolved' and rng.random() < 0.5 else 'Pending')
+                for issue in issues for is_ai in (True, False)
+            ])
+            total += len(issues)
+        return total
@@ -0,0 +1,90 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.test import AsyncClient, Client, override_settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment
+
+from app import llm
+from app.fake_llm_server import FakeLLMServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark chat_api throughput against a local fake LLM server with artificial latency: "
+        "a pool of sync (WSGI-style) workers vs. one ASGI event loop, on a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Requests per profile.")
+        parser.add_argument('--latency', type=float, default=0.5, help="Fake LLM latency in seconds.")
+        parser.add_argument('--sync-workers', type=int, default=8,
+                            help="Concurrent sync workers for the WSGI profile (gunicorn -w).")
+        parser.add_argument('--concurrency', type=int, default=100,
+                            help="Concurrent in-flight requests for the ASGI profile.")
+
+    def handle(self, *args, **options):
+        setup_test_environment()  # Lets the test clients use the 'testserver' host
+        runner = DiscoverRunner(interactive=False, verbosity=0)
+        old_config = runner.setup_databases()  # The test runner's database (see DATABASES TEST)
+        server = FakeLLMServer(latency=options['latency']).start()
+        self.stdout.write(f"Fake LLM at {server.base_url}, latency {options['latency']}s, "
+                          f"{options['requests']} requests per profile\n")
+        # Every request comes from the one test client address: without this
+        # the 'chat' bucket would answer all but the first few with 429. The
+        # burst covers both profiles' requests, whatever the refill meanwhile
+        unlimited = {scope: (2 * options['requests'], 60 * options['requests']) for scope in settings.RATE_LIMITS}
+        # The real SDK, pointed at the fake server
+        with override_settings(AI_CLIENT='openai', AI_BASE_URL=server.base_url, OPEN_API_KEY='bench',
+                               RATE_LIMITS=unlimited, AI_DAILY_TOKEN_BUDGET=0, AI_DAILY_COST_BUDGET=0):
+            llm.set_client(None)
+            llm.set_async_client(None)
+            try:
+                self.report('wsgi', options['sync_workers'],
+                            *self.run_sync(options['requests'], options['sync_workers']))
+                self.report('asgi', options['concurrency'],
+                            *asyncio.run(self.run_async(options['requests'], options['concurrency'])))
+            finally:
+                llm.set_client(None)
+                llm.set_async_client(None)
+                server.stop()
+                runner.teardown_databases(old_config)
+
+    def run_sync(self, total, workers):
+        def one(_):
+            client = Client()
+            start = time.perf_counter()
+            response = client.post('/chat_api/', {'message': 'Is the lift working?'})
+            return time.perf_counter() - start, response.status_code
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(one, range(total)))
+        return time.perf_counter() - start, results
+
+    async def run_async(self, total, concurrency):
+        client = AsyncClient()
+        gate = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with gate:
+                start = time.perf_counter()
+                response = await client.post('/chat_api/', {'message': 'Is the lift working?'})
+                return time.perf_counter() - start, response.status_code
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one() for _ in range(total)))
+        return time.perf_counter() - start, results
+
+    def report(self, profile, concurrency, elapsed, results):
+        latencies = sorted(latency for latency, _ in results)
+        errors = sum(1 for _, status in results if status != 200)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(
+            f"{profile:5} concurrency={concurrency:<4} {len(results) / elapsed:8.1f} req/s  "
+            f"p50={statistics.median(latencies) * 1000:7.1f}ms  p95={p95 * 1000:7.1f}ms  errors={errors}"
+        )
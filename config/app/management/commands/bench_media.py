@@ -0,0 +1,127 @@
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment
+from django.urls import re_path
+from django.views.static import serve as static_serve
+from PIL import Image
+
+
+def _static_view(request, path):
+    # What config/urls.py used before app/media.py: django.conf.urls.static.static()
+    return static_serve(request, path, document_root=settings.MEDIA_ROOT)
+
+
+# ROOT_URLCONF for the 'static()' profile
+urlpatterns = [re_path(r'^media/(?P<path>.*)$', _static_view)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark photo serving through the full middleware stack: the old static() helper "
+        "vs. app/media.py (FileResponse, conditional GET, byte ranges, X-Accel-Redirect handoff). "
+        "The test client does not use wsgi.file_wrapper, so sendfile() savings come on top."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--photos', type=int, default=20)
+        parser.add_argument('--size', type=int, default=1600, help="Photo width in pixels.")
+        parser.add_argument('--requests', type=int, default=500, help="Requests per profile.")
+        parser.add_argument('--workers', type=int, default=8)
+
+    def handle(self, *args, **options):
+        setup_test_environment()  # Lets the test client use the 'testserver' host
+        media_root = tempfile.mkdtemp(prefix='bench-media-')
+        try:
+            paths = self.make_photos(media_root, options['photos'], options['size'])
+            sizes = {path: os.path.getsize(os.path.join(media_root, path)) for path in paths}
+            self.stdout.write(f"{len(paths)} photos, {statistics.mean(sizes.values()) / 1024:.0f} KiB average, "
+                              f"{options['requests']} requests per profile, {options['workers']} workers\n")
+            with override_settings(MEDIA_ROOT=media_root):
+                etags = self.check_correctness(media_root, paths)
+                profiles = [
+                    ('static()', {'ROOT_URLCONF': __name__}, {}),
+                    ('static() revalidate', {'ROOT_URLCONF': __name__},
+                     {'HTTP_IF_MODIFIED_SINCE': 'Fri, 01 Jan 2100 00:00:00 GMT'}),
+                    ('media', {}, {}),
+                    ('media revalidate', {}, 'etag'),
+                    ('media range 64K', {}, {'HTTP_RANGE': 'bytes=0-65535'}),
+                    ('media x-accel', {'MEDIA_SERVE_MODE': 'x-accel-redirect'}, {}),
+                ]
+                for name, overrides, headers in profiles:
+                    with override_settings(**overrides):
+                        self.report(name, *self.run(paths, etags, headers, options['requests'], options['workers']))
+        finally:
+            shutil.rmtree(media_root)
+
+    def make_photos(self, media_root, count, width):
+        rng = random.Random(1)
+        os.makedirs(os.path.join(media_root, 'issue_images'))
+        paths = []
+        for n in range(count):
+            # Noise compresses like a real photo would, unlike a flat colour
+            height = width * 3 // 4
+            image = Image.frombytes('RGB', (width // 8, height // 8), rng.randbytes(width // 8 * (height // 8) * 3))
+            image = image.resize((width, height), Image.Resampling.BICUBIC)
+            out = BytesIO()
+            image.save(out, 'JPEG', quality=85)
+            path = f'issue_images/photo{n}.jpg'
+            with open(os.path.join(media_root, path), 'wb') as f:
+                f.write(out.getvalue())
+            paths.append(path)
+        return paths
+
+    def check_correctness(self, media_root, paths):
+        """ETag per photo, after checking full, ranged and conditional responses are right."""
+        client = Client()
+        etags = {}
+        for path in paths:
+            with open(os.path.join(media_root, path), 'rb') as f:
+                body = f.read()
+            response = client.get(f'/media/{path}')
+            if response.status_code != 200 or b''.join(response.streaming_content) != body:
+                raise CommandError(f"Full GET of {path} returned the wrong body.")
+            etags[path] = response['ETag']
+            response = client.get(f'/media/{path}', HTTP_RANGE='bytes=100-199')
+            if response.status_code != 206 or b''.join(response.streaming_content) != body[100:200]:
+                raise CommandError(f"Range GET of {path} returned the wrong bytes.")
+            response = client.get(f'/media/{path}', HTTP_IF_NONE_MATCH=etags[path])
+            if response.status_code != 304:
+                raise CommandError(f"Conditional GET of {path} returned {response.status_code}, expected 304.")
+        return etags
+
+    def run(self, paths, etags, headers, total, workers):
+        def one(n):
+            path = paths[n % len(paths)]
+            extra = {'HTTP_IF_NONE_MATCH': etags[path]} if headers == 'etag' else headers
+            client = Client()
+            start = time.perf_counter()
+            response = client.get(f'/media/{path}', **extra)
+            if response.streaming:
+                size = sum(len(chunk) for chunk in response.streaming_content)
+            else:
+                size = len(response.content)
+            return time.perf_counter() - start, response.status_code, size
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(one, range(total)))
+        return time.perf_counter() - start, results
+
+    def report(self, name, elapsed, results):
+        latencies = sorted(latency for latency, _, _ in results)
+        statuses = sorted({status for _, status, _ in results})
+        sent = sum(size for _, _, size in results)
+        self.stdout.write(
+            f"{name:20} {len(results) / elapsed:8.1f} req/s  {sent / elapsed / 2 ** 20:8.1f} MiB/s  "
+            f"p50={statistics.median(latencies) * 1000:6.2f}ms  status={','.join(map(str, statuses))}"
+        )
@@ -0,0 +1,151 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+from django.utils import timezone
+
+from app import search
+from app.models import Issue, Solution, UserDetails
+
+ROOMS = ['kitchen', 'bathroom', 'bedroom', 'hallway', 'balcony', 'laundry', 'garage', 'lobby', 'roof', 'basement']
+THINGS = ['pipe', 'sink', 'toilet', 'window', 'door', 'heater', 'outlet', 'light', 'lock', 'ceiling',
+          'wall', 'floor', 'drain', 'shower', 'fan', 'boiler', 'radiator', 'elevator', 'intercom', 'mailbox']
+FAULTS = ['leaking', 'broken', 'cracked', 'noisy', 'stuck', 'blocked', 'flickering', 'dripping', 'jammed',
+          'loose', 'mouldy', 'cold', 'smelly', 'sparking', 'rusty']
+FIXES = ['replace', 'tighten', 'reseal', 'call', 'clean', 'adjust', 'reset', 'inspect']
+
+
+class Command(BaseCommand):
+    help = (
+        "Time issue search (app/search.py) on a throwaway test database: ranked and newest-first "
+        "full-text queries, status and date filters, deep keyset pages and the unfiltered "
+        "board. Fails if a query's p95 is over the budget."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--issues', type=int, default=1_000_000)
+        parser.add_argument('--years', type=int, default=3)
+        parser.add_argument('--runs', type=int, default=20, help="Timed runs per query.")
+        parser.add_argument('--budget-ms', type=float, default=50.0)
+
+    def handle(self, *args, **options):
+        runner = DiscoverRunner(interactive=False, verbosity=0)
+        old_config = runner.setup_databases()  # The test runner's database (see DATABASES TEST)
+        try:
+            with override_settings(AI_DISPATCH_MODE='off'):
+                start = time.perf_counter()
+                self.seed(options['issues'], options['years'])
+                self.stdout.write(f"Seeded {Issue.objects.count()} issues, {Solution.objects.count()} solutions "
+                                  f"in {time.perf_counter() - start:.0f}s")
+                self.check_sync()
+                over = self.bench(options['runs'], options['budget_ms'])
+        finally:
+            runner.teardown_databases(old_config)
+        if over:
+            raise CommandError(f"{len(over)} quer{'y' if len(over) == 1 else 'ies'} over "
+                               f"{options['budget_ms']:g}ms at p95: {', '.join(over)}")
+        self.stdout.write(self.style.SUCCESS(f"Every query under {options['budget_ms']:g}ms at p95."))
+
+    def seed(self, issue_count, years):
+        rng = random.Random(11)
+        # Pseudo-words, so descriptions have a long tail of rare terms like real text
+        filler = [''.join(rng.choice('bcdfghklmnprstvz') + rng.choice('aeiou') for _ in range(3))
+                  for _ in range(20_000)]
+        common = ROOMS + THINGS + FAULTS
+        residents = UserDetails.objects.bulk_create([
+            UserDetails(email=f'resident{i}@example.com', password='x', flat_number=str(i), role='owner')
+            for i in range(1000)
+        ])
+        days = years * 365
+        today = timezone.localdate()
+        per_day, extra = divmod(issue_count, days)
+        for offset in range(days):
+            count = per_day + (1 if offset < extra else 0)
+            issues = Issue.objects.bulk_create([
+                Issue(
+                    title=f"{rng.choice(FAULTS)} {rng.choice(THINGS)} in the {rng.choice(ROOMS)}",
+                    description=' '.join(rng.choice(filler) if rng.random() < 0.5 else rng.choice(common)
+                                         for _ in range(25)),
+                    status=rng.choice(['Open', 'In Review', 'Resolved', 'Resolved', 'Resolved']),
+                    reported_by_id=rng.choice(residents),
+                )
+                for _ in range(count)
+            ])
+            # reported_date is auto_now_add, so bulk_create stamped today
+            Issue.objects.filter(id__in=[issue.id for issue in issues]).update(
+                reported_date=today - timedelta(days=days - offset))
+            Solution.objects.bulk_create([
+                Solution(title='Fix', issue=issue,
+                         description=f"{rng.choice(FIXES)} the {rng.choice(THINGS)} {rng.choice(filler)}")
+                for issue in issues if rng.random() < 0.3
+            ])
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("INSERT INTO app_issue_search (app_issue_search) VALUES ('optimize')")
+                cursor.execute('ANALYZE')
+        elif connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def check_sync(self):
+        """The triggers follow edits, status changes, new solutions and deletes."""
+        issue = Issue.objects.order_by('-id').first()
+        Issue.objects.filter(id=issue.id).update(title='zyxwv boiler', status='Open')
+        found = [i.id for i in search.search('zyxwv').issues]
+        Solution.objects.create(title='Fix', description='qwertz valve', issue=issue)
+        by_solution = [i.id for i in search.search('qwertz', status='Open').issues]
+        Issue.objects.filter(id=issue.id).delete()
+        gone = [i.id for i in search.search('zyxwv').issues]
+        if found != [issue.id] or by_solution != [issue.id] or gone:
+            raise CommandError(f"Search index out of step: {found} {by_solution} {gone}")
+        self.stdout.write("Index follows updates, new solutions and deletes.")
+
+    def cases(self):
+        today = timezone.localdate()
+        month = (today.replace(day=1) - timedelta(days=200)).replace(day=1)
+        middle = Issue.objects.order_by('-reported_date', '-id')[Issue.objects.count() // 2]
+        rare = Issue.objects.order_by('?').values_list('description', flat=True).first().split()
+        rare = next((word for word in rare if word not in ROOMS + THINGS + FAULTS), rare[0])
+        ranked = search.search('leaking pipe')
+        return [
+            ("rare word", dict(text=rare)),
+            ("common word", dict(text='leaking')),
+            ("two words", dict(text='kitchen pipe')),
+            ("three words", dict(text='broken door lobby')),
+            ("common + status", dict(text='leaking', status='Open')),
+            ("common + one month", dict(text='leaking', reported_from=month,
+                                        reported_to=month + timedelta(days=30))),
+            ("two words + status + year", dict(text='kitchen pipe', status='Resolved',
+                                               reported_from=today - timedelta(days=365))),
+            ("ranked page 2", dict(text='leaking pipe', cursor=ranked.next_cursor)),
+            ("newest first", dict(text='leaking', sort='recent')),
+            ("newest first, deep page", dict(text='leaking', sort='recent', cursor=str(middle.id))),
+            ("board", dict()),
+            ("board + status", dict(status='In Review')),
+            ("board, deep page", dict(cursor=f"{middle.reported_date}:{middle.id}")),
+        ]
+
+    def bench(self, runs, budget_ms):
+        self.stdout.write(f"{'query':30} {'results':>7} {'p50':>8} {'p95':>8} {'max':>8}  "
+                          f"(rank window {settings.SEARCH_RANK_WINDOW})")
+        over = []
+        for label, params in self.cases():
+            search.search(**params)  # Warm the page cache; the first run reads from disk
+            timings = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                page = search.search(**params)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(0.95 * len(timings)))]
+            self.stdout.write(f"{label:30} {len(page.issues):7} {statistics.median(timings):7.1f}ms "
+                              f"{p95:7.1f}ms {timings[-1]:7.1f}ms")
+            if p95 > budget_ms:
+                over.append(label)
+        return over
@@ -0,0 +1,30 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from app import transfer
+
+
+class Command(BaseCommand):
+    help = "Stream residents, issues or solutions to CSV or JSON Lines without loading them into memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(transfer.MODELS))
+        parser.add_argument('--format', choices=list(transfer.FORMATS), default=None,
+                            help="Defaults to the --output extension, else csv.")
+        parser.add_argument('--output', '-o', default='-', help="File to write ('-' for stdout).")
+
+    def handle(self, *args, **options):
+        output = options['output']
+        fmt = options['format'] or ('jsonl' if output.endswith('.jsonl') else 'csv')
+        lines = transfer.export_lines(options['dataset'], fmt)
+        if output == '-':
+            for line in lines:
+                sys.stdout.write(line)
+            return
+        count = -1 if fmt == 'csv' else 0  # Not counting the CSV header
+        with open(output, 'w', encoding='utf-8', newline='') as f:
+            for line in lines:
+                f.write(line)
+                count += 1
+        self.stderr.write(self.style.SUCCESS(f"Exported {count} {options['dataset']} to {output}."))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        "Import residents, issues or solutions from CSV or JSON Lines in batches of bulk_create. "
+        "Everything is validated first; nothing is committed if any row fails. Columns are those "
+        "written by export_data (ids, vote counts and dates are not imported); residents may "
+        "have a password column, hashed on import."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(transfer.MODELS))
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=list(transfer.FORMATS), default=None,
+                            help="Defaults to the file extension (.jsonl, else csv).")
+        parser.add_argument('--batch-size', type=int, default=transfer.IMPORT_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help="Validate only, then roll back.")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or ('jsonl' if options['path'].endswith('.jsonl') else 'csv')
+        with open(options['path'], encoding='utf-8-sig', newline='') as f:
+            result = transfer.import_rows(options['dataset'], transfer.read_rows(f, fmt),
+                                          batch_size=options['batch_size'], dry_run=options['dry_run'])
+        for line, message in result.errors:
+            self.stderr.write(f"line {line}: {message}")
+        if result.error_count:
+            raise CommandError(f"{result.error_count} invalid row(s) of {result.rows}; nothing imported.")
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"{result.rows} row(s) valid (dry run, nothing imported)."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Imported {result.created} {result.dataset}."))
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app import generation, llm_cache
+from app.models import Issue
+
+
+class Command(BaseCommand):
+    help = "Inspect, warm or purge the persistent LLM response cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['stats', 'warm', 'purge', 'evict'])
+        parser.add_argument('--limit', type=int, default=200, help="warm: number of most recent issues to cover.")
+        parser.add_argument('--batch-size', type=int, default=10, help="warm: issues per OpenAI call.")
+
+    def handle(self, *args, **options):
+        action = options['action']
+        if action == 'stats':
+            for name, value in llm_cache.stats().items():
+                self.stdout.write(f"{name}: {value}")
+        elif action == 'purge':
+            self.stdout.write(self.style.SUCCESS(f"Removed {llm_cache.purge()} cache entries."))
+        elif action == 'evict':
+            self.stdout.write(self.style.SUCCESS(f"Evicted {llm_cache.evict()} expired/LRU entries."))
+        elif action == 'warm':
+            self.warm(options['limit'], options['batch_size'])
+
+    def warm(self, limit, batch_size):
+        if not settings.LLM_CACHE_ENABLED:
+            raise CommandError("LLM_CACHE_ENABLED is False.")
+
+        # One uncached issue per distinct normalized text; recurring titles need a single call
+        todo, seen = [], set()
+        for issue in Issue.objects.order_by('-id')[:limit]:
+            text = llm_cache.normalize(issue.title, issue.description)
+            if text in seen or llm_cache.get(text) is not None:
+                continue
+            seen.add(text)
+            todo.append(issue)
+
+        stored = 0
+        for start in range(0, len(todo), batch_size):
+            batch = todo[start:start + batch_size]
+            # Validated, logged as a GenerationCall and cached per issue
+            stored += len(generation.request_solutions(batch))
+        self.stdout.write(self.style.SUCCESS(f"Warmed {stored} entries from {len(todo)} uncached issue texts."))
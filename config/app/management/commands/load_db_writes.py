@@ -0,0 +1,125 @@
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection, connections
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+from app import voting
+from app.models import Issue, SiteNotification, Solution, UserDetails
+
+# Connection settings per SQLite profile; 'configured' runs DATABASES as it is
+SQLITE_PROFILES = {
+    # What DATABASES used to be: rollback journal, deferred transactions,
+    # sqlite3's 5s default timeout, a new connection per request
+    'sqlite-default': {'CONN_MAX_AGE': 0, 'OPTIONS': {}},
+    'sqlite-tuned': {
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {'init_command': '; '.join(settings.SQLITE_PRAGMAS), 'transaction_mode': 'IMMEDIATE'},
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Write-throughput load test: concurrent workers report issues (with their notification) "
+        "and cast votes, the writes behind reportIssue, vote_solution and the AI hook, on a "
+        "throwaway test database per profile. Reports writes/s, latency and 'database is locked' failures."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help="Concurrent writers (gunicorn workers/threads).")
+        parser.add_argument('--seconds', type=float, default=5.0, help="Duration per profile.")
+        parser.add_argument('--profile', action='append', dest='profiles',
+                            choices=[*SQLITE_PROFILES, 'configured'],
+                            help="Profile to run (repeatable). Default: both SQLite profiles on SQLite, "
+                                 "otherwise the configured database.")
+
+    def handle(self, *args, **options):
+        profiles = options['profiles'] or (list(SQLITE_PROFILES) if connection.vendor == 'sqlite' else ['configured'])
+        if connection.vendor != 'sqlite' and set(profiles) - {'configured'}:
+            raise CommandError("The sqlite-* profiles need the SQLite database (DJANGO_DB=sqlite).")
+        settings_dict = connection.settings_dict
+        saved = {key: settings_dict.get(key) for key in ('CONN_MAX_AGE', 'OPTIONS')}
+        failed = []
+        try:
+            for profile in profiles:
+                # Every thread's connection is built from this same dict
+                settings_dict.update(SQLITE_PROFILES.get(profile, saved))
+                connections.close_all()
+                runner = DiscoverRunner(interactive=False, verbosity=0)
+                old_config = runner.setup_databases()  # The test runner's database (see DATABASES TEST)
+                try:
+                    with override_settings(AI_DISPATCH_MODE='off', IMAGE_PIPELINE_MODE='off'):
+                        errors = self.run(profile, options['workers'], options['seconds'])
+                finally:
+                    runner.teardown_databases(old_config)
+                if errors:
+                    failed.append(profile)
+        finally:
+            settings_dict.update(saved)
+            connections.close_all()
+        # The untuned baseline is expected to fail; it is there for comparison
+        failed = [profile for profile in failed if profile != 'sqlite-default']
+        if failed:
+            raise CommandError(f"Writes failed under load with: {', '.join(failed)}.")
+
+    def seed(self, workers):
+        residents = UserDetails.objects.bulk_create([
+            UserDetails(email=f'writer{i}@example.com', password='x', flat_number=str(i), role='owner')
+            for i in range(workers)
+        ])
+        issue = Issue.objects.create(title='Load issue', description='load', reported_by_id=residents[0])
+        solution = Solution.objects.create(title='Load solution', description='load', issue=issue,
+                                           suggested_by=residents[0], is_voting_enabled=True)
+        return residents, solution
+
+    def run(self, profile, workers, seconds):
+        residents, solution = self.seed(workers)
+        results = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        def writer(n):
+            resident = UserDetails.objects.get(id=residents[n].id)
+            done = []
+            op = 0
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    if op % 2 == 0:
+                        # reportIssue: the issue (stats, similarity and cache signals) and its notification
+                        issue = Issue.objects.create(title=f'Issue {n}-{op}', description='Water leak in the lift lobby',
+                                                     reported_by_id=resident)
+                        SiteNotification.objects.create(title='New Issue Raised', message='load', issue=issue)
+                    else:
+                        # vote_solution, with the view's own retries; alternates so every vote writes
+                        voting.cast_vote(solution.id, resident, 'upvote' if op % 4 == 1 else 'downvote')
+                    done.append((time.perf_counter() - start, None))
+                except OperationalError as e:
+                    done.append((time.perf_counter() - start, str(e)))
+                op += 1
+                close_old_connections()  # End of "request"
+            connections.close_all()
+            with lock:
+                results.extend(done)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(writer, range(workers)))
+
+        latencies = sorted(latency for latency, error in results if error is None)
+        errors = Counter(error for _, error in results if error is not None)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0
+        self.stdout.write(
+            f"{profile:15} workers={workers:<3} {len(latencies) / seconds:8.1f} writes/s  "
+            f"p50={statistics.median(latencies) * 1000 if latencies else 0:7.1f}ms  p95={p95 * 1000:7.1f}ms  "
+            f"errors={sum(errors.values())}"
+        )
+        for message, count in errors.most_common(3):
+            self.stdout.write(f"    {count} x {message}")
+        return sum(errors.values())
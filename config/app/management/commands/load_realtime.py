@@ -0,0 +1,148 @@
+import asyncio
+import resource
+import statistics
+import time
+
+from asgiref.sync import sync_to_async
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment
+
+from app import realtime
+from app.models import Issue, SiteNotification, UserDetails
+
+
+class EventStream:
+    """One idle /events/ connection, driven straight through the ASGI application."""
+
+    def __init__(self, app, session_key, number):
+        self.app = app
+        self.scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': '/events/', 'raw_path': b'/events/',
+            'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'cookie', f'sessionid={session_key}'.encode())],
+            'client': ('127.0.0.1', 10000 + number), 'server': ('testserver', 80),
+        }
+        self.status = None
+        self.connected = asyncio.Event()
+        self.received = {}  # notification id -> arrival time
+        self._disconnect = asyncio.Event()
+        self._requested = False
+
+    async def run(self):
+        await self.app(self.scope, self.receive, self.send)
+
+    async def receive(self):
+        if not self._requested:
+            self._requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self._disconnect.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+            if self.status != 200:
+                self.connected.set()
+        elif message['type'] == 'http.response.body':
+            self.connected.set()
+            for chunk in message.get('body', b'').decode().split('\n\n'):
+                if chunk.startswith('event: notification'):
+                    note_id = int(chunk.split('"id": ', 1)[1].split(',', 1)[0])
+                    self.received[note_id] = time.perf_counter()
+
+    def disconnect(self):
+        self._disconnect.set()
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test for the realtime /events/ stream: opens thousands of idle server-sent "
+        "event connections against the ASGI application in this process, publishes "
+        "notifications and reports fan-out latency, memory per connection and cleanup."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=2000)
+        parser.add_argument('--notifications', type=int, default=5)
+        parser.add_argument('--idle', type=float, default=2.0, help="Seconds to hold the connections idle.")
+        parser.add_argument('--heartbeat', type=float, default=1.0, help="REALTIME_HEARTBEAT_SECONDS for the run.")
+        parser.add_argument('--broker', default='app.realtime.InProcessBroker', help="REALTIME_BROKER for the run.")
+
+    def handle(self, *args, **options):
+        setup_test_environment()  # Lets the requests use the 'testserver' host
+        runner = DiscoverRunner(interactive=False, verbosity=0)
+        old_config = runner.setup_databases()  # The test runner's database (see DATABASES TEST)
+        try:
+            with override_settings(REALTIME_ENABLED=True, AI_DISPATCH_MODE='off', REALTIME_BROKER=options['broker'],
+                                   REALTIME_HEARTBEAT_SECONDS=options['heartbeat']):
+                realtime.set_broker(None)
+                resident = UserDetails.objects.create(email='load@example.com', password='x', flat_number='1', role='owner')
+                issue = Issue.objects.create(title='Load test', description='realtime', reported_by_id=resident)
+                session = SessionStore()
+                session['user_id'] = resident.id
+                session.create()
+                try:
+                    asyncio.run(self.run(session.session_key, issue, options))
+                finally:
+                    if hasattr(realtime.get_broker(), 'stop'):
+                        realtime.get_broker().stop()
+                    realtime.set_broker(None)
+        finally:
+            runner.teardown_databases(old_config)
+
+    async def run(self, session_key, issue, options):
+        app = get_asgi_application()
+        broker = realtime.get_broker()
+        # One connection first so start-up costs (URLconf, middleware) are not counted per connection
+        warmup = EventStream(app, session_key, -1)
+        task = asyncio.create_task(warmup.run())
+        await warmup.connected.wait()
+        warmup.disconnect()
+        await task
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        streams = [EventStream(app, session_key, n) for n in range(options['connections'])]
+        start = time.perf_counter()
+        tasks = [asyncio.create_task(stream.run()) for stream in streams]
+        await asyncio.gather(*(stream.connected.wait() for stream in streams))
+        opened = time.perf_counter() - start
+        failed = sum(1 for stream in streams if stream.status != 200)
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        self.stdout.write(
+            f"{len(streams)} connections open in {opened:.2f}s ({failed} failed), "
+            f"{broker.subscriber_count()} subscribed, ~{(rss_after - rss_before) / max(len(streams), 1):.1f} KiB each"
+        )
+
+        await asyncio.sleep(options['idle'])
+
+        latencies = []
+        for n in range(options['notifications']):
+            published = time.perf_counter()
+            note = await sync_to_async(SiteNotification.objects.create)(
+                title='Vote Requested!', message=f'load {n}', issue=issue,
+            )
+            deadline = time.monotonic() + 10
+            while any(note.id not in stream.received for stream in streams) and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            arrivals = [stream.received[note.id] - published for stream in streams if note.id in stream.received]
+            missing = len(streams) - len(arrivals)
+            latencies.append((max(arrivals) if arrivals else float('inf'), statistics.median(arrivals) if arrivals else 0))
+            self.stdout.write(f"notification {n + 1}: delivered to {len(arrivals)}/{len(streams)}, "
+                              f"p50 {latencies[-1][1] * 1000:.1f}ms, last {latencies[-1][0] * 1000:.1f}ms")
+            if missing:
+                raise CommandError(f"{missing} connection(s) never received notification {note.id}.")
+
+        for stream in streams:
+            stream.disconnect()
+        await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), timeout=30)
+        await asyncio.sleep(0)
+        leaked = broker.subscriber_count()
+        self.stdout.write(f"all disconnected, {leaked} subscription(s) left")
+        if failed or leaked:
+            raise CommandError(f"{failed} failed connection(s), {leaked} leaked subscription(s).")
+        self.stdout.write(self.style.SUCCESS("Realtime fan-out OK."))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from app import images
+from app.jobs import enqueue
+from app.models import Issue, UserDetails
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the resized, EXIF-stripped image variants (app/images.py) for uploads that "
+        "do not have them yet, e.g. everything uploaded before the pipeline existed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sync', action='store_true',
+                            help="Process here instead of queueing jobs for `manage.py run_jobs`.")
+
+    def handle(self, *args, **options):
+        targets = [
+            (Issue.objects.exclude(image='').exclude(image__isnull=True), 'image', 'image_variants',
+             images.process_issue_image, lambda issue: enqueue('issue_image', issue=issue)),
+            (UserDetails.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True),
+             'profile_picture', 'profile_picture_variants',
+             images.process_profile_picture, lambda user: enqueue('profile_picture', user=user)),
+        ]
+        done = failed = 0
+        for queryset, field, variants_field, process, queue in targets:
+            for instance in queryset.iterator():
+                if not images.needs_processing(getattr(instance, field), getattr(instance, variants_field)):
+                    continue
+                if not options['sync']:
+                    queue(instance)
+                    done += 1
+                    continue
+                try:
+                    process(instance)
+                    done += 1
+                except Exception as e:  # A missing or corrupt upload should not stop the backfill
+                    failed += 1
+                    self.stderr.write(f"{type(instance).__name__} {instance.pk}: {e}")
+        verb = "Processed" if options['sync'] else "Queued"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {done} image(s), {failed} failed."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from app import stats
+from app.models import UserIssueStats
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-resident dashboard counters (UserIssueStats) from the Issue table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help="Only rebuild this resident id (repeatable).")
+
+    def handle(self, *args, **options):
+        drifted = stats.rebuild(options['users'])
+        total = UserIssueStats.objects.count()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt issue stats: {total} row(s), {drifted} corrected."))
@@ -0,0 +1,23 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from app import analytics, fragments
+
+
+class Command(BaseCommand):
+    help = (
+        "Bring the weekly analytics rollups up to date (only weeks that changed, or all "
+        "with --full) and drop the cached manager summary."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Recompute every week from scratch.")
+        parser.add_argument('--show', action='store_true', help="Print the summary afterwards.")
+
+    def handle(self, *args, **options):
+        weeks = analytics.refresh(full=options['full'])
+        fragments.bump(fragments.ANALYTICS)
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {weeks} week(s) of analytics."))
+        if options['show']:
+            self.stdout.write(json.dumps(analytics.build_summary(), indent=2, default=str))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from app.jobs import Worker, requeue_stale, run_pending
+
+
+class Command(BaseCommand):
+    help = "Run background jobs (AI solution generation, ...) from the BackgroundJob queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Number of worker threads.")
+        parser.add_argument('--poll', type=float, default=1.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain the queue and exit instead of polling.")
+
+    def handle(self, *args, **options):
+        if options['once'] and options['workers'] == 1:
+            requeue_stale()
+            count = run_pending()
+            self.stdout.write(self.style.SUCCESS(f"Ran {count} job(s)."))
+            return
+
+        worker = Worker(concurrency=options['workers'], poll_interval=options['poll'])
+        self.stdout.write(f"Job worker started with {options['workers']} thread(s). Ctrl+C to stop.")
+        try:
+            worker.run(once=options['once'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS("Job worker stopped."))
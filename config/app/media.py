@@ -0,0 +1,196 @@
+"""
+Serving MEDIA_ROOT (uploads and the image variants from app/images.py).
+
+MEDIA_SERVE_MODE picks how the bytes leave the server:
+
+  'django'            FileResponse from this process. Handles ETag /
+                      If-None-Match, If-Modified-Since, single byte ranges
+                      (with If-Range), and leaves whole-file bodies as a
+                      real file so the WSGI server can use sendfile().
+  'x-sendfile'        Apache (mod_xsendfile) or lighttpd: Django resolves
+                      the path and answers with an X-Sendfile header; the
+                      web server sends the file, ranges and 304s included.
+  'x-accel-redirect'  nginx: the same with X-Accel-Redirect, pointing at an
+                      internal location, e.g.
+
+                          location /protected-media/ {
+                              internal;
+                              alias /srv/app/config/media/;
+                          }
+
+  'off'               not routed at all (the web server serves MEDIA_URL).
+
+Cache headers are set here in every mode: variants/ is content-addressed and
+immutable, everything else gets MEDIA_CACHE_SECONDS.
+`manage.py bench_media` compares the modes with the old static() helper.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+from . import metrics
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class MediaFileResponse(FileResponse):
+    # FileResponse reads 4 KiB at a time; without sendfile (ASGI, runserver)
+    # every block is a trip through the server's write loop
+    block_size = 64 * 1024
+
+
+class FileRange:
+    """Read-only view of bytes [start, start + length) of an open file."""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def resolve(path):
+    """Absolute path of a media file and its stat; Http404 for anything else."""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:  # Escapes MEDIA_ROOT
+        raise Http404
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    return full_path, stat
+
+
+def etag_for(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def cache_control(path):
+    if path.startswith('variants/'):
+        return IMMUTABLE
+    return f'public, max-age={settings.MEDIA_CACHE_SECONDS}'
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single-range Range header, None to send the
+    whole file (absent, malformed or multi-range), 'unsatisfiable' for a range
+    past the end.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match or size == 0:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        length = int(last)  # Suffix range: the last N bytes
+        if length == 0:
+            return 'unsatisfiable'
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        return 'unsatisfiable'
+    if end < start:
+        return None
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    value = request.headers.get('If-Range')
+    if not value:
+        return True
+    if value.startswith('"'):
+        return value == etag  # Strong comparison only
+    date = parse_http_date_safe(value)
+    return date is not None and int(last_modified) <= date
+
+
+def serve(request, path):
+    mode = settings.MEDIA_SERVE_MODE
+    full_path, stat = resolve(path)
+    etag = etag_for(stat)
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    headers = {
+        'Cache-Control': cache_control(path),
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+    }
+
+    # 304 / 412 before touching the file, in every mode
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if conditional is not None:
+        for name, value in headers.items():
+            conditional.headers.setdefault(name, value)
+        metrics.incr(f'media.{conditional.status_code}')
+        return conditional
+
+    if mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response['X-Sendfile'] = full_path
+        metrics.incr('media.x-sendfile')
+        return response
+    if mode == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path)
+        metrics.incr('media.x-accel-redirect')
+        return response
+
+    byte_range = None
+    if request.method == 'GET' and _if_range_matches(request, etag, stat.st_mtime):
+        byte_range = parse_range(request.headers.get('Range'), stat.st_size)
+    if byte_range == 'unsatisfiable':
+        response = HttpResponse(status=416, headers=headers)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        metrics.incr('media.416')
+        return response
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response['Content-Length'] = stat.st_size
+        return response
+
+    file = open(full_path, 'rb')
+    if byte_range is None:
+        # The file object itself, so wsgi.file_wrapper can sendfile() it
+        response = MediaFileResponse(file, content_type=content_type, headers=headers)
+        metrics.incr('media.200')
+        return response
+    start, end = byte_range
+    if end == stat.st_size - 1:
+        # Runs to the end of the file (video seeking, resumed downloads):
+        # still a plain file, positioned at `start`, so sendfile() applies
+        file.seek(start)
+        response = MediaFileResponse(file, status=206, content_type=content_type, headers=headers)
+    else:
+        response = MediaFileResponse(FileRange(file, start, end - start + 1), status=206,
+                                        content_type=content_type, headers=headers)
+        response['Content-Length'] = end - start + 1
+    response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    metrics.incr('media.206')
+    return response
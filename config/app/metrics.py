@@ -0,0 +1,96 @@
+"""
+Tiny in-process metrics registry.
+
+Counters, gauges and latency timers kept in memory per process and exposed
+as JSON by the `metrics` view. Good enough to watch queue depth and latency
+without pulling in a metrics stack.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_gauges = {}
+_timings = {}
+
+SAMPLE_SIZE = 500  # Recent observations kept per timer for percentiles
+
+
+class _Timing:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.samples.append(value)
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 4) if self.count else 0.0,
+            'p50': round(_percentile(ordered, 0.50), 4),
+            'p95': round(_percentile(ordered, 0.95), 4),
+            'max': round(self.max, 4),
+        }
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def incr(name, amount=1):
+    with _lock:
+        _counters[name] += amount
+
+
+def gauge(name, value):
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name, value):
+    with _lock:
+        timing = _timings.get(name)
+        if timing is None:
+            timing = _timings[name] = _Timing()
+        timing.add(value)
+
+
+@contextmanager
+def timer(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def get_counter(name):
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def snapshot():
+    with _lock:
+        return {
+            'counters': dict(_counters),
+            'gauges': dict(_gauges),
+            'timings': {name: t.summary() for name, t in _timings.items()},
+        }
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _timings.clear()
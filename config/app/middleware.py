@@ -0,0 +1,43 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.functional import SimpleLazyObject
+
+from .auth import aget_resident, get_resident
+
+
+class ResidentMiddleware:
+    """
+    Sets request.resident (the logged-in UserDetails, or None), loaded on
+    first use through the resident cache in app/auth.py, under WSGI and ASGI
+    alike: sync views run in a worker thread, where the lazy load may query.
+    Async views await request.aresident() instead; lazy attributes cannot
+    query from async code.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        _attach(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        _attach(request)
+        return await self.get_response(request)
+
+
+def _attach(request):
+    request.resident = SimpleLazyObject(lambda: get_resident(request.session.get('user_id')))
+    request.aresident = lambda: _aresident(request)
+
+
+async def _aresident(request):
+    if not hasattr(request, '_aresident'):
+        request._aresident = await aget_resident(await request.session.aget('user_id'))
+    return request._aresident
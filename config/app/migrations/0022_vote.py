@@ -0,0 +1,57 @@
+# Turns Solution.voted_by into a many-to-many through an explicit Vote model.
+# The existing join table is kept (state-only CreateModel), then the new
+# columns and the named unique constraint are added for real.
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0021_llmcacheentry'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[],
+            state_operations=[
+                migrations.CreateModel(
+                    name='Vote',
+                    fields=[
+                        ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('solution', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='votes', to='app.solution')),
+                        ('voter', models.ForeignKey(db_column='userdetails_id', on_delete=django.db.models.deletion.CASCADE, related_name='votes', to='app.userdetails')),
+                    ],
+                    options={
+                        'db_table': 'app_solution_voted_by',
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='solution',
+                    name='voted_by',
+                    field=models.ManyToManyField(blank=True, related_name='voted_solutions', through='app.Vote', to='app.userdetails'),
+                ),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='vote',
+            name='id',
+            field=models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID'),
+        ),
+        migrations.AddField(
+            model_name='vote',
+            name='vote_type',
+            field=models.CharField(blank=True, choices=[('upvote', 'Upvote'), ('downvote', 'Downvote')], max_length=10),
+        ),
+        migrations.AddField(
+            model_name='vote',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddConstraint(
+            model_name='vote',
+            constraint=models.UniqueConstraint(fields=('solution', 'voter'), name='unique_vote_per_user'),
+        ),
+    ]
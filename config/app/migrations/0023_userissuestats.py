@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0022_vote'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserIssueStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='issue_stats', serialize=False, to='app.userdetails')),
+                ('open_count', models.IntegerField(default=0)),
+                ('in_review_count', models.IntegerField(default=0)),
+                ('resolved_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
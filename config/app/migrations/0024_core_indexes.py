@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0023_userissuestats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['reported_by_id', 'status'], name='issue_reporter_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['reported_by_id', '-reported_date'], name='issue_reporter_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['status', '-reported_date'], name='issue_status_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sitenotification',
+            index=models.Index(fields=['-created_at', '-id'], name='notification_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solution',
+            index=models.Index(fields=['issue', '-is_ai', '-upvotes'], name='solution_issue_rank_idx'),
+        ),
+    ]
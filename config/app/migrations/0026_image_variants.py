@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0025_notificationcursor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backgroundjob',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='app.userdetails'),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='userdetails',
+            name='profile_picture_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AlterField(
+            model_name='backgroundjob',
+            name='kind',
+            field=models.CharField(choices=[('ai_solution', 'AI solution'), ('issue_image', 'Issue image variants'), ('profile_picture', 'Profile picture variants')], max_length=50),
+        ),
+        migrations.AddConstraint(
+            model_name='backgroundjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('kind', 'user'), name='unique_active_job_per_user'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0026_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userdetails',
+            name='password',
+            field=models.CharField(max_length=128),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0027_hashed_passwords'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyIssueStats',
+            fields=[
+                ('week', models.DateField(primary_key=True, serialize=False)),
+                ('reported', models.IntegerField(default=0)),
+                ('resolved', models.IntegerField(default=0)),
+                ('resolution_seconds', models.BigIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+                ('dirty_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='resolved_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['reported_date'], name='issue_reported_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['resolved_at'], name='issue_resolved_idx'),
+        ),
+    ]
@@ -0,0 +1,159 @@
+# Full-text index of issues for app/search.py, kept in step by triggers so
+# bulk_create, update() and raw writes are covered as well as save()
+
+from django.db import migrations
+
+# period: "y2024 m202403 d20240315", so date ranges are token lookups
+SQLITE_PERIOD = "'y' || strftime('%Y', {0}) || ' m' || strftime('%Y%m', {0}) || ' d' || strftime('%Y%m%d', {0})"
+SQLITE_STATUS = "replace(lower({0}), ' ', '')"
+SQLITE_SOLUTIONS = "(SELECT coalesce(group_concat(description, ' '), '') FROM app_solution WHERE issue_id = {0})"
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE app_issue_search USING fts5(
+        title, description, solutions, status, period, tokenize = 'porter unicode61'
+    )
+    """,
+    f"""
+    INSERT INTO app_issue_search (rowid, title, description, solutions, status, period)
+    SELECT id, title, description, {SQLITE_SOLUTIONS.format('app_issue.id')},
+           {SQLITE_STATUS.format('status')}, {SQLITE_PERIOD.format('reported_date')}
+    FROM app_issue
+    """,
+    f"""
+    CREATE TRIGGER app_issue_search_insert AFTER INSERT ON app_issue BEGIN
+        INSERT INTO app_issue_search (rowid, title, description, solutions, status, period)
+        VALUES (new.id, new.title, new.description, {SQLITE_SOLUTIONS.format('new.id')},
+                {SQLITE_STATUS.format('new.status')}, {SQLITE_PERIOD.format('new.reported_date')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER app_issue_search_update AFTER UPDATE OF title, description, status, reported_date ON app_issue
+    BEGIN
+        UPDATE app_issue_search
+        SET title = new.title, description = new.description,
+            status = {SQLITE_STATUS.format('new.status')}, period = {SQLITE_PERIOD.format('new.reported_date')}
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER app_issue_search_delete AFTER DELETE ON app_issue BEGIN
+        DELETE FROM app_issue_search WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER app_solution_search_insert AFTER INSERT ON app_solution BEGIN
+        UPDATE app_issue_search SET solutions = {SQLITE_SOLUTIONS.format('new.issue_id')} WHERE rowid = new.issue_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER app_solution_search_update AFTER UPDATE OF description, issue_id ON app_solution BEGIN
+        UPDATE app_issue_search SET solutions = {SQLITE_SOLUTIONS.format('old.issue_id')} WHERE rowid = old.issue_id;
+        UPDATE app_issue_search SET solutions = {SQLITE_SOLUTIONS.format('new.issue_id')} WHERE rowid = new.issue_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER app_solution_search_delete AFTER DELETE ON app_solution BEGIN
+        UPDATE app_issue_search SET solutions = {SQLITE_SOLUTIONS.format('old.issue_id')} WHERE rowid = old.issue_id;
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS app_solution_search_delete',
+    'DROP TRIGGER IF EXISTS app_solution_search_update',
+    'DROP TRIGGER IF EXISTS app_solution_search_insert',
+    'DROP TRIGGER IF EXISTS app_issue_search_delete',
+    'DROP TRIGGER IF EXISTS app_issue_search_update',
+    'DROP TRIGGER IF EXISTS app_issue_search_insert',
+    'DROP TABLE IF EXISTS app_issue_search',
+]
+
+# Weights: title A, description B, solutions C (ts_rank_cd)
+POSTGRES_FORWARD = [
+    """
+    CREATE TABLE app_issue_search (
+        issue_id integer PRIMARY KEY REFERENCES app_issue (id) ON DELETE CASCADE,
+        document tsvector NOT NULL
+    )
+    """,
+    'CREATE INDEX app_issue_search_document ON app_issue_search USING gin (document)',
+    """
+    CREATE FUNCTION app_issue_search_refresh(target integer) RETURNS void AS $$
+        INSERT INTO app_issue_search (issue_id, document)
+        SELECT i.id,
+               setweight(to_tsvector('english', i.title), 'A')
+               || setweight(to_tsvector('english', i.description), 'B')
+               || setweight(to_tsvector('english', coalesce(
+                      (SELECT string_agg(s.description, ' ') FROM app_solution s WHERE s.issue_id = i.id), ''
+                  )), 'C')
+        FROM app_issue i WHERE i.id = target
+        ON CONFLICT (issue_id) DO UPDATE SET document = excluded.document
+    $$ LANGUAGE sql
+    """,
+    """
+    CREATE FUNCTION app_issue_search_issue_changed() RETURNS trigger AS $$
+    BEGIN
+        PERFORM app_issue_search_refresh(NEW.id);
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE FUNCTION app_issue_search_solution_changed() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP <> 'INSERT' THEN
+            PERFORM app_issue_search_refresh(OLD.issue_id);
+        END IF;
+        IF TG_OP <> 'DELETE' AND (TG_OP = 'INSERT' OR NEW.issue_id <> OLD.issue_id) THEN
+            PERFORM app_issue_search_refresh(NEW.issue_id);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER app_issue_search_issue AFTER INSERT OR UPDATE OF title, description ON app_issue
+    FOR EACH ROW EXECUTE FUNCTION app_issue_search_issue_changed()
+    """,
+    """
+    CREATE TRIGGER app_issue_search_solution AFTER INSERT OR DELETE OR UPDATE OF description, issue_id
+    ON app_solution FOR EACH ROW EXECUTE FUNCTION app_issue_search_solution_changed()
+    """,
+    'SELECT app_issue_search_refresh(id) FROM app_issue',
+]
+
+POSTGRES_BACKWARD = [
+    'DROP TRIGGER IF EXISTS app_issue_search_solution ON app_solution',
+    'DROP TRIGGER IF EXISTS app_issue_search_issue ON app_issue',
+    'DROP FUNCTION IF EXISTS app_issue_search_solution_changed()',
+    'DROP FUNCTION IF EXISTS app_issue_search_issue_changed()',
+    'DROP FUNCTION IF EXISTS app_issue_search_refresh(integer)',
+    'DROP TABLE IF EXISTS app_issue_search',
+]
+
+STATEMENTS = {
+    'sqlite': (SQLITE_FORWARD, SQLITE_BACKWARD),
+    'postgresql': (POSTGRES_FORWARD, POSTGRES_BACKWARD),
+}
+
+
+def run(direction):
+    def operation(apps, schema_editor):
+        statements = STATEMENTS.get(schema_editor.connection.vendor)
+        if statements is None:
+            return  # No full-text index on this backend; app/search.py falls back to icontains
+        for sql in statements[direction]:
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0029_generation_calls'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(0), run(1)),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0030_issue_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='solution',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['updated_at'], name='issue_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['status', '-id'], name='issue_status_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solution',
+            index=models.Index(fields=['updated_at'], name='solution_updated_idx'),
+        ),
+    ]
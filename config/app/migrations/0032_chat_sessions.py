@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0031_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='backgroundjob',
+            name='kind',
+            field=models.CharField(choices=[('ai_solution', 'AI solution'), ('issue_image', 'Issue image variants'), ('profile_picture', 'Profile picture variants'), ('chat_compaction', 'Chat summary compaction')], max_length=50),
+        ),
+        migrations.CreateModel(
+            name='ChatSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('summary', models.TextField(blank=True)),
+                ('summary_tokens', models.PositiveIntegerField(default=0)),
+                ('summarized_through', models.BigIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_sessions', to='app.userdetails')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChatTurn',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('user', 'User'), ('assistant', 'Assistant')], max_length=10)),
+                ('content', models.TextField()),
+                ('tokens', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='turns', to='app.chatsession')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(fields=['user', '-updated_at'], name='chat_session_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatturn',
+            index=models.Index(fields=['session', '-id'], name='chat_turn_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# On SQLite, 0031's AddFields rebuilt app_issue and app_solution (new table,
+# copy, drop, rename), which drops every trigger on them, including 0030's
+# full-text index triggers. Recreate the index and its triggers.
+
+from importlib import import_module
+
+from django.db import migrations
+
+issue_search = import_module('app.migrations.0030_issue_search')
+
+
+def rebuild(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return  # PostgreSQL alters tables in place; its triggers survived
+    for sql in issue_search.SQLITE_BACKWARD + issue_search.SQLITE_FORWARD:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0032_chat_sessions'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild, migrations.RunPython.noop),
+    ]
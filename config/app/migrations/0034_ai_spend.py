@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0033_restore_issue_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AISpend',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False)),
+                ('tokens', models.BigIntegerField(default=0)),
+                ('micro_usd', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
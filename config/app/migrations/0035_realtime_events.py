@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0034_ai_spend'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RealtimeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('topic', models.CharField(max_length=100)),
+                ('event', models.CharField(max_length=50)),
+                ('data', models.JSONField()),
+                ('event_id', models.CharField(blank=True, max_length=100)),
+            ],
+        ),
+    ]
@@ -6,10 +6,12 @@ from django.utils import timezone # Import timezone for date/time handling
 class UserDetails(models.Model):
     full_name = models.CharField(max_length=200, null=True, blank=True)
     email = models.EmailField(unique=True)
-    password = models.CharField(max_length=100)
+    password = models.CharField(max_length=128)  # Hashed, see app/auth.py
     flat_number = models.CharField(max_length=100)
     role = models.CharField(max_length=100)
     profile_picture = models.ImageField(upload_to='profile_pics/', null=True, blank=True)
+    # Resized WebP/AVIF/JPEG renditions, filled in by the image pipeline (app/images.py)
+    profile_picture_variants = models.JSONField(default=dict, blank=True)
 
     def __str__(self):
         return self.full_name if self.full_name else self.email
@@ -26,9 +28,46 @@ class Issue(models.Model):
     reported_date = models.DateField(auto_now_add=True)
     reported_by_id = models.ForeignKey(UserDetails, on_delete=models.CASCADE)
     image = models.ImageField(upload_to='issue_images/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True)  # See app/images.py
+    resolved_at = models.DateTimeField(null=True, blank=True)  # Set by save() when status becomes Resolved
+    # ETag / Last-Modified in the API (app/api.py); update() callers set it themselves
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Checked by app/tests/test_query_plans.py
+        indexes = [
+            models.Index(fields=['reported_by_id', 'status'], name='issue_reporter_status_idx'),
+            models.Index(fields=['reported_by_id', '-reported_date'], name='issue_reporter_recent_idx'),
+            models.Index(fields=['status', '-reported_date'], name='issue_status_recent_idx'),
+            # Weekly rollups refresh from a date onwards (app/analytics.py)
+            models.Index(fields=['reported_date'], name='issue_reported_idx'),
+            models.Index(fields=['resolved_at'], name='issue_resolved_idx'),
+            models.Index(fields=['updated_at'], name='issue_updated_idx'),
+            models.Index(fields=['status', '-id'], name='issue_status_newest_idx'),  # API list by status
+        ]
 
     def __str__(self):
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so signals can tell when it changes
+        # (keeps UserIssueStats in step without re-reading the row)
+        if 'status' in field_names:
+            instance._loaded_status = instance.status
+        return instance
+
+    def save(self, *args, **kwargs):
+        # resolved_at follows status, for time-to-resolution analytics
+        resolved = self.status == 'Resolved'
+        if resolved != (self.resolved_at is not None):
+            self.resolved_at = timezone.now() if resolved else None
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'resolved_at'}
+        if kwargs.get('update_fields'):
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'updated_at'}  # auto_now is only saved if listed
+        super().save(*args, **kwargs)
     
 class Solution(models.Model):
     title = models.CharField(max_length=200)
@@ -43,16 +82,45 @@ class Solution(models.Model):
     is_ai = models.BooleanField(default=False)  # NEW: Tracks if this is an AI solution
     confidence = models.FloatField(default=0.0) 
     suggested_by = models.ForeignKey(UserDetails, on_delete=models.SET_NULL, null=True, blank=True)
-
+    updated_at = models.DateTimeField(auto_now=True)  # See Issue.updated_at
 
     # NEW FIELD: Tracks which users have already cast a vote on this specific solution
-    voted_by = models.ManyToManyField(UserDetails, related_name='voted_solutions', blank=True)
+    # (one Vote row per user, enforced by the database; see app/voting.py)
+    voted_by = models.ManyToManyField(UserDetails, through='Vote', related_name='voted_solutions', blank=True)
+
+    class Meta:
+        indexes = [
+            # Serves filter(issue=..., is_ai=...) and the detail view's ordering
+            models.Index(fields=['issue', '-is_ai', '-upvotes'], name='solution_issue_rank_idx'),
+            models.Index(fields=['updated_at'], name='solution_updated_idx'),
+        ]
 
     def __str__(self):
         # Update the string representation to reflect the source
         source = "AI" if self.is_ai_generated else "Human"
         return f"{self.title} ({source})"
     
+# One row per (solution, user): the unique constraint is what stops double votes.
+# Reuses the table Django created for the original voted_by many-to-many.
+class Vote(models.Model):
+    VOTE_CHOICES = [
+        ('upvote', 'Upvote'),
+        ('downvote', 'Downvote'),
+    ]
+    solution = models.ForeignKey(Solution, on_delete=models.CASCADE, related_name='votes')
+    voter = models.ForeignKey(UserDetails, on_delete=models.CASCADE, db_column='userdetails_id', related_name='votes')
+    vote_type = models.CharField(max_length=10, choices=VOTE_CHOICES, blank=True)  # Blank for votes cast before it was recorded
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'app_solution_voted_by'
+        constraints = [
+            models.UniqueConstraint(fields=['solution', 'voter'], name='unique_vote_per_user'),
+        ]
+
+    def __str__(self):
+        return f"{self.voter} {self.vote_type or 'voted'} on {self.solution_id}"
+
 # New model for site-wide notifications
 class SiteNotification(models.Model):
     title = models.CharField(max_length=100) 
@@ -65,6 +133,10 @@ class SiteNotification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        # Deletes by issue use the foreign key's own index
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='notification_recent_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -81,3 +153,188 @@ class SiteNotification(models.Model):
         elif diff.days == 1:
             return "Yesterday"
         return self.created_at.strftime("%b %d, %Y")
+
+
+# How far each resident has read the notification feed: the (created_at, id)
+# of the newest notification they have seen (see app/notifications.py)
+class NotificationCursor(models.Model):
+    user = models.OneToOneField(UserDetails, on_delete=models.CASCADE, primary_key=True, related_name='notification_cursor')
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+    last_seen_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user} seen up to {self.last_seen_at} #{self.last_seen_id}"
+
+
+# Denormalized per-resident issue counters for the dashboard, maintained by the
+# Issue signals in app/signals.py (rebuild with `manage.py rebuild_issue_stats`)
+class UserIssueStats(models.Model):
+    user = models.OneToOneField(UserDetails, on_delete=models.CASCADE, primary_key=True, related_name='issue_stats')
+    open_count = models.IntegerField(default=0)
+    in_review_count = models.IntegerField(default=0)
+    resolved_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user}: {self.open_count} open, {self.in_review_count} in review, {self.resolved_count} resolved"
+
+
+# Building-wide issue counts per week (Monday), kept by app/analytics.py.
+# A week is recomputed when an issue reported in it changes after computed_at.
+class WeeklyIssueStats(models.Model):
+    week = models.DateField(primary_key=True)
+    reported = models.IntegerField(default=0)
+    resolved = models.IntegerField(default=0)
+    # Sum of (resolved_at - reported_date) over the week's resolved issues
+    resolution_seconds = models.BigIntegerField(default=0)
+    computed_at = models.DateTimeField()
+    dirty_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Week of {self.week}: {self.reported} reported, {self.resolved} resolved"
+
+
+# Background work queue: AI generation and other slow tasks run outside the request
+class BackgroundJob(models.Model):
+    KIND_CHOICES = [
+        ('ai_solution', 'AI solution'),
+        ('issue_image', 'Issue image variants'),
+        ('profile_picture', 'Profile picture variants'),
+        ('chat_compaction', 'Chat summary compaction'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES)
+    issue = models.ForeignKey(Issue, on_delete=models.CASCADE, null=True, blank=True, related_name='jobs')
+    user = models.ForeignKey(UserDetails, on_delete=models.CASCADE, null=True, blank=True, related_name='jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)  # Pushed back on each retry
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+        constraints = [
+            # At most one live job per (kind, issue): repeat enqueues reuse it
+            models.UniqueConstraint(
+                fields=['kind', 'issue'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='unique_active_job_per_issue',
+            ),
+            models.UniqueConstraint(
+                fields=['kind', 'user'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='unique_active_job_per_user',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+# Persistent cache of OpenAI answers, keyed on normalized issue text (see app/llm_cache.py)
+class LLMCacheEntry(models.Model):
+    key = models.CharField(max_length=64, unique=True)  # sha256 of model + prompt version + text
+    model = models.CharField(max_length=100)
+    prompt_version = models.CharField(max_length=20)
+    normalized_text = models.TextField()
+    response = models.TextField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)  # LRU order
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.model}/{self.prompt_version}: {self.normalized_text[:50]}"
+
+
+# One row per solution-generation call to OpenAI: what it cost and what came back (see app/generation.py)
+class GenerationCall(models.Model):
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    model = models.CharField(max_length=100)
+    prompt_version = models.CharField(max_length=20)
+    issues = models.PositiveIntegerField()  # Issues answered by the one prompt
+    solutions = models.PositiveIntegerField(default=0)  # Suggestions that passed validation
+    rejected = models.PositiveIntegerField(default=0)  # Suggestions dropped by validation
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    latency_ms = models.PositiveIntegerField()
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.model} x{self.issues} ({self.prompt_tokens}+{self.completion_tokens} tokens, {self.latency_ms}ms)"
+
+
+# Messages for the /events/ streams of every worker when REALTIME_BROKER is
+# DatabaseBroker (see app/realtime.py); deleted after REALTIME_RETENTION_SECONDS
+class RealtimeEvent(models.Model):
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    topic = models.CharField(max_length=100)
+    event = models.CharField(max_length=50)
+    data = models.JSONField()
+    event_id = models.CharField(max_length=100, blank=True)
+
+    def __str__(self):
+        return f"{self.topic} {self.event} #{self.pk}"
+
+
+# OpenAI usage per UTC day, counted against the daily budget (see app/ratelimit.py)
+class AISpend(models.Model):
+    day = models.DateField(primary_key=True)
+    tokens = models.BigIntegerField(default=0)
+    micro_usd = models.BigIntegerField(default=0)  # Millionths of a dollar
+
+    def __str__(self):
+        return f"{self.day}: {self.tokens} tokens, ${self.micro_usd / 1_000_000:.4f}"
+
+
+# Chat widget conversations (see app/chat.py). Prompts carry the rolling
+# summary plus the newest turns; older turns are folded into the summary.
+class ChatSession(models.Model):
+    user = models.ForeignKey(UserDetails, on_delete=models.CASCADE, related_name='chat_sessions')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # Last exchange; an idle session is not resumed
+    summary = models.TextField(blank=True)
+    summary_tokens = models.PositiveIntegerField(default=0)
+    summarized_through = models.BigIntegerField(default=0)  # id of the last ChatTurn folded into the summary
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-updated_at'], name='chat_session_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} chat #{self.pk}"
+
+
+class ChatTurn(models.Model):
+    ROLE_CHOICES = [
+        ('user', 'User'),
+        ('assistant', 'Assistant'),
+    ]
+    session = models.ForeignKey(ChatSession, on_delete=models.CASCADE, related_name='turns')
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES)
+    content = models.TextField()
+    tokens = models.PositiveIntegerField()  # Estimated once, when stored (app.chat.count_tokens)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # The newest turns after the summary, newest first
+            models.Index(fields=['session', '-id'], name='chat_turn_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.role}: {self.content[:50]}"
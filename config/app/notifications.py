@@ -0,0 +1,108 @@
+"""
+Notification feed with keyset pagination.
+
+Notifications are ordered newest first by (created_at, id), which the
+notification_recent_idx index serves directly. A cursor is that pair encoded
+as "<microseconds since epoch>.<id>", so "everything after X" and "the page
+before X" are index range scans however long the feed grows, unlike OFFSET.
+
+Read state is a NotificationCursor per resident rather than deleting rows:
+everything after it is unread. Notifications for resolved issues are hidden
+when the feed is read.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError
+from django.db.models import Q
+from django.urls import reverse
+
+from .models import NotificationCursor, SiteNotification
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MAX_PAGE = 50
+UNREAD_CAP = 99  # The badge shows "99+" beyond this; no need to count further
+
+
+def encode_cursor(created_at, note_id):
+    delta = created_at - EPOCH
+    return f"{(delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds}.{note_id}"
+
+
+def cursor_for(note):
+    return encode_cursor(note.created_at, note.id)
+
+
+def decode_cursor(cursor):
+    """(created_at, id) from a cursor string; ValueError if it is malformed."""
+    micros, _, note_id = (cursor or '').partition('.')
+    return EPOCH + timedelta(microseconds=int(micros)), int(note_id)
+
+
+def visible():
+    return (SiteNotification.objects
+            .select_related('issue__reported_by_id')
+            .exclude(issue__status='Resolved'))
+
+
+def after(cursor):
+    """Notifications newer than `cursor` (a (created_at, id) pair)."""
+    created_at, note_id = cursor
+    # created_at >= X keeps the index range; the exclude drops the tie-breaker duplicates
+    return visible().filter(created_at__gte=created_at).exclude(created_at=created_at, id__lte=note_id)
+
+
+def before(cursor):
+    created_at, note_id = cursor
+    return visible().filter(created_at__lte=created_at).exclude(created_at=created_at, id__gte=note_id)
+
+
+def latest(limit=10, older_than=None):
+    """A page of the feed, newest first."""
+    notes = before(older_than) if older_than else visible()
+    return list(notes.order_by('-created_at', '-id')[:limit])
+
+
+def newer(cursor, limit=MAX_PAGE):
+    """Up to `limit` notifications after `cursor`, oldest first (for polling)."""
+    return list(after(cursor).order_by('created_at', 'id')[:limit])
+
+
+def seen_cursor(user_id):
+    state = NotificationCursor.objects.filter(user_id=user_id).first()
+    if state is None or state.last_seen_at is None:
+        return None
+    return state.last_seen_at, state.last_seen_id
+
+
+def unread_count(user_id, cursor=None):
+    cursor = cursor or seen_cursor(user_id)
+    notes = after(cursor) if cursor else visible()
+    return notes.order_by()[:UNREAD_CAP + 1].count()
+
+
+def mark_seen(user_id, cursor):
+    """Move the resident's read marker forward to `cursor` (never backwards)."""
+    created_at, note_id = cursor
+    moved = NotificationCursor.objects.filter(user_id=user_id).filter(
+        Q(last_seen_at__isnull=True) | Q(last_seen_at__lt=created_at) | Q(last_seen_at=created_at, last_seen_id__lt=note_id)
+    ).update(last_seen_at=created_at, last_seen_id=note_id)
+    if not moved and not NotificationCursor.objects.filter(user_id=user_id).exists():
+        try:
+            NotificationCursor.objects.create(user_id=user_id, last_seen_at=created_at, last_seen_id=note_id)
+        except IntegrityError:
+            mark_seen(user_id, cursor)  # Created concurrently; retry as an update
+
+
+def serialize(note):
+    reporter = note.issue.reported_by_id if note.issue else None
+    return {
+        'id': note.id,
+        'cursor': cursor_for(note),
+        'title': note.title,
+        'message': note.message,
+        'issue_id': note.issue_id,
+        'url': reverse('issue_details', args=[note.issue_id]) if note.issue_id else None,
+        'reported_by': (reporter.full_name or reporter.email) if reporter else None,
+        'created_at': note.created_at.isoformat(),
+        'time_since_created': note.time_since_created(),
+    }
@@ -0,0 +1,195 @@
+"""
+Rate limits and the daily spend budget for OpenAI calls.
+
+Two guards stand in front of every request that can lead to an OpenAI call:
+
+  take(scope, who)  a token bucket per scope and resident (IP address when
+                    signed out) from RATE_LIMITS: up to `burst` calls at
+                    once, refilled at `per_minute`. Scopes:
+                      chat        chat_api / chat_stream messages the local
+                                  router could not answer
+                      issue_ai    issue pages that would queue an AI suggestion
+                      ai_suggest  new issues handed to the AI dispatcher
+  budget()          what is left of today's AI_DAILY_TOKEN_BUDGET and
+                    AI_DAILY_COST_BUDGET (UTC days). spend() adds each
+                    response's usage, wherever the call was made, to the
+                    day's AISpend row.
+
+With the budget spent, the chat widget answers from the local router only
+and no AI suggestions are queued; both resume the next day.
+
+The budget is kept in the database, so it holds for the whole site however
+many workers there are. Buckets live in the Django cache, so workers sharing
+a cache (file, memcached, redis) share the limits; with the default locmem
+cache each worker has its own. A bucket is read and written under a
+cache.add() lock. If the cache fails, or a bucket's lock stays taken, this
+process's own buckets (behind a threading lock) are used instead.
+"""
+import math
+import threading
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import metrics
+from .models import AISpend
+
+LOCK_SECONDS = 2  # A lock left behind by a crashed worker expires after this
+LOCK_ATTEMPTS = 5
+LOCK_WAIT = 0.002
+MAX_LOCAL_BUCKETS = 10_000
+
+Decision = namedtuple('Decision', 'allowed limit remaining retry_after')
+Budget = namedtuple('Budget', 'tokens_left cost_left exhausted reset_seconds')
+
+
+class BucketBusy(Exception):
+    pass
+
+
+def _take(state, burst, rate, cost, now):
+    """Refill a (tokens, stamp) bucket up to `now` and take `cost` from it if it holds enough."""
+    tokens, stamp = state if state else (burst, now)
+    tokens = min(burst, tokens + max(0.0, now - stamp) * rate)
+    allowed = tokens >= cost
+    if allowed:
+        tokens -= cost
+    retry_after = 0 if allowed else math.ceil((cost - tokens) / rate)
+    return (tokens, now), Decision(allowed, burst, int(tokens), retry_after)
+
+
+class LocalBuckets:
+    """Token buckets in this process's memory."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> (tokens, stamp, full_at)
+
+    def take(self, key, burst, rate, cost, now):
+        with self._lock:
+            current = self._buckets.get(key)
+            state, decision = _take(current[:2] if current else None, burst, rate, cost, now)
+            if current is None and len(self._buckets) >= MAX_LOCAL_BUCKETS:
+                self._prune(now)
+            self._buckets[key] = (*state, now + (burst - state[0]) / rate)
+        return decision
+
+    def _prune(self, now):
+        # A bucket that has refilled is the same as no bucket
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+        if len(self._buckets) >= MAX_LOCAL_BUCKETS:
+            self._buckets.clear()
+
+
+class CacheBuckets:
+    """Token buckets in the Django cache, each updated under its own cache.add() lock."""
+
+    def take(self, key, burst, rate, cost, now):
+        lock = f'{key}:lock'
+        for _ in range(LOCK_ATTEMPTS):
+            if cache.add(lock, 1, LOCK_SECONDS):
+                break
+            time.sleep(LOCK_WAIT)
+        else:
+            raise BucketBusy(key)
+        try:
+            state, decision = _take(cache.get(key), burst, rate, cost, now)
+            # Once it would have refilled, an expired bucket is as good as a full one
+            cache.set(key, state, math.ceil(burst / rate) + 1)
+        finally:
+            cache.delete(lock)
+        return decision
+
+
+_local = LocalBuckets()
+_shared = CacheBuckets()
+
+
+def client_key(request, resident=None):
+    """Whom a request is limited as: the resident, or the client's address when signed out."""
+    if resident:
+        return f'user:{resident.id}'
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def take(scope, who, cost=1):
+    """Take `cost` from the (scope, who) bucket. Decision.allowed is False if it is empty."""
+    burst, per_minute = settings.RATE_LIMITS[scope]
+    key, rate, now = f'ratelimit:{scope}:{who}', per_minute / 60, time.time()
+    if settings.RATE_LIMIT_BACKEND == 'cache':
+        try:
+            decision = _shared.take(key, burst, rate, cost, now)
+        except Exception:
+            # Cache errors are backend-specific (memcached, redis, ...); any of them falls back
+            metrics.incr('ratelimit.fallback')
+            decision = _local.take(key, burst, rate, cost, now)
+    else:
+        decision = _local.take(key, burst, rate, cost, now)
+    metrics.incr(f"ratelimit.{scope}.{'allowed' if decision.allowed else 'limited'}")
+    return decision
+
+
+# Daily budget
+
+def spend(prompt_tokens, completion_tokens):
+    """Count one call's usage against today's budget."""
+    prices = settings.AI_PRICE_PER_MILLION
+    # USD per million tokens x tokens = millionths of a dollar, an integer F() can add
+    tokens = prompt_tokens + completion_tokens
+    micro_usd = round(prompt_tokens * prices['prompt'] + completion_tokens * prices['completion'])
+    today = timezone.now().date()
+    changes = {'tokens': F('tokens') + tokens, 'micro_usd': F('micro_usd') + micro_usd}
+    if not AISpend.objects.filter(day=today).update(**changes):
+        try:
+            with transaction.atomic():
+                AISpend.objects.create(day=today, tokens=tokens, micro_usd=micro_usd)
+        except IntegrityError:
+            # Another worker made the day's row first
+            AISpend.objects.filter(day=today).update(**changes)
+    metrics.incr('ai_budget.tokens_spent', tokens)
+
+
+def budget():
+    """What is left of today's budget; None for a limit that is switched off (0)."""
+    now = timezone.now()
+    token_cap, cost_cap = settings.AI_DAILY_TOKEN_BUDGET, settings.AI_DAILY_COST_BUDGET
+    tokens, micro_usd = AISpend.objects.filter(day=now.date()).values_list('tokens', 'micro_usd').first() or (0, 0)
+    tokens_left = max(0, token_cap - tokens) if token_cap else None
+    cost_left = max(0.0, cost_cap - micro_usd / 1_000_000) if cost_cap else None
+    exhausted = tokens_left == 0 or cost_left == 0
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    if tokens_left is not None:
+        metrics.gauge('ai_budget.tokens_left', tokens_left)
+    if cost_left is not None:
+        metrics.gauge('ai_budget.cost_left', round(cost_left, 4))
+    return Budget(tokens_left, cost_left, exhausted, math.ceil((midnight - now).total_seconds()))
+
+
+def allow_ai(scope, who):
+    """For calls nobody waits on (AI suggestions): False if the budget is spent or the bucket empty."""
+    if budget().exhausted:
+        metrics.incr(f'ai_budget.{scope}.skipped')
+        return False
+    return take(scope, who).allowed
+
+
+def add_headers(response, decision=None, left=None):
+    """X-RateLimit-* for a bucket decision, X-AI-Budget-* for what is left of the day's budget."""
+    if decision is not None:
+        response.headers['X-RateLimit-Limit'] = str(decision.limit)
+        response.headers['X-RateLimit-Remaining'] = str(decision.remaining)
+        if not decision.allowed:
+            response.headers['Retry-After'] = str(decision.retry_after)
+    if left is not None:
+        if left.tokens_left is not None:
+            response.headers['X-AI-Budget-Tokens-Remaining'] = str(left.tokens_left)
+        if left.cost_left is not None:
+            response.headers['X-AI-Budget-Cost-Remaining'] = f'{left.cost_left:.4f}'
+        response.headers['X-AI-Budget-Reset'] = str(left.reset_seconds)
+    return response
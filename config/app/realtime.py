@@ -0,0 +1,238 @@
+"""
+Realtime fan-out for the /events/ server-sent events stream.
+
+Each open stream subscribes to topics ('notifications', 'issue:<id>') on the
+broker; publish() copies a message to every subscriber of the topic. Streams
+live on the ASGI event loop while publishers are ordinary sync code (signals,
+voting), so delivery is handed to each loop with one call_soon_threadsafe per
+loop rather than per subscriber. A subscriber that falls more than
+REALTIME_QUEUE_SIZE messages behind is sent 'resync' and catches up through
+the notification feed instead of holding an unbounded queue.
+
+The broker is chosen by REALTIME_BROKER. InProcessBroker only reaches streams
+in the same process, so it suits a single ASGI process. DatabaseBroker passes
+messages through the RealtimeEvent table and reaches the streams of every
+worker, and publishers in other processes (`run_jobs`) as well; gunicorn.conf.py
+picks it when it runs more than one worker. A broker backed by Redis pub/sub
+or Postgres LISTEN/NOTIFY can be plugged in with the same subscribe/publish
+interface. set_broker() swaps it, e.g. for RecordingBroker.
+"""
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import metrics
+from .models import RealtimeEvent
+
+NOTIFICATIONS = 'notifications'
+POLL_BATCH = 500  # DatabaseBroker rows read per poll
+PRUNE_SECONDS = 60  # How often each DatabaseBroker poller deletes expired rows
+
+
+def issue_topic(issue_id):
+    return f"issue:{issue_id}"
+
+
+class Subscription:
+    def __init__(self, broker, topics, queue_size):
+        self.broker = broker
+        self.topics = tuple(topics)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def deliver(self, message):
+        # Runs on self.loop
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            metrics.incr('realtime.overflows')
+
+    async def get(self, timeout=None):
+        """Next (event, data, id) message, ('resync', {}, None) after an overflow, None on timeout."""
+        if self.overflowed:
+            self.overflowed = False
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            return 'resync', {}, None
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size or settings.REALTIME_QUEUE_SIZE
+        self._topics = defaultdict(set)  # topic -> subscriptions
+        self._lock = threading.Lock()
+        self.connections = 0
+
+    def subscribe(self, topics):
+        """Register the calling coroutine's loop for `topics`. Must be called from async code."""
+        subscription = Subscription(self, topics, self.queue_size)
+        with self._lock:
+            for topic in subscription.topics:
+                self._topics[topic].add(subscription)
+            self.connections += 1
+        metrics.gauge('realtime.connections', self.connections)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            removed = False
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers and subscription in subscribers:
+                    subscribers.discard(subscription)
+                    removed = True
+                    if not subscribers:
+                        del self._topics[topic]
+            if removed:
+                self.connections -= 1
+        metrics.gauge('realtime.connections', self.connections)
+
+    def publish(self, topic, event, data, event_id=None):
+        """Send to every subscriber of `topic`. Safe to call from any thread."""
+        metrics.incr('realtime.published')
+        return self._fan_out(topic, (event, data, event_id))
+
+    def _fan_out(self, topic, message):
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+        by_loop = defaultdict(list)
+        for subscription in subscribers:
+            by_loop[subscription.loop].append(subscription)
+        for loop, group in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver_all, group, message)
+            except RuntimeError:
+                # Loop closed under us (server shutting down): forget its streams
+                for subscription in group:
+                    self.unsubscribe(subscription)
+        return len(subscribers)
+
+    def subscriber_count(self, topic=None):
+        with self._lock:
+            if topic is not None:
+                return len(self._topics.get(topic, ()))
+            return self.connections
+
+
+def _deliver_all(subscriptions, message):
+    for subscription in subscriptions:
+        subscription.deliver(message)
+
+
+class DatabaseBroker(InProcessBroker):
+    """
+    Messages go through the RealtimeEvent table, so they reach every process.
+    publish() stores a row; a thread per process, started by its first stream,
+    reads new rows every REALTIME_POLL_SECONDS and fans them out to that
+    process's subscribers. Rows are deleted after REALTIME_RETENTION_SECONDS.
+
+    Rows are read in id order. On Postgres an insert that commits after a
+    later id was read is not delivered live; a stream that misses a
+    notification still gets it from the feed when it reconnects.
+    """
+
+    def __init__(self, queue_size=None):
+        super().__init__(queue_size)
+        self._poller = None
+        self._stopped = threading.Event()
+
+    def subscribe(self, topics):
+        subscription = super().subscribe(topics)
+        with self._lock:
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, name='realtime-poller', daemon=True)
+                self._poller.start()
+        return subscription
+
+    def publish(self, topic, event, data, event_id=None):
+        """Store the message for the pollers. Returns 1: who subscribes is only known to them."""
+        RealtimeEvent.objects.create(topic=topic, event=event, data=data, event_id=event_id or '')
+        metrics.incr('realtime.published')
+        return 1
+
+    def stop(self):
+        """End the poller thread (tests and load_realtime; servers just exit)."""
+        self._stopped.set()
+        if self._poller is not None:
+            self._poller.join()
+
+    def _poll(self):
+        last_id, next_prune = None, 0
+        while not self._stopped.is_set():
+            try:
+                if last_id is None:
+                    # Start after what was published before the first stream opened
+                    last_id = RealtimeEvent.objects.aggregate(last=Max('id'))['last'] or 0
+                rows = list(RealtimeEvent.objects.filter(id__gt=last_id).order_by('id')
+                            .values_list('id', 'topic', 'event', 'data', 'event_id')[:POLL_BATCH])
+                if time.monotonic() >= next_prune:
+                    expired = timezone.now() - timedelta(seconds=settings.REALTIME_RETENTION_SECONDS)
+                    RealtimeEvent.objects.filter(created_at__lt=expired).delete()
+                    next_prune = time.monotonic() + PRUNE_SECONDS
+            except DatabaseError:
+                metrics.incr('realtime.poll_errors')
+                connection.close()  # Reconnect on the next poll
+                rows = []
+            for row_id, topic, event, data, event_id in rows:
+                self._fan_out(topic, (event, data, event_id or None))
+                last_id = row_id
+            if len(rows) < POLL_BATCH:
+                self._stopped.wait(settings.REALTIME_POLL_SECONDS)
+        connection.close()
+
+
+class RecordingBroker(InProcessBroker):
+    """InProcessBroker that also keeps every published message in .published."""
+
+    def __init__(self, queue_size=None):
+        super().__init__(queue_size)
+        self.published = []
+
+    def publish(self, topic, event, data, event_id=None):
+        self.published.append((topic, event, data, event_id))
+        return super().publish(topic, event, data, event_id)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.REALTIME_BROKER)()
+    return _broker
+
+
+def set_broker(broker):
+    """Replace the broker (None: rebuild from settings on next use)."""
+    global _broker
+    with _broker_lock:
+        _broker = broker
+
+
+def publish(topic, event, data, event_id=None):
+    if not settings.REALTIME_ENABLED:
+        return 0
+    return get_broker().publish(topic, event, data, event_id)
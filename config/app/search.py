@@ -0,0 +1,301 @@
+"""
+Full-text search over issues (title, description and their solutions' text)
+with status and date filters and keyset pagination.
+
+The index is a table outside the ORM, created by migration 0030 and kept in
+step by database triggers, so bulk_create and update() are covered too:
+
+  SQLite      FTS5 table app_issue_search (porter stemming). status and
+              the reported date are indexed as tokens ("inreview",
+              "y2024 m202403 d20240315"). Filters are then doclist
+              intersections, not row lookups, and a date range is a
+              handful of year/month/day tokens.
+  PostgreSQL  app_issue_search(issue_id, document tsvector) with a GIN
+              index; title, description and solutions weighted A/B/C.
+
+On SQLite, a migration that rebuilds app_issue or app_solution (most
+AddField / AlterField operations) drops the triggers with the old table;
+follow it with a rebuild of the index, as 0033 does after 0031.
+
+Two orders:
+
+  'recent'     every match, newest first, paged by issue id. The cost is
+               the same on page 1 and page 500.
+  'relevance'  the newest SEARCH_RANK_WINDOW matches, best first. Ranking
+               every match of a common word ("leak") means scoring a good
+               part of the table on each request. Instead the newest N are
+               scored (hit counts per field, weighted and length-normalized
+               in Python on SQLite; ts_rank_cd on PostgreSQL) and paged by
+               (score, id). The cursor pins the window, so new issues do
+               not reshuffle later pages. 'recent' reaches everything
+               beyond the window.
+
+Without search words the board lists issues by (reported_date, id) with
+the existing indexes. `manage.py bench_search` times all of this on a
+seeded database.
+"""
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from .llm_cache import STOPWORDS
+from .models import Issue
+
+SORTS = ('relevance', 'recent')
+STATUSES = [value for value, _ in Issue.STATUS_CHOICES]
+MAX_TERMS = 8
+MAX_PAGE = 50
+WORD_RE = re.compile(r'\w+')
+
+# Field weights and BM25-style saturation for relevance on SQLite
+FIELDS = ('title', 'description', 'solutions')
+WEIGHTS = (10.0, 4.0, 1.0)
+K1 = 1.2
+B = 0.75
+
+
+@dataclass
+class Page:
+    issues: list
+    next_cursor: str = None
+    sort: str = 'recent'
+
+
+def terms_for(text):
+    """Search words: lowercased, stopwords dropped, at most MAX_TERMS."""
+    words = [word for word in WORD_RE.findall((text or '').lower()) if word not in STOPWORDS]
+    return list(dict.fromkeys(words))[:MAX_TERMS]
+
+
+# Cursors: colon-separated, shape depends on the order they page through
+
+def _encode(*parts):
+    return ':'.join(map(str, parts))
+
+
+def _decode(cursor, *types):
+    parts = cursor.split(':')
+    try:
+        if len(parts) != len(types):
+            raise ValueError
+        return [convert(part) for convert, part in zip(types, parts)]
+    except ValueError:
+        raise ValueError("Invalid cursor.") from None
+
+
+# Dates
+
+def _month_end(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+
+
+def period_tokens(start, end):
+    """The fewest y/m/d tokens (see migration 0030) that cover start..end inclusive."""
+    tokens = []
+    day = start
+    while day <= end:
+        if day.month == 1 and day.day == 1 and date(day.year, 12, 31) <= end:
+            tokens.append(f'y{day.year}')
+            day = date(day.year + 1, 1, 1)
+        elif day.day == 1 and _month_end(day) <= end:
+            tokens.append(f'm{day:%Y%m}')
+            day = _month_end(day) + timedelta(days=1)
+        else:
+            tokens.append(f'd{day:%Y%m%d}')
+            day += timedelta(days=1)
+    return tokens
+
+
+# Index backends: matches(...) -> ids newest first; scored(...) -> [(id, score)]
+
+class _SQLiteIndex:
+    def _match(self, terms, status, reported_from, reported_to):
+        words = ' '.join(f'"{term}"' for term in terms)
+        expression = f'{{{" ".join(FIELDS)}}} : ({words})'
+        if status:
+            expression += f' AND status : "{status.lower().replace(" ", "")}"'
+        if reported_from or reported_to:
+            start = reported_from or Issue.objects.aggregate(first=Min('reported_date'))['first']
+            end = reported_to or timezone.localdate()
+            if start is None or start > end:
+                return None
+            expression += f' AND period : ({" OR ".join(period_tokens(start, end))})'
+        return expression
+
+    def matches(self, terms, filters, before_id, limit):
+        expression = self._match(terms, *filters)
+        if expression is None:
+            return []
+        sql = 'SELECT rowid FROM app_issue_search WHERE app_issue_search MATCH %s'
+        params = [expression]
+        if before_id is not None:
+            sql += ' AND rowid < %s'
+            params.append(before_id)
+        sql += ' ORDER BY rowid DESC LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+    def scored(self, terms, filters, as_of, size):
+        expression = self._match(terms, *filters)
+        if expression is None:
+            return []
+        # highlight() marks this query's hits per field without the corpus-wide
+        # statistics bm25() gathers first (a full doclist read per word)
+        highlights = ', '.join(f"highlight(app_issue_search, {n}, char(1), '')" for n in range(len(FIELDS)))
+        sql = (f'SELECT rowid, {highlights} FROM app_issue_search WHERE app_issue_search MATCH %s'
+               ' AND rowid <= %s ORDER BY rowid DESC LIMIT %s')
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [expression, as_of, size])
+            rows = cursor.fetchall()
+        if not rows:
+            return []
+        lengths = [[(text or '').count(' ') + 1 for text in row[1:]] for row in rows]
+        averages = [sum(column) / len(rows) or 1 for column in zip(*lengths)]
+        scored = []
+        for row, row_lengths in zip(rows, lengths):
+            score = 0.0
+            for text, length, average, weight in zip(row[1:], row_lengths, averages, WEIGHTS):
+                hits = (text or '').count('\x01')
+                if hits:
+                    score += weight * hits * (K1 + 1) / (hits + K1 * (1 - B + B * length / average))
+            scored.append((row[0], round(score, 6)))
+        return scored
+
+
+class _PostgresIndex:
+    def _where(self, terms, status, reported_from, reported_to):
+        sql = "s.document @@ plainto_tsquery('english', %s)"
+        params = [' '.join(terms)]
+        if status:
+            sql += ' AND i.status = %s'
+            params.append(status)
+        if reported_from:
+            sql += ' AND i.reported_date >= %s'
+            params.append(reported_from)
+        if reported_to:
+            sql += ' AND i.reported_date <= %s'
+            params.append(reported_to)
+        return sql, params
+
+    def matches(self, terms, filters, before_id, limit):
+        where, params = self._where(terms, *filters)
+        if before_id is not None:
+            where += ' AND s.issue_id < %s'
+            params.append(before_id)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT s.issue_id FROM app_issue_search s JOIN app_issue i ON i.id = s.issue_id'
+                f' WHERE {where} ORDER BY s.issue_id DESC LIMIT %s', params + [limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def scored(self, terms, filters, as_of, size):
+        where, params = self._where(terms, *filters)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT issue_id, ts_rank_cd('{0.1, 0.2, 0.4, 1.0}', document, plainto_tsquery('english', %s), 32)"
+                ' FROM (SELECT s.issue_id, s.document FROM app_issue_search s JOIN app_issue i ON i.id = s.issue_id'
+                f' WHERE {where} AND s.issue_id <= %s ORDER BY s.issue_id DESC LIMIT %s) AS candidates',
+                [' '.join(terms)] + params + [as_of, size],
+            )
+            return [(issue_id, round(score, 6)) for issue_id, score in cursor.fetchall()]
+
+
+class _LikeIndex:
+    """Other backends (no index table): substring matches, ranked by recency."""
+
+    def matches(self, terms, filters, before_id, limit):
+        queryset = _filtered(Issue.objects.all(), *filters)
+        for term in terms:
+            queryset = queryset.filter(Q(title__icontains=term) | Q(description__icontains=term)
+                                       | Q(solutions__description__icontains=term))
+        if before_id is not None:
+            queryset = queryset.filter(id__lt=before_id)
+        return list(queryset.distinct().order_by('-id').values_list('id', flat=True)[:limit])
+
+    def scored(self, terms, filters, as_of, size):
+        return [(issue_id, 0.0) for issue_id in self.matches(terms, filters, as_of + 1, size)]
+
+
+def _index():
+    if connection.vendor == 'sqlite':
+        return _SQLiteIndex()
+    if connection.vendor == 'postgresql':
+        return _PostgresIndex()
+    return _LikeIndex()
+
+
+def _filtered(queryset, status, reported_from, reported_to):
+    if status:
+        queryset = queryset.filter(status=status)
+    if reported_from:
+        queryset = queryset.filter(reported_date__gte=reported_from)
+    if reported_to:
+        queryset = queryset.filter(reported_date__lte=reported_to)
+    return queryset
+
+
+def _load(ids):
+    issues = Issue.objects.select_related('reported_by_id').in_bulk(ids)
+    return [issues[issue_id] for issue_id in ids if issue_id in issues]
+
+
+def search(text='', status=None, reported_from=None, reported_to=None, sort='relevance', cursor=None, limit=None):
+    """
+    One page of issues. ValueError for an unknown status or sort, a date range
+    that ends before it starts, or a cursor that does not fit the query.
+    """
+    limit = max(1, min(limit or settings.SEARCH_PAGE_SIZE, MAX_PAGE))
+    if status and status not in STATUSES:
+        raise ValueError(f"Unknown status: {status}")
+    if sort not in SORTS:
+        raise ValueError(f"Unknown sort: {sort}")
+    if reported_from and reported_to and reported_from > reported_to:
+        raise ValueError("The date range ends before it starts.")
+    filters = (status, reported_from, reported_to)
+    terms = terms_for(text)
+
+    if not terms:
+        # The board: newest first on (reported_date, id), served by the
+        # reported_date indexes (with status: issue_status_recent_idx)
+        queryset = _filtered(Issue.objects.select_related('reported_by_id'), *filters)
+        if cursor:
+            day, issue_id = _decode(cursor, date.fromisoformat, int)
+            # <= keeps the index range; the exclude drops the ties already shown
+            queryset = queryset.filter(reported_date__lte=day).exclude(reported_date=day, id__gte=issue_id)
+        issues = list(queryset.order_by('-reported_date', '-id')[:limit + 1])
+        more = len(issues) > limit
+        issues = issues[:limit]
+        next_cursor = _encode(issues[-1].reported_date.isoformat(), issues[-1].id) if more else None
+        return Page(issues, next_cursor, 'recent')
+
+    index = _index()
+    if sort == 'recent':
+        before_id = _decode(cursor, int)[0] if cursor else None
+        ids = index.matches(terms, filters, before_id, limit + 1)
+        more = len(ids) > limit
+        ids = ids[:limit]
+        return Page(_load(ids), _encode(ids[-1]) if more else None, sort)
+
+    if cursor:
+        as_of, last_score, last_id = _decode(cursor, int, float, int)
+    else:
+        newest = index.matches(terms, filters, None, 1)
+        if not newest:
+            return Page([], None, sort)
+        as_of, last_score, last_id = newest[0], None, None
+    ranked = sorted(index.scored(terms, filters, as_of, settings.SEARCH_RANK_WINDOW),
+                    key=lambda pair: (-pair[1], -pair[0]))
+    if last_id is not None:
+        ranked = [(issue_id, score) for issue_id, score in ranked
+                  if (score, issue_id) < (last_score, last_id)]
+    page = ranked[:limit]
+    next_cursor = _encode(as_of, page[-1][1], page[-1][0]) if len(ranked) > limit else None
+    return Page(_load([issue_id for issue_id, _ in page]), next_cursor, sort)
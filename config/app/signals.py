@@ -0,0 +1,95 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import analytics, auth, fragments, images, notifications, realtime, similarity, stats
+from .dispatcher import dispatch_issue
+from .models import Issue, SiteNotification, Solution, UserDetails
+
+
+@receiver(post_save, sender=Issue)
+def ai_suggest_solution(sender, instance, created, **kwargs):
+    # Hand off to the AI dispatcher once the issue is committed; the request
+    # that raised it never waits on OpenAI (see app/dispatcher.py)
+    if created:
+        transaction.on_commit(lambda: dispatch_issue(instance.pk, instance.reported_by_id_id))
+
+
+@receiver(post_save, sender=Issue)
+def update_similarity_index(sender, instance, **kwargs):
+    similarity.update_issue(instance)
+
+
+@receiver(post_delete, sender=Issue)
+def drop_from_similarity_index(sender, instance, **kwargs):
+    similarity.remove_issue(instance.pk)
+
+
+@receiver(post_save, sender=Issue)
+def update_issue_stats(sender, instance, created, **kwargs):
+    # Issue.from_db records the loaded status; an instance that was never
+    # loaded (or loaded without its status) is only counted on creation
+    if created:
+        stats.apply_change(instance.reported_by_id_id, new_status=instance.status)
+    elif hasattr(instance, '_loaded_status') and instance._loaded_status != instance.status:
+        stats.apply_change(instance.reported_by_id_id, instance._loaded_status, instance.status)
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=Issue)
+def drop_from_issue_stats(sender, instance, **kwargs):
+    stats.apply_change(instance.reported_by_id_id, old_status=getattr(instance, '_loaded_status', instance.status))
+
+
+@receiver([post_save, post_delete], sender=Issue)
+def mark_analytics_dirty(sender, instance, **kwargs):
+    if instance.reported_date:
+        analytics.mark_dirty(instance.reported_date)
+
+
+@receiver(post_save, sender=SiteNotification)
+def push_notification(sender, instance, created, **kwargs):
+    # Fan out to open /events/ streams once the row is visible to the feed
+    if created:
+        transaction.on_commit(lambda: realtime.publish(
+            realtime.NOTIFICATIONS, 'notification', notifications.serialize(instance),
+            notifications.cursor_for(instance),
+        ))
+
+
+@receiver(post_save, sender=Issue)
+def process_issue_image(sender, instance, **kwargs):
+    if images.needs_processing(instance.image, instance.image_variants):
+        transaction.on_commit(lambda: images.schedule(instance))
+
+
+@receiver(post_save, sender=UserDetails)
+def process_profile_picture(sender, instance, **kwargs):
+    if images.needs_processing(instance.profile_picture, instance.profile_picture_variants):
+        transaction.on_commit(lambda: images.schedule(instance))
+
+
+@receiver([post_save, post_delete], sender=UserDetails)
+def forget_cached_resident(sender, instance, **kwargs):
+    auth.forget(instance.pk)
+
+
+# Fragment cache invalidation (app/fragments.py): bump the stamps of every
+# rendered fragment that shows the changed row
+
+@receiver([post_save, post_delete], sender=Issue)
+def bump_issue_fragments(sender, instance, **kwargs):
+    # Status shows in the recent-issues table, the solution list and decides
+    # which notifications are visible
+    fragments.bump(fragments.issue_scope(instance.pk), fragments.user_issues_scope(instance.reported_by_id_id),
+                   fragments.NOTIFICATIONS)
+
+
+@receiver([post_save, post_delete], sender=Solution)
+def bump_solution_fragments(sender, instance, **kwargs):
+    fragments.bump(fragments.issue_scope(instance.issue_id))
+
+
+@receiver([post_save, post_delete], sender=SiteNotification)
+def bump_notification_fragments(sender, instance, **kwargs):
+    fragments.bump(fragments.NOTIFICATIONS)
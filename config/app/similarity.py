@@ -0,0 +1,215 @@
+"""
+In-memory similarity index over resolved issues.
+
+Each resolved issue that has an Accepted solution is turned into a hashed
+bag of word unigrams and character trigrams (SIMILARITY_DIM float32 buckets,
+L2-normalised), so cosine similarity is a single matrix-vector product. The
+index is built lazily from the database, kept current by the Issue signals
+in app/signals.py and fully rebuilt every SIMILARITY_REFRESH_SECONDS to pick
+up changes made by other processes.
+"""
+import threading
+import time
+import zlib
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Prefetch
+
+from . import metrics
+from .llm_cache import STOPWORDS, WORD_RE, stem
+from .models import Issue, Solution
+
+
+def _features(text):
+    words = [stem(w) for w in WORD_RE.findall((text or '').lower()) if w not in STOPWORDS]
+    for word in words:
+        yield 'w:' + word, 1.0
+        padded = f"#{word}#"
+        for i in range(len(padded) - 2):
+            yield 'c:' + padded[i:i + 3], 0.5
+
+
+def vectorize(text, dim=None):
+    dim = dim or settings.SIMILARITY_DIM
+    vec = np.zeros(dim, dtype=np.float32)
+    for feature, weight in _features(text):
+        # crc32 rather than hash(): stable across processes and restarts
+        h = zlib.crc32(feature.encode('utf-8'))
+        vec[h % dim] += weight if (h >> 31) & 1 else -weight
+    norm = np.linalg.norm(vec)
+    if norm:
+        vec /= norm
+    return vec
+
+
+def issue_text(issue):
+    return f"{issue.title} {issue.description}"
+
+
+class SimilarityIndex:
+    def __init__(self, dim):
+        self.dim = dim
+        self._matrix = np.zeros((64, dim), dtype=np.float32)
+        self._ids = np.zeros(64, dtype=np.int64)
+        self._rows = {}  # issue id -> row
+        self._size = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, issue_id):
+        return issue_id in self._rows
+
+    def add(self, issue_id, text):
+        vec = vectorize(text, self.dim)
+        with self._lock:
+            row = self._rows.get(issue_id)
+            if row is None:
+                if self._size == len(self._ids):
+                    self._grow()
+                row = self._size
+                self._size += 1
+                self._rows[issue_id] = row
+                self._ids[row] = issue_id
+            self._matrix[row] = vec
+
+    def remove(self, issue_id):
+        with self._lock:
+            row = self._rows.pop(issue_id, None)
+            if row is None:
+                return
+            # Move the last row into the hole to keep the matrix dense
+            last = self._size - 1
+            if row != last:
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = self._ids[last]
+                self._rows[int(self._ids[row])] = row
+            self._matrix[last] = 0
+            self._size -= 1
+
+    def query(self, text, k=5, min_score=0.0, exclude=()):
+        """Return [(issue_id, score), ...] best first."""
+        vec = vectorize(text, self.dim)
+        with self._lock:
+            if not self._size:
+                return []
+            scores = self._matrix[:self._size] @ vec
+            ids = self._ids[:self._size].copy()
+        wanted = min(len(scores), k + len(exclude))
+        top = np.argpartition(-scores, wanted - 1)[:wanted]
+        top = top[np.argsort(-scores[top])]
+        results = []
+        for row in top:
+            issue_id, score = int(ids[row]), float(scores[row])
+            if score < min_score or issue_id in exclude:
+                continue
+            results.append((issue_id, score))
+            if len(results) == k:
+                break
+        return results
+
+    def _grow(self):
+        capacity = len(self._ids) * 2
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        ids = np.zeros(capacity, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+        self._matrix, self._ids = matrix, ids
+
+
+def resolved_issues():
+    """Issues eligible for the index: resolved, with at least one Accepted solution."""
+    return Issue.objects.filter(status='Resolved', solutions__status='Accepted').distinct()
+
+
+def build_index():
+    index = SimilarityIndex(settings.SIMILARITY_DIM)
+    for issue_id, title, description in resolved_issues().values_list('id', 'title', 'description').iterator():
+        index.add(issue_id, f"{title} {description}")
+    return index
+
+
+_index = None
+_built_at = 0.0
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index, _built_at
+    if _index is None or time.monotonic() - _built_at > settings.SIMILARITY_REFRESH_SECONDS:
+        with _index_lock:
+            if _index is None or time.monotonic() - _built_at > settings.SIMILARITY_REFRESH_SECONDS:
+                _index = build_index()
+                _built_at = time.monotonic()
+    return _index
+
+
+def reset_index():
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def update_issue(issue):
+    """Incremental update, called from the Issue post_save signal."""
+    if _index is None:
+        return  # Not built yet in this process; the lazy build will see the row
+    if issue.status == 'Resolved' and issue.solutions.filter(status='Accepted').exists():
+        _index.add(issue.id, issue_text(issue))
+    else:
+        _index.remove(issue.id)
+
+
+def remove_issue(issue_id):
+    if _index is not None:
+        _index.remove(issue_id)
+
+
+def find_similar_resolved(text, k=3, exclude=(), min_score=None):
+    """
+    Resolved issues similar to `text`, each with its accepted solutions.
+
+    Returns a list of dicts: {'issue', 'solution', 'score'}.
+    """
+    if min_score is None:
+        min_score = settings.SIMILARITY_MIN_SCORE
+    hits = get_index().query(text, k=k, min_score=min_score, exclude=set(exclude))
+    if not hits:
+        return []
+    accepted = Prefetch('solutions', queryset=Solution.objects.filter(status='Accepted').order_by('-upvotes'),
+                        to_attr='accepted_solutions')
+    issues = Issue.objects.filter(id__in=[issue_id for issue_id, _ in hits]).prefetch_related(accepted)
+    by_id = {issue.id: issue for issue in issues}
+    results = []
+    for issue_id, score in hits:
+        issue = by_id.get(issue_id)
+        if issue is None or not issue.accepted_solutions:
+            continue
+        results.append({'issue': issue, 'solution': issue.accepted_solutions[0], 'score': round(score, 3)})
+    return results
+
+
+def near_duplicate(issue):
+    """Best accepted match for `issue` if it clears SIMILARITY_REUSE_THRESHOLD, else None."""
+    matches = find_similar_resolved(issue_text(issue), k=1, exclude=[issue.id],
+                                    min_score=settings.SIMILARITY_REUSE_THRESHOLD)
+    return matches[0] if matches else None
+
+
+def reused_answer(issue):
+    """
+    A near-duplicate's accepted solution, shaped like an AI answer, so the
+    caller can skip the OpenAI call entirely. None when nothing is close enough.
+    """
+    match = near_duplicate(issue)
+    if match is None:
+        return None
+    metrics.incr('similarity.reused')
+    solution = match['solution']
+    return {
+        'title': solution.title,
+        'description': f"{solution.description}\n\n(Accepted for a similar issue: \"{match['issue'].title}\")",
+        'confidence': round(match['score'] * 100),
+    }
@@ -0,0 +1,80 @@
+"""
+Per-resident issue counters (UserIssueStats).
+
+Counters move with F() deltas whenever an issue is created, changes status
+or is deleted, so the dashboard reads one row instead of running COUNT
+queries. rebuild() recomputes rows from the Issue table to repair drift.
+"""
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Issue, UserIssueStats
+
+STATUS_FIELDS = {
+    'Open': 'open_count',
+    'In Review': 'in_review_count',
+    'Resolved': 'resolved_count',
+}
+
+
+def apply_change(user_id, old_status=None, new_status=None, count=1):
+    """Move `count` issues of `user_id` from old_status to new_status (either may be None)."""
+    changes = {}
+    if old_status in STATUS_FIELDS:
+        field = STATUS_FIELDS[old_status]
+        changes[field] = F(field) - count
+    if new_status in STATUS_FIELDS:
+        field = STATUS_FIELDS[new_status]
+        changes[field] = F(field) + count if field not in changes else changes[field] + count
+    if not changes:
+        return
+    updated = UserIssueStats.objects.filter(user_id=user_id).update(updated_at=timezone.now(), **changes)
+    if not updated:
+        # First issue for this resident (or the row was lost): compute from scratch
+        rebuild([user_id])
+
+
+def rebuild(user_ids=None):
+    """Recompute counters from Issue rows. Returns the number of rows that had drifted."""
+    issues = Issue.objects.all()
+    if user_ids is not None:
+        issues = issues.filter(reported_by_id__in=user_ids)
+    totals = issues.values('reported_by_id').annotate(
+        **{field: Count('id', filter=Q(status=status)) for status, field in STATUS_FIELDS.items()}
+    )
+    fresh = {row['reported_by_id']: row for row in totals}
+    if user_ids is not None:
+        for user_id in user_ids:
+            fresh.setdefault(user_id, {})
+
+    existing = {stats.user_id: stats for stats in UserIssueStats.objects.filter(user_id__in=list(fresh))}
+    drifted, to_create, to_update = 0, [], []
+    for user_id, row in fresh.items():
+        values = {field: row.get(field, 0) for field in STATUS_FIELDS.values()}
+        stats = existing.get(user_id)
+        if stats is None:
+            to_create.append(UserIssueStats(user_id=user_id, **values))
+            continue
+        if any(getattr(stats, field) != value for field, value in values.items()):
+            drifted += 1
+            for field, value in values.items():
+                setattr(stats, field, value)
+            stats.updated_at = timezone.now()
+            to_update.append(stats)
+    UserIssueStats.objects.bulk_create(to_create, ignore_conflicts=True)
+    UserIssueStats.objects.bulk_update(to_update, list(STATUS_FIELDS.values()) + ['updated_at'], batch_size=500)
+    if user_ids is None:
+        # Residents with no issues left keep a zeroed row
+        stale = UserIssueStats.objects.exclude(user_id__in=list(fresh)).exclude(
+            open_count=0, in_review_count=0, resolved_count=0)
+        drifted += stale.update(open_count=0, in_review_count=0, resolved_count=0, updated_at=timezone.now())
+    return drifted
+
+
+def for_user(user):
+    """The resident's counters row, built on first use."""
+    stats = UserIssueStats.objects.filter(user=user).first()
+    if stats is None:
+        rebuild([user.id])
+        stats = UserIssueStats.objects.get(user=user)
+    return stats
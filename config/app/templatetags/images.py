@@ -0,0 +1,30 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from ..images import FORMATS
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(field_file, variants, slot, alt='', css_class=''):
+    """
+    <picture> for an image field in the given slot (see app/images.py SLOTS):
+    AVIF and WebP sources where they were built, a sized JPEG <img> otherwise.
+    Before the pipeline has run it falls back to the uploaded file itself.
+    """
+    if not field_file:
+        return ''
+    entry = (variants or {}).get('slots', {}).get(slot)
+    if not entry or (variants or {}).get('original') != field_file.name:
+        return format_html('<img src="{}" alt="{}" class="{}" loading="lazy" decoding="async">',
+                           field_file.url, alt, css_class)
+    sources = format_html_join(
+        '', '<source srcset="{}" type="{}">',
+        ((default_storage.url(entry[ext]), FORMATS[ext][1]) for ext in ('avif', 'webp') if ext in entry),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" alt="{}" class="{}" width="{}" height="{}" loading="lazy" decoding="async"></picture>',
+        sources, default_storage.url(entry['jpeg']), alt, css_class, entry['width'], entry['height'],
+    )
@@ -0,0 +1,42 @@
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from app.models import UserDetails
+
+
+class ResidentAdminTests(TestCase):
+    """Residents added in the admin get a hashed password, or an unusable one, never an empty one."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'x'))
+
+    def add(self, email, new_password=''):
+        response = self.client.post(reverse('admin:app_userdetails_add'), {
+            'email': email, 'full_name': '', 'flat_number': '4', 'role': 'owner', 'new_password': new_password,
+        })
+        self.assertEqual(response.status_code, 302)  # Saved and redirected to the list
+        return UserDetails.objects.get(email=email)
+
+    def test_password_is_hashed(self):
+        resident = self.add('new@example.com', 'correct horse battery')
+        self.assertNotIn('correct horse battery', resident.password)
+        self.assertEqual(authenticate(email='new@example.com', password='correct horse battery'), resident)
+
+    def test_no_password_means_no_login(self):
+        resident = self.add('nopass@example.com')
+        self.assertTrue(resident.password.startswith('!'))
+        self.assertIsNone(authenticate(email='nopass@example.com', password=''))
+        self.assertIsNone(authenticate(email='nopass@example.com', password=resident.password))
+        # Setting one in the admin later lets them in, and a blank field keeps it
+        change = reverse('admin:app_userdetails_change', args=[resident.id])
+        data = {'email': resident.email, 'full_name': '', 'flat_number': '4', 'role': 'owner'}
+        self.client.post(change, {**data, 'new_password': 'correct horse battery'})
+        self.client.post(change, {**data, 'new_password': ''})
+        self.assertEqual(authenticate(email='nopass@example.com', password='correct horse battery'), resident)
+
+    def test_empty_stored_password_never_matches(self):
+        # Rows saved by the admin before it had a password field
+        UserDetails.objects.create(email='empty@example.com', password='', flat_number='1', role='owner')
+        self.assertIsNone(authenticate(email='empty@example.com', password=''))
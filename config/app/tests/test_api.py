@@ -0,0 +1,29 @@
+from django.test import TestCase, override_settings
+
+from app.models import Issue, UserDetails
+
+
+@override_settings(AI_DISPATCH_MODE='off')
+class ConditionalSparseFieldsTests(TestCase):
+    """?fields= is validated before If-None-Match is answered, and is part of the ETag."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.resident = UserDetails.objects.create(email='api@example.com', password='x', flat_number='1', role='owner')
+        cls.issue = Issue.objects.create(title='Leak', description='Kitchen', reported_by_id=cls.resident)
+
+    def setUp(self):
+        session = self.client.session
+        session['user_id'] = self.resident.id
+        session.save()
+
+    def test_bad_fields_are_400_not_304(self):
+        # '*' matches any current ETag, as a stale one from before a field was dropped would
+        self.assertEqual(self.client.get('/api/v1/issues/?fields=id', HTTP_IF_NONE_MATCH='*').status_code, 304)
+        for url in ('/api/v1/issues/?fields=nope', f'/api/v1/issues/{self.issue.id}/?fields=id,nope'):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, 400)
+
+    def test_projections_have_their_own_etags(self):
+        etags = {self.client.get(f'/api/v1/issues/{self.issue.id}/?fields={fields}').headers['ETag']
+                 for fields in ('id', 'id,title', '')}
+        self.assertEqual(len(etags), 3)
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import TestCase, override_settings
+
+from app.models import Issue, UserDetails
+
+
+@override_settings(AI_DISPATCH_MODE='off')
+class AsgiResidentTests(TestCase):
+    """
+    Sync views and the API under ASGI (the default profile) see
+    request.resident too. The sync test client never goes through the
+    middleware's async path, so these use AsyncClient.
+    """
+
+    def setUp(self):
+        self.resident = UserDetails.objects.create(email='asgi@example.com', password='x', flat_number='1', role='owner')
+        self.issue = Issue.objects.create(title='Leak', description='Kitchen', reported_by_id=self.resident)
+        session = SessionStore()
+        session['user_id'] = self.resident.id
+        session.create()
+        self.async_client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+    async def test_sync_view(self):
+        response = await self.async_client.get('/issues/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Leak')
+
+    async def test_api(self):
+        response = await self.async_client.get('/api/v1/issues/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([issue['id'] for issue in response.json()['results']], [self.issue.id])
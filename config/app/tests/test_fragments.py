@@ -0,0 +1,37 @@
+import re
+
+from django.test import TestCase, override_settings
+
+from app import notifications
+from app.models import Issue, SiteNotification, UserDetails
+
+
+@override_settings(AI_DISPATCH_MODE='off', FRAGMENT_CACHE_ENABLED=True)
+class NotificationPanelTests(TestCase):
+    """The cached panel is shared by every resident; each one's unread count is their own."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.other = [
+            UserDetails.objects.create(email=f'{name}@example.com', password='x', flat_number='1', role='owner')
+            for name in ('reader', 'other')
+        ]
+        issue = Issue.objects.create(title='Leak', description='Kitchen', reported_by_id=cls.reader)
+        cls.notes = [SiteNotification.objects.create(title='Vote Requested!', message=f'note {n}', issue=issue)
+                     for n in range(2)]
+
+    def home(self, resident):
+        session = self.client.session
+        session['user_id'] = resident.id
+        session.save()
+        body = self.client.get('/home/').content.decode()
+        panel = re.search(r'<div class="popup-content-scroll" id="notificationList".*?</a>', body, re.S).group()
+        unread = int(re.search(r'let unreadNotifications = (\d+);', body).group(1))
+        return panel, unread
+
+    def test_read_state_is_per_viewer(self):
+        notifications.mark_seen(self.reader.id, (self.notes[-1].created_at, self.notes[-1].id))
+        reader_panel, reader_unread = self.home(self.reader)  # Renders and caches the panel
+        other_panel, other_unread = self.home(self.other)
+        self.assertEqual(other_panel, reader_panel)
+        self.assertEqual((reader_unread, other_unread), (0, 2))
@@ -0,0 +1,30 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from app import jobs
+from app.models import BackgroundJob, Issue, UserDetails
+
+
+@override_settings(AI_DISPATCH_MODE='off', AI_GENERATION_BATCH_SIZE=5)
+class EmptyGenerationTests(TestCase):
+    """A generation run that stores no suggestion fails the job, so page views wait out the cooldown."""
+
+    @classmethod
+    def setUpTestData(cls):
+        reporter = UserDetails.objects.create(email='jobs@example.com', password='x', flat_number='1', role='owner')
+        cls.issues = [Issue.objects.create(title=f'Leak {n}', description='Kitchen', reported_by_id=reporter)
+                      for n in range(2)]
+
+    def test_empty_result_is_not_requeued(self):
+        first = [jobs.enqueue_ai_solution(issue) for issue in self.issues]
+        with mock.patch('app.generation.generate', return_value=[]) as generate:
+            jobs.run_pending(limit=1)  # The second issue rides along with the first
+        generate.assert_called_once()
+        self.assertEqual(
+            list(BackgroundJob.objects.order_by('id').values_list('status', 'last_error')),
+            [('failed', jobs.NO_SUGGESTIONS)] * 2,
+        )
+        # The next page views get the failed jobs back instead of new ones
+        self.assertEqual([jobs.enqueue_ai_solution(issue) for issue in self.issues], first)
+        self.assertEqual(BackgroundJob.objects.count(), 2)
@@ -0,0 +1,59 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from app import similarity
+from app.models import Issue, Solution, UserDetails, Vote
+
+# Queries issue_details_view may run, whatever the number of solutions or votes:
+# session, issue + reporter, solutions + authors + the viewer's vote flag
+ISSUE_DETAILS_QUERIES = 3
+
+
+# Fragment cache off: the pin is for the queries behind a cache miss
+@override_settings(AI_DISPATCH_MODE='off', FRAGMENT_CACHE_ENABLED=False)
+class IssueDetailsQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = UserDetails.objects.create(email='viewer@example.com', password='x', flat_number='1', role='owner')
+
+    def setUp(self):
+        # Built once per process, not per request
+        similarity.reset_index()
+        similarity.get_index()
+        self.addCleanup(similarity.reset_index)
+        session = self.client.session
+        session['user_id'] = self.viewer.id
+        session.save()
+
+    def seed(self, count):
+        reporter = UserDetails.objects.create(email=f'reporter{count}@example.com', password='x',
+                                              flat_number='2', role='owner')
+        issue = Issue.objects.create(title='Lift stuck', description='Between floors', reported_by_id=reporter)
+        authors = UserDetails.objects.bulk_create([
+            UserDetails(email=f'author{count}-{i}@example.com', password='x', flat_number=str(i), role='renter')
+            for i in range(count)
+        ])
+        # The first solution is the AI one, so the view has nothing to enqueue
+        solutions = Solution.objects.bulk_create([
+            Solution(title=f'Fix {i}', description='Seeded.', issue=issue, suggested_by=author,
+                     is_ai=i == 0, is_voting_enabled=True, upvotes=i % 5)
+            for i, author in enumerate(authors)
+        ])
+        Vote.objects.bulk_create(
+            [Vote(solution=solution, voter=author, vote_type='upvote') for solution in solutions for author in authors[:5]]
+            + [Vote(solution=solution, voter=self.viewer, vote_type='upvote') for solution in solutions[::2]]
+        )
+        return issue
+
+    def assertConstantQueries(self, solutions):
+        issue = self.seed(solutions)
+        with self.assertNumQueries(ISSUE_DETAILS_QUERIES):
+            response = self.client.get(reverse('issue_details', args=[issue.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Already Voted')
+
+    def test_one_solution(self):
+        self.assertConstantQueries(1)
+
+    def test_many_solutions_and_votes(self):
+        self.assertConstantQueries(60)
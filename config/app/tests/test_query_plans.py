@@ -0,0 +1,141 @@
+"""
+Query-plan regression tests: every page and API view is requested against
+a seeded database and each SELECT it issues is EXPLAINed. A plan that reads
+a whole table fails the test, naming the query and its plan.
+"""
+import re
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from app import notifications, similarity, stats
+from app.models import Issue, SiteNotification, Solution, UserDetails, Vote
+
+# EXPLAIN output that means "read every row of the table"
+FULL_SCAN = {
+    'sqlite': re.compile(r'^SCAN (?:TABLE )?(\w+)$'),
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+}
+STATUSES = ['Open', 'In Review', 'Resolved']
+ISSUES = 20_000  # Enough rows that the planner prefers an index wherever one fits
+USERS = 500
+
+
+@skipUnless(connection.vendor in FULL_SCAN, "No plan checks for this database backend.")
+@override_settings(AI_DISPATCH_MODE='off')
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        users = UserDetails.objects.bulk_create([
+            UserDetails(email=f'resident{i}@example.com', password='x', flat_number=str(i), role='owner')
+            for i in range(USERS)
+        ], batch_size=1000)
+        Issue.objects.bulk_create((
+            Issue(title=f'Issue {i}: water leak in block {i % 40}', description='Seeded for the query plan audit.',
+                  status=STATUSES[i % 3], reported_by_id=users[i % USERS])
+            for i in range(ISSUES)
+        ), batch_size=2000)
+        issue_ids = list(Issue.objects.values_list('id', flat=True))
+        Solution.objects.bulk_create((
+            Solution(title='Call the plumber', description='Seeded.', issue_id=issue_id,
+                     status='Accepted' if n % 50 == 2 else 'Pending', is_ai=n % 4 == 0,
+                     upvotes=n % 7, suggested_by=users[(n + 1) % USERS])
+            for n, issue_id in enumerate(issue_ids[::2])
+        ), batch_size=2000)
+        SiteNotification.objects.bulk_create((
+            SiteNotification(title='New Issue Raised', message='Seeded.', issue_id=issue_id)
+            for issue_id in issue_ids[::5]
+        ), batch_size=2000)
+
+        # The page under test: an issue with a few solutions and votes on them
+        cls.owner, helper, cls.voter = users[0], users[1], users[2]
+        cls.issue = Issue.objects.filter(reported_by_id=cls.owner, status='Open').first()
+        cls.solution = Solution.objects.create(title='Replace the washer', description='Seeded.', issue=cls.issue,
+                                               suggested_by=helper, is_voting_enabled=True)
+        Vote.objects.bulk_create([Vote(solution=cls.solution, voter=user, vote_type='upvote') for user in users[3:40]])
+        stats.rebuild()
+        # A cursor in the middle of the feed, for the paging and polling requests
+        middle = SiteNotification.objects.order_by('-created_at', '-id')[len(issue_ids) // 10]
+        cls.cursor = notifications.cursor_for(middle)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        # Built once per process (and every SIMILARITY_REFRESH_SECONDS), reading every
+        # resolved issue by design; warm it so only per-request queries are checked
+        similarity.reset_index()
+        similarity.get_index()
+        self.addCleanup(similarity.reset_index)
+
+    def requests(self):
+        """(label, user, method, url, data) for each view."""
+        issue, solution, owner, voter = self.issue, self.solution, self.owner, self.voter
+        return [
+            ('signup (taken email)', None, 'post', reverse('signup'),
+             {'email': owner.email, 'password': 'x', 'full_name': 'x', 'flat_number': '1', 'role': 'owner'}),
+            ('login', None, 'post', reverse('login'), {'email': owner.email, 'password': 'x'}),
+            ('home', owner, 'get', reverse('home'), None),
+            ('report-issue form', owner, 'get', reverse('report-issue'), None),
+            ('report-issue', owner, 'post', reverse('report-issue'),
+             {'title': 'Lift stuck', 'description': 'Between floors 3 and 4', 'status': 'Open'}),
+            ('similar issues', owner, 'get', reverse('similar_issues'), {'title': 'water leak in block 7'}),
+            ('issue board', owner, 'get', reverse('issue_board'), None),
+            ('issue board by status', owner, 'get', reverse('issue_board'), {'status': 'In Review'}),
+            ('issue search', owner, 'get', reverse('issue_search'), {'q': 'leak block 7', 'status': 'Open'}),
+            ('issue search, newest first', owner, 'get', reverse('issue_search'),
+             {'q': 'water leak', 'sort': 'recent', 'from': '2020-01-01'}),
+            ('issue details', voter, 'get', reverse('issue_details', args=[issue.id]), None),
+            ('suggest solution form', voter, 'get', reverse('suggest_solution', args=[issue.id]), None),
+            ('suggest solution', voter, 'post', reverse('suggest_solution', args=[issue.id]),
+             {'title': 'Check the valve', 'description': 'Seeded.'}),
+            ('vote', voter, 'get', reverse('vote_solution', args=[solution.id, 'upvote']), None),
+            ('request vote', owner, 'get', reverse('request_vote', args=[solution.id]), None),
+            ('chat (answered locally)', owner, 'post', reverse('chat_api'), {'message': 'my open issues'}),
+            ('notifications', voter, 'get', reverse('notifications'), None),
+            ('notifications page', voter, 'get', reverse('notifications'), {'before': self.cursor}),
+            ('notifications poll', voter, 'get', reverse('notifications'), {'after': self.cursor}),
+            ('notifications seen', voter, 'post', reverse('notifications_seen'), {'cursor': self.cursor}),
+            ('api issues', voter, 'get', reverse('api-issue-list', args=['v1']), {'status': 'Open'}),
+            ('api issues changed since', voter, 'get', reverse('api-issue-list', args=['v1']),
+             {'ordering': 'updated_at', 'updated_since': '2020-01-01T00:00:00Z'}),
+            ('api issue', voter, 'get', reverse('api-issue-detail', args=['v1', issue.id]), None),
+            ('api solutions', voter, 'get', reverse('api-solution-list', args=['v1']), {'issue': issue.id}),
+            ('api votes', voter, 'get', reverse('api-vote-list', args=['v1']), None),
+            ('api notifications', voter, 'get', reverse('api-notification-list', args=['v1']), None),
+        ]
+
+    def test_no_full_table_scans(self):
+        # In order: the writes (report-issue, vote, ...) set up what later requests read
+        for label, user, method, url, data in self.requests():
+            with self.subTest(label):
+                client = self.client_class()
+                if user is not None:
+                    session = client.session
+                    session['user_id'] = user.id
+                    session.save()
+                with CaptureQueriesContext(connection) as captured:
+                    response = getattr(client, method)(url, data or {})
+                self.assertLess(response.status_code, 400, f"{method.upper()} {url}")
+                for query in captured:
+                    sql = query['sql']
+                    if not sql.lstrip().upper().startswith('SELECT'):
+                        continue  # Writes are single-row by primary key or the unique/foreign key indexes
+                    plan = self.explain(sql)
+                    self.assertEqual(self.full_scans(plan), [], f"{sql[:300]}\n" + "\n".join(plan))
+
+    def explain(self, sql):
+        prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql)
+            rows = cursor.fetchall()
+        # SQLite: (id, parent, notused, detail); PostgreSQL: one text column per line
+        return [row[-1] for row in rows]
+
+    def full_scans(self, plan):
+        # Only real tables: SQLite also "scans" the (already LIMITed) subqueries it materializes
+        pattern = FULL_SCAN[connection.vendor]
+        tables = set(connection.introspection.table_names())
+        return [match.group(1) for match in map(pattern.search, plan) if match and match.group(1) in tables]
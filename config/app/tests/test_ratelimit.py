@@ -0,0 +1,25 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from app import ratelimit
+from app.models import AISpend
+
+
+@override_settings(AI_DAILY_TOKEN_BUDGET=1000, AI_DAILY_COST_BUDGET=0,
+                   AI_PRICE_PER_MILLION={'prompt': 1.0, 'completion': 2.0})
+class BudgetTests(TestCase):
+    """The daily budget is kept in the database, not in the (per-worker by default) cache."""
+
+    def test_spend_is_shared_through_the_database(self):
+        ratelimit.spend(300, 100)
+        cache.clear()  # As another worker with its own locmem cache sees it
+        ratelimit.spend(400, 100)
+        spent = AISpend.objects.get()
+        self.assertEqual((spent.tokens, spent.micro_usd), (900, 500 + 600))  # Millionths of a dollar at 1 and 2 USD per million
+        left = ratelimit.budget()
+        self.assertEqual((left.tokens_left, left.cost_left, left.exhausted), (100, None, False))
+
+    def test_spent_budget_stops_ai_suggestions(self):
+        ratelimit.spend(1000, 0)
+        self.assertTrue(ratelimit.budget().exhausted)
+        self.assertFalse(ratelimit.allow_ai('ai_suggest', 'user:1'))
@@ -0,0 +1,32 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.test import TransactionTestCase, override_settings
+
+from app import realtime
+from app.models import RealtimeEvent
+
+
+@override_settings(REALTIME_POLL_SECONDS=0.01)
+class DatabaseBrokerTests(TransactionTestCase):
+    """Two DatabaseBrokers stand in for two workers: one publishes, the other's stream receives."""
+
+    def test_message_reaches_another_worker(self):
+        publisher, listener = realtime.DatabaseBroker(), realtime.DatabaseBroker()
+        topic = realtime.issue_topic(1)
+
+        async def run():
+            subscription = listener.subscribe([topic])
+            await asyncio.sleep(0.2)  # The poller has started after what is already there
+            await sync_to_async(publisher.publish)(topic, 'vote', {'upvotes': 1})
+            await sync_to_async(publisher.publish)(realtime.NOTIFICATIONS, 'notification', {'id': 1}, '1')
+            try:
+                return await subscription.get(timeout=5), await subscription.get(timeout=0.2)
+            finally:
+                subscription.close()
+
+        try:
+            self.assertEqual(asyncio.run(run()), (('vote', {'upvotes': 1}, None), None))
+        finally:
+            listener.stop()
+        self.assertEqual(RealtimeEvent.objects.count(), 2)
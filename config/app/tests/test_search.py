@@ -0,0 +1,29 @@
+from django.test import TestCase, override_settings
+
+from app import search
+from app.models import Issue, Solution, UserDetails
+
+
+@override_settings(AI_DISPATCH_MODE='off')
+class SearchIndexTests(TestCase):
+    """The index triggers (migrations 0030, 0033) follow every kind of write."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reporter = UserDetails.objects.create(email='o@example.com', password='x', flat_number='1', role='owner')
+
+    def found(self, text, **filters):
+        return [issue.id for issue in search.search(text, **filters).issues]
+
+    def test_new_issue_is_found(self):
+        issue = Issue.objects.create(title='Boiler zyxwv', description='No hot water', reported_by_id=self.reporter)
+        self.assertEqual(self.found('zyxwv'), [issue.id])
+
+    def test_update_solution_and_delete(self):
+        issue = Issue.objects.create(title='Boiler', description='No hot water', reported_by_id=self.reporter)
+        Issue.objects.filter(id=issue.id).update(title='Radiator qwxyz', status='In Review')
+        self.assertEqual(self.found('qwxyz', status='In Review'), [issue.id])
+        Solution.objects.create(title='Fix', description='bleed the vlkmp valve', issue=issue)
+        self.assertEqual(self.found('vlkmp'), [issue.id])
+        Issue.objects.filter(id=issue.id).delete()
+        self.assertEqual(self.found('qwxyz'), [])
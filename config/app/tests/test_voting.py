@@ -0,0 +1,81 @@
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, connections
+from django.db.models.signals import post_save
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from app import voting
+from app.models import Issue, SiteNotification, Solution, UserDetails, Vote
+
+VOTERS = 60
+DUPLICATES = 3  # Parallel requests per voter
+THREADS = 16
+
+
+# Every vote must count for the solution to be accepted
+@override_settings(VOTE_ACCEPT_THRESHOLD=VOTERS, AI_DISPATCH_MODE='off')
+class VoteConcurrencyTests(TransactionTestCase):
+    """
+    Many residents (and duplicate requests from each) upvote one solution in
+    parallel, each thread on its own connection. No vote may be lost or
+    double counted, and auto-resolution must fire exactly once.
+    """
+
+    def seed(self, voters):
+        creator = UserDetails.objects.create(email='creator@example.com', password='x', flat_number='1', role='owner')
+        author = UserDetails.objects.create(email='author@example.com', password='x', flat_number='2', role='owner')
+        issue = Issue.objects.create(title='Stress issue', description='stress', reported_by_id=creator)
+        SiteNotification.objects.create(title='Vote Requested!', message='stress', issue=issue)
+        solution = Solution.objects.create(title='Stress solution', description='stress', issue=issue,
+                                           suggested_by=author, is_voting_enabled=True)
+        residents = UserDetails.objects.bulk_create([
+            UserDetails(email=f'voter{i}@example.com', password='x', flat_number=str(100 + i), role='renter')
+            for i in range(voters)
+        ])
+        return issue, solution, residents
+
+    @override_settings(VOTE_ACCEPT_THRESHOLD=10_000)
+    def test_vote_queries_do_not_grow_with_votes(self):
+        issue, solution, residents = self.seed(201)
+        with CaptureQueriesContext(connection) as first:
+            voting.cast_vote(solution.id, residents[0], 'upvote')
+        Vote.objects.bulk_create([Vote(solution=solution, voter=r, vote_type='upvote') for r in residents[1:200]])
+        with self.assertNumQueries(len(first)):
+            voting.cast_vote(solution.id, residents[200], 'upvote')
+
+    def test_parallel_votes(self):
+        issue, solution, residents = self.seed(VOTERS)
+        resolved_saves = Counter()
+        lock = threading.Lock()
+
+        def track(sender, instance, **kwargs):
+            if instance.status == 'Resolved':
+                with lock:
+                    resolved_saves[instance.id] += 1
+
+        post_save.connect(track, sender=Issue, weak=False)
+        self.addCleanup(post_save.disconnect, track, sender=Issue)
+
+        def vote(resident):
+            try:
+                return voting.cast_vote(solution.id, resident, 'upvote', retries=20).status
+            except Exception as e:
+                return f"error: {e}"
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=THREADS) as pool:
+            outcomes = Counter(pool.map(vote, [r for r in residents for _ in range(DUPLICATES)]))
+
+        solution.refresh_from_db()
+        issue.refresh_from_db()
+        votes = Vote.objects.filter(solution=solution).count()
+        self.assertEqual([key for key in outcomes if str(key).startswith('error')], [])
+        self.assertEqual(votes, VOTERS)
+        self.assertEqual(solution.upvotes, votes)
+        self.assertEqual(outcomes[voting.RECORDED], votes)
+        self.assertEqual((solution.status, issue.status), ('Accepted', 'Resolved'))
+        self.assertEqual(resolved_saves[issue.id], 1)
@@ -0,0 +1,348 @@
+"""
+Bulk import and export of residents, issues and solutions, as CSV or JSON
+Lines (one object per line).
+
+Both directions stream. Exports read with values_list().iterator(), so rows
+go straight from the database cursor to the output a chunk at a time.
+Imports read the file row by row and insert with bulk_create in batches;
+only the current batch is held in memory.
+
+An import runs in a single transaction. Every row is validated (field
+constraints, choices, unique emails, referenced residents and issues)
+before its batch is inserted. If any row fails, nothing is committed and
+the first MAX_REPORTED_ERRORS problems are reported with their line numbers.
+
+bulk_create skips post_save, so each batch does the signal work itself:
+stats rebuild, similarity reset and fragment bumps.
+
+Used by `manage.py export_data` / `import_data` and the admin.
+"""
+import csv
+import io
+import json
+import secrets
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, make_password
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from . import fragments, similarity, stats
+from .models import Issue, Solution, UserDetails
+
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+EXPORT_CHUNK_SIZE = 2000  # Rows per database fetch
+LINES_PER_WRITE = 500  # Output lines joined into one chunk of the response
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 50
+
+MODELS = {'residents': UserDetails, 'issues': Issue, 'solutions': Solution}
+
+# dataset -> [(column, values_list lookup)]
+EXPORT_COLUMNS = {
+    'residents': [
+        ('id', 'id'), ('email', 'email'), ('full_name', 'full_name'),
+        ('flat_number', 'flat_number'), ('role', 'role'),
+    ],
+    'issues': [
+        ('id', 'id'), ('title', 'title'), ('description', 'description'), ('status', 'status'),
+        ('reported_date', 'reported_date'), ('reported_by_email', 'reported_by_id__email'),
+    ],
+    'solutions': [
+        ('id', 'id'), ('issue_id', 'issue_id'), ('title', 'title'), ('description', 'description'),
+        ('status', 'status'), ('upvotes', 'upvotes'), ('downvotes', 'downvotes'), ('is_ai', 'is_ai'),
+        ('confidence', 'confidence'), ('suggested_by_email', 'suggested_by__email'),
+        ('suggested_date', 'suggested_date'),
+    ],
+}
+
+
+# Export
+
+def export_rows(dataset, queryset=None):
+    """Header row, then one tuple per object, in primary key order."""
+    columns = EXPORT_COLUMNS[dataset]
+    if queryset is None:
+        queryset = MODELS[dataset].objects.all()
+    yield [column for column, _ in columns]
+    yield from (queryset.order_by('pk')
+                .values_list(*[lookup for _, lookup in columns])
+                .iterator(chunk_size=EXPORT_CHUNK_SIZE))
+
+
+class _Echo:
+    """File-like object for csv.writer that hands each line back instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(rows):
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _jsonl_lines(rows):
+    rows = iter(rows)
+    header = next(rows)
+    for row in rows:
+        yield json.dumps(dict(zip(header, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def export_lines(dataset, fmt, queryset=None):
+    rows = export_rows(dataset, queryset)
+    return _csv_lines(rows) if fmt == 'csv' else _jsonl_lines(rows)
+
+
+def _chunks(lines):
+    lines = iter(lines)
+    while chunk := ''.join(islice(lines, LINES_PER_WRITE)):
+        yield chunk
+
+
+async def _achunks(lines):
+    # Under ASGI a sync iterator would be read to the end before the first
+    # byte is sent; pull one chunk at a time from the ORM's thread instead
+    chunks = _chunks(lines)
+    next_chunk = sync_to_async(lambda: next(chunks, None))
+    while (chunk := await next_chunk()) is not None:
+        yield chunk
+
+
+def export_response(dataset, fmt, queryset=None, asynchronous=False):
+    lines = export_lines(dataset, fmt, queryset)
+    response = StreamingHttpResponse(_achunks(lines) if asynchronous else _chunks(lines),
+                                     content_type=f'{FORMATS[fmt]}; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{fmt}"'
+    return response
+
+
+# Import
+
+class ImportResult:
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.rows = 0
+        self.created = 0
+        self.errors = []  # (line number, message), at most MAX_REPORTED_ERRORS
+        self.error_count = 0
+        self.committed = False
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+class _Rollback(Exception):
+    pass
+
+
+def read_rows(file, fmt):
+    """(line number, dict) per record of an open text file."""
+    if fmt == 'csv':
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for number, line in enumerate(file, start=1):
+            if line.strip():
+                try:
+                    yield number, json.loads(line)
+                except ValueError as e:
+                    yield number, e
+
+
+def open_text(binary_file):
+    """Text view of an uploaded (binary) file, tolerating a UTF-8 BOM from spreadsheets."""
+    return io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline='')
+
+
+def _text(row, column):
+    value = row.get(column)
+    return '' if value is None else str(value).strip()
+
+
+def _bool(row, column):
+    return _text(row, column).lower() in ('1', 'true', 'yes', 'y')
+
+
+def _float(row, column):
+    value = _text(row, column)
+    try:
+        return float(value) if value else 0.0
+    except ValueError:
+        raise ValidationError(f"{column}: '{value}' is not a number")
+
+
+def _resident_ids(emails):
+    return dict(UserDetails.objects.filter(email__in=emails).values_list('email', 'id'))
+
+
+class _Importer:
+    """Per-dataset rules: lookups for a batch, one object per row, work after the insert."""
+
+    exclude = ()  # Fields clean_fields() must not check (foreign keys are resolved by lookups)
+
+    def lookups(self, rows):
+        return {}
+
+    def build(self, row, lookups):
+        raise NotImplementedError
+
+    def before_insert(self, objects, dry_run):
+        pass
+
+    def after_insert(self, objects):
+        pass
+
+
+class _Residents(_Importer):
+    exclude = ('password',)
+
+    def lookups(self, rows):
+        return {'taken': set(_resident_ids([_text(row, 'email') for row in rows]))}
+
+    def build(self, row, lookups):
+        email = _text(row, 'email')
+        if email in lookups['taken']:
+            raise ValidationError(f"email: {email} is already registered")
+        if email:
+            lookups['taken'].add(email)  # Duplicates later in the same batch
+        resident = UserDetails(
+            full_name=_text(row, 'full_name') or None,
+            email=email,
+            flat_number=_text(row, 'flat_number'),
+            role=_text(row, 'role'),
+        )
+        resident._raw_password = _text(row, 'password') or None
+        return resident
+
+    def before_insert(self, residents, dry_run):
+        # Hashed only once the batch is known to be valid, and not at all on a
+        # dry run (the rows are rolled back). No password: an unusable one
+        for resident in residents:
+            if resident._raw_password and not dry_run:
+                resident.password = make_password(resident._raw_password)
+            else:
+                # What make_password(None) stores, minus its slow per-character random string
+                resident.password = UNUSABLE_PASSWORD_PREFIX + secrets.token_urlsafe(30)
+
+
+class _Issues(_Importer):
+    exclude = ('reported_by_id',)
+
+    def lookups(self, rows):
+        return {'residents': _resident_ids([_text(row, 'reported_by_email') for row in rows])}
+
+    def build(self, row, lookups):
+        email = _text(row, 'reported_by_email')
+        if email not in lookups['residents']:
+            raise ValidationError(f"reported_by_email: no resident {email or '(blank)'}")
+        status = _text(row, 'status') or 'Open'
+        return Issue(
+            title=_text(row, 'title'),
+            description=_text(row, 'description'),
+            status=status,
+            reported_by_id_id=lookups['residents'][email],
+            # Issue.save() would set it; bulk_create does not call save()
+            resolved_at=timezone.now() if status == 'Resolved' else None,
+        )
+
+    def after_insert(self, issues):
+        reporters = {issue.reported_by_id_id for issue in issues}
+        stats.rebuild(list(reporters))
+        if any(issue.status == 'Resolved' for issue in issues):
+            similarity.reset_index()
+        fragments.bump(*(fragments.user_issues_scope(user_id) for user_id in reporters))
+
+
+class _Solutions(_Importer):
+    exclude = ('issue', 'suggested_by')
+
+    def lookups(self, rows):
+        issue_ids = set()
+        for row in rows:
+            if _text(row, 'issue_id').isdigit():
+                issue_ids.add(int(_text(row, 'issue_id')))
+        return {
+            'issues': set(Issue.objects.filter(id__in=issue_ids).values_list('id', flat=True)),
+            'residents': _resident_ids([_text(row, 'suggested_by_email') for row in rows]),
+        }
+
+    def build(self, row, lookups):
+        issue_id = _text(row, 'issue_id')
+        if not issue_id.isdigit() or int(issue_id) not in lookups['issues']:
+            raise ValidationError(f"issue_id: no issue {issue_id or '(blank)'}")
+        email = _text(row, 'suggested_by_email')
+        if email and email not in lookups['residents']:
+            raise ValidationError(f"suggested_by_email: no resident {email}")
+        is_ai = _bool(row, 'is_ai')
+        # Vote counts are not imported: they must match Vote rows (app/voting.py)
+        return Solution(
+            issue_id=int(issue_id),
+            title=_text(row, 'title'),
+            description=_text(row, 'description'),
+            status=_text(row, 'status') or 'Pending',
+            is_ai=is_ai,
+            is_ai_generated=is_ai,
+            confidence=_float(row, 'confidence'),
+            suggested_by_id=lookups['residents'].get(email),
+        )
+
+    def after_insert(self, solutions):
+        fragments.bump(*{fragments.issue_scope(solution.issue_id) for solution in solutions})
+
+
+IMPORTERS = {'residents': _Residents(), 'issues': _Issues(), 'solutions': _Solutions()}
+
+
+def import_rows(dataset, rows, batch_size=IMPORT_BATCH_SIZE, dry_run=False):
+    """
+    Import (line number, dict) rows from read_rows(). Commits only if every
+    row is valid and dry_run is False; returns an ImportResult either way.
+    """
+    importer = IMPORTERS[dataset]
+    result = ImportResult(dataset)
+    rows = iter(rows)
+    try:
+        with transaction.atomic():
+            while batch := list(islice(rows, batch_size)):
+                result.rows += len(batch)
+                valid = [(line, row) for line, row in batch if isinstance(row, dict)]
+                for line, row in batch:
+                    if not isinstance(row, dict):
+                        result.add_error(line, f"not a JSON object: {row}")
+                lookups = importer.lookups([row for _, row in valid])
+                objects = []
+                for line, row in valid:
+                    try:
+                        obj = importer.build(row, lookups)
+                        obj.clean_fields(exclude=importer.exclude)
+                    except ValidationError as e:
+                        result.add_error(line, '; '.join(_messages(e)))
+                        continue
+                    objects.append(obj)
+                if result.error_count:
+                    continue  # Keep validating the rest, but nothing will be committed
+                importer.before_insert(objects, dry_run)
+                MODELS[dataset].objects.bulk_create(objects, batch_size=batch_size)
+                importer.after_insert(objects)
+                result.created += len(objects)
+            if result.error_count or dry_run:
+                raise _Rollback
+    except _Rollback:
+        return result
+    result.committed = True
+    return result
+
+
+def _messages(error):
+    if hasattr(error, 'message_dict'):
+        return [f"{field}: {' '.join(messages)}" for field, messages in error.message_dict.items()]
+    return error.messages
@@ -1,79 +1,86 @@
-from django.shortcuts import get_object_or_404, render, redirect
-from django.http import HttpResponse
-from .models import Solution, UserDetails, Issue, SiteNotification
-from django.db.models import F
-from django.http import JsonResponse
-from chatbot.utils import simple_chatbot_view
-
-from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
-from openai import OpenAI
+import asyncio
 import json
-from django.conf import settings
-
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-from django.core.exceptions import ObjectDoesNotExist
-
-
-client = OpenAI(api_key=settings.OPEN_API_KEY)
+import time
+from datetime import date
 
-@receiver(post_save, sender=Issue)
-def ai_suggest_solution(sender, instance, created, **kwargs):
-    if created:
-        try:
-            # 1. Get the AI User (Make sure this email exists in your UserDetails table!)
-            ai_user = UserDetails.objects.get(email="ai_assistant@apartment.com")
-
-            # 2. Call OpenAI for a suggested solution
-            # Crafted a better prompt for more specific results
-            prompt = f"Provide one concise, practical solution for the following apartment maintenance issue title: '{instance.title}'. Description: '{instance.description}'"
-            
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages="pipe is leaking"
-            )
-            ai_reply = response.choices[0].message.content.strip() # Strip whitespace/newlines
-
-            # 3. Create the Solution automatically
-            Solution.objects.create(
-                title=f"AI-Generated Solution",
-                description=ai_reply,
-                issue=instance,
-                suggested_by=ai_user,
-                status='Pending',
-                is_ai_generated=True # **CRITICAL: Set the new field to True**
-            )
-            
-            # 4. Update Issue status to 'In Review' as per your flow
-            instance.status = 'In Review'
-            instance.save()
-            print(f"AI successfully suggested a solution for Issue ID {instance.id}")
-
-        except ObjectDoesNotExist:
-            print("ERROR: AI User profile not found in UserDetails. Please create a user with email 'ai_assistant@apartment.com'.")
-        except Exception as e:
-            # Catch other potential errors like API connection issues
-            print(f"AI Suggestion failed due to API error: {str(e)}")
-            
-
-def chat_api(request):
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Exists, OuterRef
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from chatbot.utils import OFFLINE, route_message, simple_chatbot_view
+
+from . import analytics, chat, fragments, metrics, notifications, ratelimit, realtime, search, similarity, stats, voting
+from .jobs import enqueue_ai_solution
+from .llm import get_async_client
+from .models import Issue, SiteNotification, Solution, UserDetails, Vote
+
+
+async def _local_reply(user_message, resident):
+    # Data questions ("status of issue 12", "my open issues") are answered
+    # from the database by chatbot/utils.py; None means ask the LLM
+    reply = await sync_to_async(route_message)(user_message, resident)
+    if reply is None:
+        metrics.incr('chatbot.llm')
+        return None
+    await sync_to_async(chat.remember)(resident, user_message, reply.text)
+    return JsonResponse({'status': 'success', 'reply': reply.text, 'intent': reply.intent})
+
+
+async def _chat_allowance(request, resident):
+    # The day's AI budget, then the sender's 'chat' bucket (app/ratelimit.py).
+    # (refusal, decision, left): refusal is the reply to send instead of asking the LLM
+    left = await sync_to_async(ratelimit.budget)()
+    if left.exhausted:
+        # Out of budget: the local router's answers are all the widget has until tomorrow
+        metrics.incr('chatbot.offline')
+        response = JsonResponse({'status': 'success', 'reply': OFFLINE, 'intent': 'offline'})
+        return ratelimit.add_headers(response, left=left), None, left
+    decision = await sync_to_async(ratelimit.take)('chat', ratelimit.client_key(request, resident))
+    if not decision.allowed:
+        response = JsonResponse({
+            'status': 'error',
+            'reply': f"You're sending messages faster than I can answer. Please try again in {decision.retry_after} seconds.",
+        }, status=429)
+        return ratelimit.add_headers(response, decision, left), decision, left
+    return None, decision, left
+
+
+async def chat_api(request):
     if request.method == "POST":
         user_message = request.POST.get("message")
-        
+        resident = await request.aresident()
+        local = await _local_reply(user_message, resident)
+        if local is not None:
+            return local
+        refusal, decision, left = await _chat_allowance(request, resident)
+        if refusal is not None:
+            return refusal
+
         try:
-            # Call OpenAI SDK (2025 version)
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": user_message}]
+            # The conversation so far, within CHAT_CONTEXT_TOKENS (app/chat.py)
+            context = await sync_to_async(chat.prepare)(resident, user_message)
+            started = time.perf_counter()
+            # AsyncOpenAI: the worker serves other requests while we wait on the API
+            response = await get_async_client().chat.completions.create(
+                model=settings.AI_MODEL,
+                messages=context.messages,
             )
             bot_reply = response.choices[0].message.content
+            await sync_to_async(chat.finish)(context, user_message, bot_reply,
+                                             time.perf_counter() - started, response)
             
             # Return JSON instead of rendering a template
-            return JsonResponse({
+            return ratelimit.add_headers(JsonResponse({
                 'status': 'success',
                 'reply': bot_reply
-            })
+            }), decision, left)
             
         except Exception as e:
             # Return JSON error so the JavaScript can handle it
@@ -85,10 +92,115 @@ def chat_api(request):
     # If someone tries to access via GET, return an error or redirect
     return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
 
+async def chat_stream(request):
+    """
+    Streaming twin of chat_api: relays OpenAI tokens as server-sent events.
+    Needs ASGI (config/asgi.py) to actually stream; the chat widget falls back
+    to chat_api's JSON reply if streaming is unavailable.
+    """
+    if request.method != "POST":
+        return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
+    user_message = request.POST.get("message")
+    resident = await request.aresident()
+    # A local answer is one JSON reply; the chat widget reads it as such
+    local = await _local_reply(user_message, resident)
+    if local is not None:
+        return local
+    refusal, decision, left = await _chat_allowance(request, resident)
+    if refusal is not None:
+        return refusal
+    context = await sync_to_async(chat.prepare)(resident, user_message)
+    client = get_async_client()
+
+    if not settings.CHAT_STREAMING_ENABLED:
+        try:
+            started = time.perf_counter()
+            response = await client.chat.completions.create(
+                model=settings.AI_MODEL,
+                messages=context.messages,
+            )
+            bot_reply = response.choices[0].message.content
+            await sync_to_async(chat.finish)(context, user_message, bot_reply,
+                                             time.perf_counter() - started, response)
+            return ratelimit.add_headers(JsonResponse({'status': 'success', 'reply': bot_reply}), decision, left)
+        except Exception as e:
+            return JsonResponse({
+                'status': 'error',
+                'reply': f"I'm having trouble connecting right now. ({str(e)})"
+            }, status=500)
+
+    return ratelimit.add_headers(StreamingHttpResponse(
+        _chat_events(client, user_message, context),
+        content_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    ), decision, left)
+
+
+def _sse(data, event=None, event_id=None):
+    prefix = f"event: {event}\n" if event else ""
+    if event_id:
+        prefix += f"id: {event_id}\n"
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+async def _chat_events(client, user_message, context=None):
+    # Flush the headers straight away so the browser stops waiting on us
+    yield ": stream open\n\n"
+    context = context or chat.Context(None, [{"role": "user", "content": user_message}], 0, 0)
+    started = time.perf_counter()
+    stream = None
+    tokens = []
+    try:
+        stream = await client.chat.completions.create(
+            model=settings.AI_MODEL,
+            messages=context.messages,
+            stream=True,
+        )
+        first_token = True
+        async for chunk in stream:
+            token = chunk.choices[0].delta.content if chunk.choices else None
+            if not token:
+                continue
+            if first_token:
+                metrics.observe('chat_stream.first_token_seconds', time.perf_counter() - started)
+                first_token = False
+            tokens.append(token)
+            yield _sse({'token': token})
+        metrics.observe('chat_stream.total_seconds', time.perf_counter() - started)
+        # Only a reply the resident saw in full goes into the conversation
+        await sync_to_async(chat.finish)(context, user_message, ''.join(tokens), time.perf_counter() - started)
+        yield _sse({'status': 'done'}, event='done')
+    except asyncio.CancelledError:
+        # Client went away (ASGI http.disconnect): stop paying for tokens
+        metrics.incr('chat_stream.cancelled')
+        raise
+    except Exception as e:
+        yield _sse({'reply': f"I'm having trouble connecting right now. ({str(e)})"}, event='error')
+    finally:
+        if stream is not None:
+            await stream.close()
+
+def analytics_api(request):
+    # Building-wide metrics for managers (app/analytics.py)
+    resident = request.resident
+    if not (request.user.is_staff or (resident and resident.role in settings.ANALYTICS_ROLES)):
+        return JsonResponse({'error': 'Managers only.'}, status=403)
+    try:
+        weeks = int(request.GET.get('weeks', 26))
+    except ValueError:
+        return JsonResponse({'error': 'weeks must be a number.'}, status=400)
+    return JsonResponse(analytics.summary(weeks))
+
+def metrics_view(request):
+    # In-process counters (AI dispatcher queue depth, latencies, ...) as JSON
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    return JsonResponse({**metrics.snapshot(), 'fragments': fragments.stats(), 'ai_budget': ratelimit.budget()._asdict()})
+
 def chatbot(request):
     if request.method == 'POST':
         user_message = request.POST.get('message', '')
-        bot_response = simple_chatbot_view(user_message)
+        bot_response = simple_chatbot_view(user_message, request.resident)
         return JsonResponse({'response': bot_response})
     return render(request, 'chatbot.html')
 
@@ -97,56 +209,20 @@ def vote_solution(request, solution_id, vote_type):
     Handles voting logic with restrictions:
     1. Issue creator cannot vote.
     2. Users cannot vote more than once.
+    3. Solution authors cannot vote for their own solution.
+    4. Voting must have been requested by the creator.
+    The checks and counter updates run atomically in app/voting.py.
     """
-    solution = get_object_or_404(Solution, id=solution_id)
-    user_id = request.session.get('user_id')
-    
-    if not user_id:
+    user = request.resident
+    if not user:
         return redirect('login')
-    
-    user = get_object_or_404(UserDetails, id=user_id)
-    
-    # RULE 1: The user who created the issue cannot vote for any solution on it
-    if solution.issue.reported_by_id == user:
-        return redirect('issue_details', issue_id=solution.issue.id)
 
-    # RULE 2: A person who already voted cannot vote again
-    if solution.voted_by.filter(id=user.id).exists():
-        return redirect('issue_details', issue_id=solution.issue.id)
-    
-    # NEW RULE 3: The person who suggested the SOLUTION cannot vote for their own solution
-    if solution.suggested_by == user:
-        # Optional: return redirect with a message
-        return redirect('issue_details', issue_id=solution.issue.id)
-    
-    # NEW RULE: Voting must be requested by creator first
-    if not solution.is_voting_enabled:
-        # Prevent voting if not yet requested
-        return redirect('issue_details', issue_id=solution.issue.id)
-    
-    if vote_type == 'upvote':
-        solution.upvotes += 1
-        solution.voted_by.add(user) # Record the vote
-        solution.save()
-        
-        # Auto-resolve logic: If upvotes reach 5, approve solution and resolve issue
-        if solution.upvotes >= 5:
-            solution.status = 'Accepted'
-            solution.save()
-            
-            issue = solution.issue
-            issue.status = 'Resolved'
-            issue.save()
-
-            # This ensures they no longer appear in anyone's notification list
-            SiteNotification.objects.filter(issue=issue).delete()
-            
-    elif vote_type == 'downvote':
-        solution.downvotes = F('downvotes') + 1
-        solution.voted_by.add(user) # Record the vote
-        solution.save()
+    try:
+        result = voting.cast_vote(solution_id, user, vote_type)
+    except Solution.DoesNotExist:
+        raise Http404("No Solution matches the given query.")
         
-    return redirect('issue_details', issue_id=solution.issue.id)
+    return redirect('issue_details', issue_id=result.issue_id)
 
 def signup(request):
     template = "Signup_Form.html"
@@ -169,7 +245,7 @@ def signup(request):
         UserDetails.objects.create(
             full_name=full_name, 
             email=email, 
-            password=password, 
+            password=make_password(password),
             flat_number=flat_number, 
             role=role,
             profile_picture=profile_image # Ensure this matches your model field
@@ -190,13 +266,13 @@ def login(request):
         email = request.POST.get('email')
         password = request.POST.get('password')
         
-        try:
-            user = UserDetails.objects.get(email=email, password=password)
-            request.session['user_id'] = user.id
-            request.session.modified = True 
-            return redirect('home')
-        except UserDetails.DoesNotExist:
+        # app.auth.ResidentBackend: hashed passwords, legacy plaintext rows upgraded
+        user = authenticate(request, email=email, password=password)
+        if user is None:
             return render(request, template, {'error': "Invalid email or password."})
+        request.session.cycle_key()  # New session id on login (session fixation)
+        request.session['user_id'] = user.id
+        return redirect('home')
     return render(request, template)
 
 def reportIssue(request):
@@ -205,13 +281,16 @@ def reportIssue(request):
         title = request.POST.get('title')
         description = request.POST.get('description')
         status = request.POST.get('status')
-        user = UserDetails.objects.get(id=request.session.get('user_id'))
-        
+        user = request.resident
+        if not user:
+            return redirect('login')
+
         new_issue = Issue.objects.create(
             title=title,
             description=description,
             status=status,
-            reported_by_id=user
+            reported_by_id=user,
+            image=request.FILES.get('image'),
         )
         
         SiteNotification.objects.create(
@@ -224,71 +303,241 @@ def reportIssue(request):
 
     return render(request, template)
 
-def issue_details_view(request, issue_id):
-    issue = get_object_or_404(Issue, id=issue_id)
+async def issue_details_view(request, issue_id):
+    # Async ORM throughout; everything the template touches is loaded up front
+    # because lazy relation lookups are not allowed from async code
+    issue = await aget_object_or_404(Issue.objects.select_related('reported_by_id'), id=issue_id)
     
-    # 1. Check if AI solutions already exist
-    ai_exists = Solution.objects.filter(issue=issue, is_ai=True).exists()
+    user_id = await request.session.aget('user_id')
+
+    # 1. The solution list, cached as rendered HTML per (issue, viewer) until a
+    #    signal bumps the issue's stamp (app/fragments.py). On a miss: ALL
+    #    solutions, author joined and the viewer's vote as a flag, so the page
+    #    costs the same number of queries however many there are
+    async def build_solution_list():
+        all_solutions = [
+            solution async for solution in Solution.objects.filter(issue=issue)
+            .select_related('suggested_by')
+            .annotate(user_has_voted=Exists(Vote.objects.filter(solution=OuterRef('pk'), voter_id=user_id)))
+            .order_by('-is_ai', '-upvotes', 'id')  # id: AI suggestions are stored best first
+        ]
+        html = render_to_string('partials/solution_list.html', {'issue': issue, 'solutions': all_solutions}, request)
+        return html, len(all_solutions), any(solution.is_ai for solution in all_solutions)
+
+    solution_list, solution_count, ai_exists = await fragments.acached(
+        'solution_list', [fragments.issue_scope(issue.id)], build_solution_list, vary=[user_id],
+    )
 
+    # 2. If no AI solution exists yet, queue one for the job worker instead of
+    #    calling OpenAI here (see app/jobs.py and `manage.py run_jobs`). A new
+    #    job needs the day's budget and a token from the viewer's 'issue_ai'
+    #    bucket, so crawling /issue/<id>/ does not turn into OpenAI calls
+    ai_job = None
     if not ai_exists:
-        try:
-            prompt = (
-                f"Suggest 1 solution for: {issue.title}. Description: {issue.description}. "
-                "Return ONLY a JSON list with: 'title', 'description', 'confidence' (0-100)."
-            )
-            
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                response_format={ "type": "json_object" },
-                messages=[{"role": "user", "content": prompt}]
-            )
-            
-            raw_content = response.choices[0].message.content
-            data = json.loads(raw_content)
-            
-            # Extract list safely: handles {"solutions": [...]} or just [...]
-            new_solutions_list = data.get("solutions") if isinstance(data, dict) and "solutions" in data else data
-            if isinstance(new_solutions_list, dict): # Handle case where it's a single object
-                new_solutions_list = [new_solutions_list]
-
-            for item in new_solutions_list:
-                raw_conf = item.get('confidence', 0)
-                # Map strings if AI ignores "integer" instruction
-                mapping = {"High": 90, "Medium": 50, "Low": 20}
-                processed_conf = mapping.get(raw_conf, raw_conf) if isinstance(raw_conf, str) else raw_conf
-
-                # CRITICAL: Create the object in the DB
-                Solution.objects.create(
-                    issue=issue,
-                    title=item.get('title', 'AI Suggestion'),
-                    description=item.get('description', ''),
-                    confidence=processed_conf,
-                    is_ai=True,
-                    suggested_by=None
-                )
-        except Exception as e:
-            print(f"ERROR [AI Generation]: {str(e)}")
-
-    # 2. Query ALL solutions ONLY AFTER the generation logic is done
-    all_solutions = Solution.objects.filter(issue=issue).order_by('-is_ai', '-upvotes')
+        who = ratelimit.client_key(request, await request.aresident())
+        ai_job = await sync_to_async(enqueue_ai_solution)(issue, allow=lambda: ratelimit.allow_ai('issue_ai', who))
 
-    user_id = request.session.get('user_id')
-    user = UserDetails.objects.filter(id=user_id).first()
+    # 3. Resolved look-alikes with their accepted answers (in-memory index, no OpenAI)
+    similar_issues = await sync_to_async(similarity.find_similar_resolved)(
+        similarity.issue_text(issue), exclude=[issue.id],
+    )
     
     return render(request, 'Issue_Details_View.html', {
         'issue': issue,
-        'solutions': all_solutions,
-        'user': user,
+        'solution_list': solution_list,
+        'solution_count': solution_count,
+        'similar_issues': similar_issues,
+        'ai_pending': ai_job is not None and ai_job.status in ('pending', 'running'),
+        'ai_failed': ai_job is not None and ai_job.status == 'failed',
     })
 
 
+def similar_issues_api(request):
+    # Used by the report form to show resolved look-alikes while typing
+    text = f"{request.GET.get('title', '')} {request.GET.get('description', '')}".strip()
+    matches = similarity.find_similar_resolved(text, k=3) if text else []
+    return JsonResponse({'results': [
+        {
+            'id': match['issue'].id,
+            'title': match['issue'].title,
+            'url': reverse('issue_details', args=[match['issue'].id]),
+            'solution_title': match['solution'].title,
+            'solution_description': match['solution'].description[:200],
+            'score': match['score'],
+        }
+        for match in matches
+    ]})
+
+
+def _search_params(request):
+    """search.search() arguments from the query string; ValueError for a bad date or limit."""
+    def day(name):
+        value = request.GET.get(name)
+        try:
+            return date.fromisoformat(value) if value else None
+        except ValueError:
+            raise ValueError(f"'{value}' is not a date (YYYY-MM-DD).") from None
+
+    limit = request.GET.get('limit')
+    if limit and not limit.isdigit():
+        raise ValueError("limit must be a number.")
+    return {
+        'text': request.GET.get('q', ''),
+        'status': request.GET.get('status') or None,
+        'reported_from': day('from'),
+        'reported_to': day('to'),
+        'sort': request.GET.get('sort') or 'relevance',
+        'cursor': request.GET.get('cursor') or None,
+        'limit': int(limit) if limit else None,
+    }
+
+
+def issue_board(request):
+    # Every issue in the building: full-text search, filters and keyset
+    # pages (app/search.py); "Next page" carries the cursor in the query string
+    if not request.resident:
+        return redirect('login')
+    context = {'statuses': search.STATUSES, 'issues': [], 'next_url': None, 'error': None,
+               'query': request.GET.get('q', ''), 'status': request.GET.get('status', ''),
+               'sort': request.GET.get('sort') or 'relevance'}
+    try:
+        params = _search_params(request)
+        context.update(reported_from=params['reported_from'], reported_to=params['reported_to'])
+        page = search.search(**params)
+    except ValueError as e:
+        context['error'] = str(e)
+        return render(request, 'Issue_Board.html', context, status=400)
+    context['issues'] = page.issues
+    if page.next_cursor:
+        query = request.GET.copy()
+        query['cursor'] = page.next_cursor
+        context['next_url'] = f"?{query.urlencode()}"
+    return render(request, 'Issue_Board.html', context)
+
+
+def issue_search_api(request):
+    """The board as JSON: ?q=&status=&from=&to=&sort=relevance|recent&cursor=&limit="""
+    if not request.resident:
+        return JsonResponse({'error': 'Login required.'}, status=401)
+    try:
+        page = search.search(**_search_params(request))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'results': [
+            {
+                'id': issue.id,
+                'title': issue.title,
+                'status': issue.status,
+                'reported_date': issue.reported_date.isoformat(),
+                'reported_by': issue.reported_by_id.full_name or issue.reported_by_id.email,
+                'url': reverse('issue_details', args=[issue.id]),
+            }
+            for issue in page.issues
+        ],
+        'sort': page.sort,
+        'next': page.next_cursor,
+    })
+
+
+def notifications_api(request):
+    """
+    Notification feed for the dashboard. Newest first, paged with ?before=<cursor>;
+    ?after=<cursor> returns what arrived since (oldest first) for polling.
+    """
+    user_id = request.session.get('user_id')
+    if not user_id:
+        return JsonResponse({'error': 'Login required.'}, status=401)
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 10)), notifications.MAX_PAGE))
+        after = notifications.decode_cursor(request.GET['after']) if request.GET.get('after') else None
+        before = notifications.decode_cursor(request.GET['before']) if request.GET.get('before') else None
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+
+    if after:
+        notes = notifications.newer(after, limit)
+        cursor = notifications.cursor_for(notes[-1]) if notes else request.GET['after']
+        next_cursor = None
+    else:
+        notes = notifications.latest(limit, older_than=before)
+        cursor = notifications.cursor_for(notes[0]) if notes and not before else None
+        next_cursor = notifications.cursor_for(notes[-1]) if len(notes) == limit else None
+    return JsonResponse({
+        'results': [notifications.serialize(note) for note in notes],
+        'cursor': cursor,
+        'next': next_cursor,
+        'unread': notifications.unread_count(user_id),
+    })
+
+
+def notifications_seen(request):
+    # Marks the feed as read up to ?cursor= (the newest one shown)
+    user_id = request.session.get('user_id')
+    if not user_id:
+        return JsonResponse({'error': 'Login required.'}, status=401)
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required.'}, status=405)
+    try:
+        cursor = notifications.decode_cursor(request.POST.get('cursor'))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+    notifications.mark_seen(user_id, cursor)
+    return JsonResponse({'unread': notifications.unread_count(user_id)})
+
+
+async def events(request):
+    """
+    Server-sent events: new notifications, plus vote counts for each ?issue=<id>.
+    Needs the ASGI server; under WSGI the browser falls back to polling
+    /notifications/.
+    """
+    user_id = await request.session.aget('user_id')
+    if not user_id:
+        return JsonResponse({'error': 'Login required.'}, status=401)
+    if not settings.REALTIME_ENABLED or not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Realtime updates are not available; poll /notifications/.'}, status=503)
+    topics = [realtime.NOTIFICATIONS]
+    topics += [realtime.issue_topic(int(i)) for i in request.GET.getlist('issue')[:20] if i.isdigit()]
+    return StreamingHttpResponse(
+        _realtime_events(topics, request.headers.get('Last-Event-ID')),
+        content_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+async def _realtime_events(topics, last_event_id):
+    subscription = realtime.get_broker().subscribe(topics)
+    try:
+        yield "retry: 5000\n\n"
+        if last_event_id:
+            # Reconnected: replay what was published while we were away
+            try:
+                missed = await sync_to_async(notifications.newer)(notifications.decode_cursor(last_event_id))
+            except ValueError:
+                missed = []
+            for note in missed:
+                yield _sse(notifications.serialize(note), event='notification', event_id=notifications.cursor_for(note))
+        while True:
+            message = await subscription.get(timeout=settings.REALTIME_HEARTBEAT_SECONDS)
+            if message is None:
+                yield ": keep-alive\n\n"  # Holds proxies open; a dead client errors out here
+                continue
+            event, data, event_id = message
+            yield _sse(data, event=event, event_id=event_id)
+    finally:
+        # Also reached on CancelledError when the client disconnects
+        subscription.close()
+
+
 def suggest_solution(request, issue_id):
     issue = get_object_or_404(Issue, id=issue_id)
     if request.method == 'POST':
         title = request.POST.get('title')
         description = request.POST.get('description')
-        user_id = request.session.get('user_id')
-        user = get_object_or_404(UserDetails, id=user_id)
+        user = request.resident
+        if not user:
+            return redirect('login')
 
         Solution.objects.create(
             title=title,
@@ -305,57 +554,87 @@ def suggest_solution(request, issue_id):
 
     return render(request, 'Suggest_Solution_Form.html', {'issue': issue})
 
+def _render_notification_panel():
+    # Newest 10 with their issue and reporter joined (app/notifications.py).
+    # Shared by every resident, so rendered without the request: nothing of
+    # the viewer (their read marker, user, CSRF token) may end up in it
+    all_notifications = notifications.latest(10)
+    return render_to_string('partials/notification_panel.html', {
+        'notifications': all_notifications,
+        'notifications_cursor': notifications.cursor_for(all_notifications[0]) if all_notifications else '',
+    })
+
+
+def _render_recent_issues(request, user):
+    # Calculate stats based on RECENT 5 issues
+    recent_issues_queryset = Issue.objects.filter(reported_by_id=user).select_related('reported_by_id').order_by('-reported_date')[:5]
+    recent_issues = list(recent_issues_queryset)
+    total_recent = len(recent_issues)
+
+    if total_recent > 0:
+        recent_open_count = sum(1 for i in recent_issues if i.status == 'Open')
+        recent_resolved_count = sum(1 for i in recent_issues if i.status == 'Resolved')
+        recent_in_review_count = sum(1 for i in recent_issues if i.status == 'In Review')
+
+        open_pct = max(int((recent_open_count / total_recent) * 100), 1) if recent_open_count > 0 else 0
+        resolved_pct = max(int((recent_resolved_count / total_recent) * 100), 1) if recent_resolved_count > 0 else 0
+        in_review_pct = max(int((recent_in_review_count / total_recent) * 100), 1) if recent_in_review_count > 0 else 0
+    else:
+        recent_open_count = recent_resolved_count = recent_in_review_count = 0
+        open_pct = resolved_pct = in_review_pct = 0
+
+    return render_to_string('partials/recent_issues.html', {
+        'recent_issues': recent_issues,
+        'card_open_count': recent_open_count,
+        'card_resolved_count': recent_resolved_count,
+        'card_pending_count': recent_in_review_count,
+        'card_open_pct': open_pct,
+        'card_resolved_pct': resolved_pct,
+        'card_pending_pct': in_review_pct,
+    }, request)
+
+
 def home(request):
-    user_id = request.session.get('user_id')
-    if user_id:
-        try:
-            user = UserDetails.objects.get(id=user_id)
-            
-            # Fetch general data
-            open_issues_count = Issue.objects.filter(status='Open', reported_by_id=user).count()
-            resolved_issues_count = Issue.objects.filter(status='Resolved', reported_by_id=user).count()
-            all_notifications = SiteNotification.objects.all().order_by('-id')[:10]
-
-            # Calculate stats based on RECENT 5 issues
-            recent_issues_queryset = Issue.objects.filter(reported_by_id=user).order_by('-reported_date')[:5]
-            recent_issues = list(recent_issues_queryset)
-            total_recent = len(recent_issues)
-
-            if total_recent > 0:
-                recent_open_count = sum(1 for i in recent_issues if i.status == 'Open')
-                recent_resolved_count = sum(1 for i in recent_issues if i.status == 'Resolved')
-                recent_in_review_count = sum(1 for i in recent_issues if i.status == 'In Review')
-
-                open_pct = max(int((recent_open_count / total_recent) * 100), 1) if recent_open_count > 0 else 0
-                resolved_pct = max(int((recent_resolved_count / total_recent) * 100), 1) if recent_resolved_count > 0 else 0
-                in_review_pct = max(int((recent_in_review_count / total_recent) * 100), 1) if recent_in_review_count > 0 else 0
-            else:
-                recent_open_count = recent_resolved_count = recent_in_review_count = 0
-                open_pct = resolved_pct = in_review_pct = 0
-
-            context = {
-                'user_full_name': user.full_name or user.email,
-                'user_object': user,
-                'open_issues_count': open_issues_count,
-                'resolved_issues_count': resolved_issues_count,
-                'recent_issues': recent_issues, 
-                'card_open_count': recent_open_count,
-                'card_resolved_count': recent_resolved_count,
-                'card_pending_count': recent_in_review_count,
-                'card_open_pct': open_pct,
-                'card_resolved_pct': resolved_pct,
-                'card_pending_pct': in_review_pct,
-                'notifications': all_notifications,
-            }
-            return render(request, 'home.html', context)
-        except UserDetails.DoesNotExist:
-            return redirect('login')
-    return redirect('login')
+    user = request.resident
+    if not user:
+        return redirect('login')
+
+    # Totals come from the denormalized counters row (app/stats.py)
+    user_stats = stats.for_user(user)
+    unread_notifications = notifications.unread_count(user.id)
+
+    # The notification panel and the recent-issues cards/table are cached
+    # as rendered HTML until a signal bumps their stamps (app/fragments.py).
+    # The panel is the same for everyone; what this resident has read is the
+    # unread badge above, rendered per request from their NotificationCursor
+    notification_panel = fragments.cached(
+        'notification_panel', [fragments.NOTIFICATIONS],
+        _render_notification_panel,
+        timeout=settings.FRAGMENT_NOTIFICATIONS_TIMEOUT,
+    )
+    recent_issues_html = fragments.cached(
+        'recent_issues', [fragments.user_issues_scope(user.id)],
+        lambda: _render_recent_issues(request, user), vary=[user.id],
+    )
+
+    context = {
+        'user_full_name': user.full_name or user.email,
+        'user_object': user,
+        'open_issues_count': user_stats.open_count,
+        'in_review_issues_count': user_stats.in_review_count,
+        'resolved_issues_count': user_stats.resolved_count,
+        'recent_issues_html': recent_issues_html,
+        'notification_panel': notification_panel,
+        'unread_notifications': unread_notifications,
+        'notifications_poll_ms': settings.NOTIFICATION_POLL_SECONDS * 1000,
+    }
+    return render(request, 'home.html', context)
 
 def request_vote(request, solution_id):
     solution = get_object_or_404(Solution, id=solution_id)
-    user_id = request.session.get('user_id')
-    user = get_object_or_404(UserDetails, id=user_id)
+    user = request.resident
+    if not user:
+        return redirect('login')
 
     # 1. Safety check: Only creator can request, and only if not already resolved
     if solution.issue.reported_by_id != user or solution.issue.status == 'Resolved':
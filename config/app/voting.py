@@ -0,0 +1,106 @@
+"""
+Vote engine for vote_solution.
+
+All checks and writes for one vote happen in a single transaction with the
+solution row locked (select_for_update; SQLite serialises writers anyway):
+
+  * the Vote insert relies on the unique (solution, voter) constraint, so
+    two racing requests from the same resident cannot both count;
+  * counters move with F() expressions, never read-modify-write in Python;
+  * auto-acceptance is a conditional UPDATE ... WHERE upvotes >= threshold
+    AND status != 'Accepted', so exactly one vote resolves the issue.
+
+The number of queries per vote does not depend on how many votes exist.
+"""
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import fragments, realtime
+from .models import Solution, Vote
+
+VoteResult = namedtuple('VoteResult', 'status issue_id upvotes downvotes accepted')
+
+# status values
+RECORDED = 'recorded'
+DUPLICATE = 'duplicate'
+NOT_ALLOWED = 'not_allowed'
+INVALID = 'invalid'
+
+VOTE_FIELDS = {'upvote': 'upvotes', 'downvote': 'downvotes'}
+
+
+def cast_vote(solution_id, user, vote_type, retries=3):
+    """
+    Record `user`'s vote on a solution. Raises Solution.DoesNotExist for an
+    unknown id. Retries a few times if the database is briefly locked.
+    """
+    for attempt in range(retries):
+        try:
+            result = _cast_vote(solution_id, user, vote_type)
+            break
+        except OperationalError:
+            if attempt == retries - 1:
+                raise
+            time.sleep(0.05 * (attempt + 1))
+    if result.status == RECORDED:
+        # Live score updates for anyone viewing the issue (app/realtime.py)
+        transaction.on_commit(lambda: realtime.publish(realtime.issue_topic(result.issue_id), 'vote', {
+            'solution_id': solution_id,
+            'upvotes': result.upvotes,
+            'downvotes': result.downvotes,
+            'accepted': result.accepted,
+        }))
+    return result
+
+
+def _cast_vote(solution_id, user, vote_type):
+    with transaction.atomic():
+        solution = Solution.objects.select_for_update().select_related('issue').get(id=solution_id)
+        issue = solution.issue
+
+        if vote_type not in VOTE_FIELDS:
+            return _result(INVALID, solution)
+        # RULE 1: the issue creator, RULE 3: the solution's author, and nobody
+        # before the creator asked for votes (or after the issue is resolved)
+        if (issue.reported_by_id_id == user.id
+                or solution.suggested_by_id == user.id
+                or not solution.is_voting_enabled
+                or issue.status == 'Resolved'):
+            return _result(NOT_ALLOWED, solution)
+
+        # RULE 2: one vote per resident, enforced by the unique constraint
+        try:
+            with transaction.atomic():
+                Vote.objects.create(solution=solution, voter=user, vote_type=vote_type)
+        except IntegrityError:
+            return _result(DUPLICATE, solution)
+
+        field = VOTE_FIELDS[vote_type]
+        Solution.objects.filter(id=solution.id).update(**{field: F(field) + 1}, updated_at=timezone.now())
+        # The issue's solution list shows the counts. Bumped here, where the
+        # locked solution already holds the issue id, rather than by a Vote signal
+        fragments.bump(fragments.issue_scope(issue.id))
+
+        accepted = False
+        if vote_type == 'upvote':
+            # Auto-resolve: only the vote that crosses the threshold flips the status
+            accepted = bool(Solution.objects.filter(
+                id=solution.id, upvotes__gte=settings.VOTE_ACCEPT_THRESHOLD,
+            ).exclude(status='Accepted').update(status='Accepted', updated_at=timezone.now()))
+            if accepted:
+                issue.status = 'Resolved'
+                issue.save(update_fields=['status'])
+                # Its notifications drop out of the feed by themselves (app/notifications.py)
+
+        counts = Solution.objects.filter(id=solution.id).values('upvotes', 'downvotes').get()
+        return VoteResult(RECORDED, issue.id, counts['upvotes'], counts['downvotes'], accepted)
+
+
+def _result(status, solution):
+    return VoteResult(status, solution.issue_id, solution.upvotes, solution.downvotes, False)
+
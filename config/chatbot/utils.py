@@ -1,8 +1,171 @@
-def simple_chatbot_view(message):
-    msg = message.lower()
-    if(msg == "hello"):
-        return "Hello! How can I assist you today?"
-    elif "notification" in msg:
-        return "You have 3 new notifications."
-    else:
-        return "I'm sorry, I didn't understand that. Can you please rephrase?"
\ No newline at end of file
+"""
+Local intent router for the chat widget.
+
+A message is matched against precompiled patterns (INTENTS, tried in
+order). A match is answered straight from the database: the status of an
+issue by number, the resident's own issues and counters, the notification
+feed. Greetings and "what can you do" are answered locally too. Only
+messages that match nothing are left to the LLM (chat_api / chat_stream in
+app/views.py).
+
+Counted in app.metrics: chatbot.intent.<name> for each local answer,
+chatbot.llm for messages handed to the model, chatbot.unmatched for the
+ones the /chatbot/ page could not answer, and chatbot.route_seconds.
+"""
+import re
+import time
+from collections import namedtuple
+
+from app import metrics, notifications, stats
+from app.models import Issue
+
+Reply = namedtuple('Reply', 'intent text')
+
+LIST_LIMIT = 3  # Issues or notifications quoted in one answer
+LOGIN_FIRST = "Please log in first, then I can look that up for you."
+NOT_UNDERSTOOD = "I'm sorry, I didn't understand that. Can you please rephrase?"
+HELP = ("I can tell you the status of an issue (\"status of issue 12\"), how your own issues "
+        "are doing (\"my open issues\", \"any update on my issue?\") and what's new in your "
+        "notifications. Anything else, just ask.")
+OFFLINE = ("I can't take open questions right now, but I can still tell you the status of an issue "
+           "(\"status of issue 12\"), how your own issues are doing (\"my open issues\") and what's new "
+           "in your notifications.")
+
+ISSUE_WORDS = r'(?:issue|complaint|request|ticket)'
+
+
+class Intent:
+    def __init__(self, name, patterns, handler, needs_resident=True):
+        self.name = name
+        self.patterns = [re.compile(pattern) for pattern in patterns]
+        self.handler = handler
+        self.needs_resident = needs_resident
+
+    def match(self, text):
+        for pattern in self.patterns:
+            found = pattern.search(text)
+            if found:
+                return found
+        return None
+
+
+def _normalize(message):
+    return ' '.join((message or '').lower().replace('’', "'").split())
+
+
+def _issue_line(issue):
+    return f"#{issue.id} '{issue.title}' ({issue.status})"
+
+
+def _plural(count, word):
+    return f"{count} {word}{'' if count == 1 else 's'}"
+
+
+# Handlers: (resident, match) -> reply text
+
+def _describe(issue_id):
+    issue = Issue.objects.filter(id=issue_id).only('id', 'title', 'status', 'reported_date').first()
+    if issue is None:
+        return f"I can't find issue #{issue_id}."
+    solutions = issue.solutions.count()
+    return (f"Issue #{issue.id} '{issue.title}' is {issue.status}. It was reported on "
+            f"{issue.reported_date:%b %d, %Y} and has {_plural(solutions, 'suggested solution')}.")
+
+
+def issue_status(resident, match):
+    return _describe(int(match.group('id')))
+
+
+def my_latest_issue(resident, match):
+    issue_id = (Issue.objects.filter(reported_by_id=resident).order_by('-reported_date', '-id')
+                .values_list('id', flat=True).first())
+    if issue_id is None:
+        return "You haven't reported any issues yet."
+    return _describe(issue_id)
+
+
+def my_issues(resident, match):
+    counts = stats.for_user(resident)
+    unresolved = list(Issue.objects.filter(reported_by_id=resident, status__in=['Open', 'In Review'])
+                      .only('id', 'title', 'status').order_by('-reported_date', '-id')[:LIST_LIMIT])
+    answer = (f"You have {_plural(counts.open_count, 'open issue')} and {counts.in_review_count} in review "
+              f"({counts.resolved_count} resolved).")
+    if unresolved:
+        answer += " Latest: " + ", ".join(_issue_line(issue) for issue in unresolved) + "."
+    return answer
+
+
+def notification_summary(resident, match):
+    unread = notifications.unread_count(resident.id)
+    latest = notifications.latest(LIST_LIMIT)
+    count = f"{notifications.UNREAD_CAP}+" if unread > notifications.UNREAD_CAP else str(unread)
+    answer = f"You have {count} unread notification{'' if unread == 1 else 's'}."
+    if latest:
+        answer += " Latest: " + "; ".join(f"{note.title}: {note.message}" for note in latest)
+    return answer
+
+
+def canned(text):
+    return lambda resident, match: text
+
+
+# Tried in order: a message about issue 12 that also says "hello" is a status question
+INTENTS = [
+    Intent('issue_status', [
+        rf'\b{ISSUE_WORDS}\s*(?:no\.?|number)?\s*#?\s*(?P<id>\d+)\b',
+        r'(?:^|\s)#(?P<id>\d+)\b',
+    ], issue_status),
+    Intent('my_latest_issue', [
+        rf"\b(?:status|update|updates|progress|news)\b.*\bmy (?:last |latest |recent |newest )?{ISSUE_WORDS}\b",
+        rf"\bmy (?:last|latest|recent|newest) {ISSUE_WORDS}\b",
+        rf"\b(?:has|is) my {ISSUE_WORDS} (?:been )?(?:fixed|resolved|done|sorted)\b",
+    ], my_latest_issue),
+    Intent('my_issues', [
+        rf"\bmy (?:open |pending |unresolved |active )?{ISSUE_WORDS}s\b",
+        rf"\b{ISSUE_WORDS}s (?:i|i've|i have) (?:reported|raised|opened|filed|logged)\b",
+        rf"\bhow many (?:open |pending )?{ISSUE_WORDS}s\b",
+    ], my_issues),
+    Intent('notifications', [
+        r"\bnotifications?\b",
+        r"\b(?:what's|whats|what is|anything) new\b",
+        r"\bany (?:news|updates|alerts)\b",
+    ], notification_summary),
+    Intent('help', [
+        r"^(?:help|what can you do|what do you do|how does this work)\b",
+    ], canned(HELP), needs_resident=False),
+    Intent('greeting', [
+        r"^(?:hi|hello|hey|hiya|good (?:morning|afternoon|evening))(?: there)?[\s!.,]*$",
+    ], canned("Hello! How can I assist you today?"), needs_resident=False),
+    Intent('thanks', [
+        r"^(?:thanks|thank you|thx|cheers)(?: (?:a lot|so much|very much))?[\s!.,]*$",
+    ], canned("You're welcome!"), needs_resident=False),
+]
+
+
+def route_message(message, resident=None):
+    """
+    Reply(intent, text) for the first intent `message` matches, answered
+    from the database; None when it is open-ended and should go to the LLM.
+    """
+    started = time.perf_counter()
+    text = _normalize(message)
+    try:
+        for intent in INTENTS:
+            match = intent.match(text)
+            if match is None:
+                continue
+            metrics.incr(f'chatbot.intent.{intent.name}')
+            if intent.needs_resident and not resident:
+                return Reply(intent.name, LOGIN_FIRST)
+            return Reply(intent.name, intent.handler(resident, match))
+        return None
+    finally:
+        metrics.observe('chatbot.route_seconds', time.perf_counter() - started)
+
+
+def simple_chatbot_view(message, resident=None):
+    reply = route_message(message, resident)
+    if reply is None:
+        metrics.incr('chatbot.unmatched')
+        return NOT_UNDERSTOOD
+    return reply.text
@@ -3,6 +3,11 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve with an ASGI server (e.g. `uvicorn config.asgi:application`) for the
+streaming chat endpoint (chat_api/stream/) to send tokens as they arrive and
+to be told when a client disconnects, and for the realtime events stream
+(events/, see app/realtime.py) that pushes notifications and vote counts.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -18,6 +18,99 @@ from dotenv import load_dotenv
 load_dotenv()
 OPEN_API_KEY = os.getenv('OPEN_API_KEY')
 
+# AI / OpenAI
+# AI_CLIENT = 'fake' swaps in app.llm.FakeOpenAI (no network, canned replies)
+AI_CLIENT = os.getenv('AI_CLIENT', 'openai')
+AI_FAKE_LATENCY = float(os.getenv('AI_FAKE_LATENCY', '0'))
+AI_MODEL = os.getenv('AI_MODEL', 'gpt-4o-mini')
+AI_BASE_URL = os.getenv('AI_BASE_URL') or None  # None = api.openai.com; set for a proxy or local fake
+
+# Solution generation (app/generation.py)
+AI_SOLUTIONS_PER_ISSUE = 3  # Ranked suggestions asked for per issue
+AI_GENERATION_BATCH_SIZE = 5  # Issues per prompt; queued AI jobs are folded together up to this
+
+# Stream chat replies as server-sent events (chat_api/stream/); only streams under ASGI
+CHAT_STREAMING_ENABLED = True
+
+# Chat memory (app/chat.py): a resident's prompt carries a rolling summary plus
+# the newest turns that fit the token budget
+CHAT_CONTEXT_TOKENS = 1500  # Whole prompt: system prompt, summary, recent turns and the new message
+CHAT_HISTORY_TURNS = 8  # Newest turns (messages or replies) that may be sent verbatim
+CHAT_COMPACT_BATCH_TURNS = 6  # Turns past the window before they are folded into the summary
+CHAT_SUMMARY_TOKENS = 250  # Length cap on the summary
+CHAT_SESSION_IDLE_SECONDS = 6 * 60 * 60  # After this long without a message, start a new conversation
+# 'job' = compacted by `manage.py run_jobs`, 'sync' = inline in the request, 'off' = never
+CHAT_COMPACTION_MODE = os.getenv('CHAT_COMPACTION_MODE', 'job')
+
+# Rate limits and daily spend budget for OpenAI calls (app/ratelimit.py)
+# Token buckets per resident (or IP when signed out): (burst, refills per minute)
+RATE_LIMITS = {
+    'chat': (10, 6),  # chat_api / chat_stream messages that go to the LLM
+    'issue_ai': (30, 10),  # Issue page views that may queue an AI suggestion
+    'ai_suggest': (5, 2),  # New issues handed to the AI dispatcher
+}
+RATE_LIMIT_BACKEND = 'cache'  # 'cache' (shared through CACHES) or 'local' (this process only)
+# Once either is spent (UTC day) chat falls back to the local router and no AI
+# suggestions are queued; 0 switches a limit off
+AI_DAILY_TOKEN_BUDGET = int(os.getenv('AI_DAILY_TOKEN_BUDGET', '2000000'))
+AI_DAILY_COST_BUDGET = float(os.getenv('AI_DAILY_COST_BUDGET', '5'))  # USD
+AI_PRICE_PER_MILLION = {'prompt': 0.15, 'completion': 0.60}  # USD per million tokens of AI_MODEL
+
+# Background jobs (app/jobs.py, run with `python manage.py run_jobs`)
+JOB_MAX_ATTEMPTS = 5
+JOB_BACKOFF_BASE_SECONDS = 5
+JOB_BACKOFF_MAX_SECONDS = 300
+JOB_STALE_SECONDS = 600  # A running job older than this is assumed orphaned
+JOB_RETRY_COOLDOWN_SECONDS = 900  # Wait before re-queuing a job that gave up
+
+# AI post_save hook dispatcher (app/dispatcher.py)
+# 'thread' = in-process thread pool, 'async' = AsyncOpenAI on an event-loop thread,
+# 'sync' = inline (handy in scripts), 'off' = disabled
+AI_DISPATCH_MODE = os.getenv('AI_DISPATCH_MODE', 'thread')
+AI_DISPATCH_MAX_CONCURRENCY = 2  # Max simultaneous OpenAI calls per process
+AI_DISPATCH_BATCH_SIZE = 5  # Issues folded into one prompt
+AI_DISPATCH_BATCH_WINDOW = 0.5  # Seconds to wait for more issues before sending a batch
+AI_DISPATCH_MAX_QUEUE = 500  # Beyond this, issues go to the BackgroundJob queue
+
+# Upvotes at which a solution is accepted and its issue resolved (app/voting.py)
+VOTE_ACCEPT_THRESHOLD = 5
+
+# LLM response cache (app/llm_cache.py, managed with `python manage.py llm_cache`)
+LLM_CACHE_ENABLED = True
+LLM_CACHE_TTL_SECONDS = 60 * 60 * 24 * 30
+LLM_CACHE_MAX_ENTRIES = 5000
+
+# Issue search and board (app/search.py)
+SEARCH_PAGE_SIZE = 20
+SEARCH_RANK_WINDOW = 500  # 'relevance' ranks the newest N matches; 'recent' pages through all of them
+
+# Similar resolved issues (app/similarity.py)
+SIMILARITY_DIM = 1024  # Hashed feature buckets per issue vector
+SIMILARITY_MIN_SCORE = 0.35  # Cosine score to show as "similar"
+SIMILARITY_REUSE_THRESHOLD = 0.9  # Cosine score to reuse an accepted answer instead of calling OpenAI
+SIMILARITY_REFRESH_SECONDS = 300  # Full rebuild interval, picks up other processes' writes
+
+# How often the dashboard asks /notifications/?after=<cursor> for new notifications
+NOTIFICATION_POLL_SECONDS = 15
+
+# Realtime push (app/realtime.py): /events/ streams new notifications and vote
+# counts to the browser under ASGI; pages fall back to polling without it.
+# InProcessBroker only reaches streams in its own process (one ASGI worker);
+# DatabaseBroker reaches every worker through the database, and is what
+# gunicorn.conf.py picks when it runs more than one.
+REALTIME_ENABLED = True
+REALTIME_BROKER = os.getenv('REALTIME_BROKER', 'app.realtime.InProcessBroker')
+REALTIME_QUEUE_SIZE = 100  # Messages buffered per stream before it is told to resync
+REALTIME_HEARTBEAT_SECONDS = 20
+REALTIME_POLL_SECONDS = 0.5  # DatabaseBroker: how often each worker reads new messages
+REALTIME_RETENTION_SECONDS = 300  # DatabaseBroker: how long messages are kept
+
+# Upload pipeline (app/images.py): EXIF-stripped, content-hashed originals plus
+# per-slot AVIF/WebP/JPEG renditions. 'job' = built by `manage.py run_jobs`,
+# 'sync' = inline in the request, 'off' = serve uploads as they are
+IMAGE_PIPELINE_MODE = os.getenv('IMAGE_PIPELINE_MODE', 'job')
+IMAGE_VARIANT_FORMATS = ['avif', 'webp', 'jpeg']  # Formats Pillow cannot write are skipped
+
 
 
 
@@ -29,6 +122,12 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# How /media/ is served (app/media.py): 'django' (FileResponse with ETag and
+# ranges), 'x-sendfile' (Apache/lighttpd), 'x-accel-redirect' (nginx, via
+# MEDIA_ACCEL_REDIRECT_PREFIX) or 'off' (the web server maps MEDIA_URL itself)
+MEDIA_SERVE_MODE = os.getenv('MEDIA_SERVE_MODE', 'django')
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+MEDIA_CACHE_SECONDS = 60 * 60  # Uploads other than the immutable variants/
 
 
 # Quick-start development settings - unsuitable for production
@@ -40,6 +139,9 @@ SECRET_KEY = 'django-insecure-+9!l%7f3*j^8&1^p&zh@)!n8lv-9srr&ucqt=n3v!rtidq!ndd
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+# Expose app.metrics at /metrics/
+METRICS_ENABLED = DEBUG
+
 ALLOWED_HOSTS = []
 
 
@@ -52,6 +154,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'rest_framework',
     'app',
 ]
 
@@ -61,6 +164,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'app.middleware.ResidentMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -83,22 +187,150 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
+
+# Deployment profiles (see gunicorn.conf.py next to manage.py)
+#
+#   ASGI (recommended): the I/O-bound views (chat_api, chat_stream,
+#   issue_details_view) are async and wait on OpenAI without holding a worker.
+#       GUNICORN_PROFILE=asgi gunicorn config.asgi:application
+#     i.e. gunicorn -k uvicorn.workers.UvicornWorker -w <cores>, or for a
+#     single process: uvicorn config.asgi:application --workers <cores>
+#     (with DJANGO_CACHE=file: uvicorn does not read gunicorn.conf.py)
+#
+#   WSGI (legacy): sync workers, one request per worker at a time; async views
+#   still work but each OpenAI call pins the worker and SSE is buffered.
+#       GUNICORN_PROFILE=wsgi gunicorn config.wsgi:application
+#
+# `python manage.py bench_async` compares the two under a fake, slow LLM.
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DJANGO_DB=sqlite (default) or postgres. Compare them with `manage.py load_db_writes`.
+DB_PROFILE = os.getenv('DJANGO_DB', 'sqlite')
+
+# SQLite tuned for several workers writing at once: WAL lets readers run
+# alongside the single writer, busy_timeout makes a writer wait for the lock
+# instead of failing with "database is locked", synchronous=NORMAL is safe
+# under WAL and skips an fsync per commit, and mmap serves reads from the page
+# cache. IMMEDIATE transactions take the write lock up front, so an atomic()
+# block that reads then writes never deadlocks on the lock upgrade.
+SQLITE_PRAGMAS = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA mmap_size=134217728',
+    'PRAGMA temp_store=MEMORY',
+]
+
+if DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'residential'),
+            'USER': os.getenv('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+            'PORT': os.getenv('POSTGRES_PORT', '5432'),
+            # psycopg's pool (pip install "psycopg[pool]") shared by the threads
+            # of a worker; Django requires CONN_MAX_AGE=0 alongside it
+            'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': 2,
+                    'max_size': int(os.getenv('POSTGRES_POOL_SIZE', '10')),
+                    'timeout': 10,
+                },
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            # Connections opened by async requests are never closed, so the
+            # default (ASGI) keeps none open. Sync workers can reuse one across
+            # requests (health-checked before reuse) instead of reopening and
+            # re-running the pragmas: gunicorn.conf.py sets DB_CONN_MAX_AGE=60
+            # for its wsgi profile
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '0')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'init_command': '; '.join(SQLITE_PRAGMAS),
+                'transaction_mode': 'IMMEDIATE',
+            },
+            # `manage.py test` and the benchmark commands use a file rather than
+            # memory, so their threads get separate connections as workers do
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
+    }
+
+# DJANGO_CACHE=locmem (default, per process) or file (shared by every process on
+# this host; use it, or memcached/redis, with more than one worker).
+# gunicorn.conf.py picks file for itself whenever it runs more than one worker
+if os.getenv('DJANGO_CACHE', 'locmem') == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('DJANGO_CACHE_DIR', BASE_DIR / 'cache'),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
     }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Rendered fragments (app/fragments.py), invalidated by version stamps
+FRAGMENT_CACHE_ENABLED = True
+FRAGMENT_CACHE_TIMEOUT = 600
+FRAGMENT_NOTIFICATIONS_TIMEOUT = 60  # The panel shows relative times ("5 mins ago")
+
+# Manager analytics (app/analytics.py, /analytics/): open to staff users and
+# residents with one of these roles; the summary is recomputed at most this often
+ANALYTICS_ROLES = ['manager']
+ANALYTICS_CACHE_SECONDS = 300
+
+# JSON API for the mobile client (app/api.py, /api/v1/): session sign-in,
+# cursor pages, ?fields= and ETag/Last-Modified from updated_at. Authentication,
+# permissions and pagination are set on the views, not here (see app.api.BaseViewSet)
+REST_FRAMEWORK = {
+    'UNAUTHENTICATED_USER': None,
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+    'DEFAULT_VERSIONING_CLASS': 'rest_framework.versioning.URLPathVersioning',
+    'ALLOWED_VERSIONS': ['v1'],
 }
 
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
+# Residents log in through app.auth.ResidentBackend; ModelBackend serves the admin
+AUTHENTICATION_BACKENDS = [
+    'django.contrib.auth.backends.ModelBackend',
+    'app.auth.ResidentBackend',
+]
+
+# Stored hashes on another algorithm or iteration count are upgraded on login
+PASSWORD_HASHERS = [
+    'app.auth.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', '1000000'))
+
+# How long request.resident may be served from the cache (app/auth.py)
+RESIDENT_CACHE_SECONDS = 60
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -14,11 +14,12 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include   
-from app import views
+from django.urls import path, include, re_path
+from app import media, views
 from django.conf import settings
-from django.conf.urls.static import static
 
 urlpatterns = [
     path('', views.signup, name='signup'),
@@ -27,15 +28,27 @@ urlpatterns = [
     path('logout/', views.logout, name='logout'),
     path('home/', views.home, name='home'),
     path('report-issue/', views.reportIssue, name='report-issue'),
+    path('issues/', views.issue_board, name='issue_board'),
+    path('issues/search/', views.issue_search_api, name='issue_search'),
+    path('issues/similar/', views.similar_issues_api, name='similar_issues'),
+    path('notifications/', views.notifications_api, name='notifications'),
+    path('notifications/seen/', views.notifications_seen, name='notifications_seen'),
+    path('events/', views.events, name='events'),
     path('issue/<str:issue_id>/', views.issue_details_view, name='issue_details'),
     path('issue/<str:issue_id>/suggest-solution/', views.suggest_solution, name='suggest_solution'),
     path('solution/<int:solution_id>/vote/<str:vote_type>/', views.vote_solution, name='vote_solution'),
     path('solution/<int:solution_id>/request-vote/', views.request_vote, name='request_vote'),
     path("chatbot/", views.chatbot, name='chatbot'),  # Include chatbot app URLs
     path('chat_api/', views.chat_api, name='chat_api'),
+    path('chat_api/stream/', views.chat_stream, name='chat_stream'),
+    path('analytics/', views.analytics_api, name='analytics'),
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('api/', include('app.api')),
     path('admin/', admin.site.urls),
 ]
 
-# Only add this during development (DEBUG=True in settings.py)
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Uploads, with ETag/range support or handed to the web server (app/media.py)
+if settings.MEDIA_SERVE_MODE != 'off':
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), media.serve, name='media'),
+    ]
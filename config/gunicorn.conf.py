@@ -0,0 +1,58 @@
+"""
+Gunicorn settings. Pick a profile with GUNICORN_PROFILE (default 'asgi'):
+
+    GUNICORN_PROFILE=asgi gunicorn config.asgi:application
+    GUNICORN_PROFILE=wsgi gunicorn config.wsgi:application
+
+See the deployment notes in config/settings.py.
+"""
+import multiprocessing
+import os
+
+profile = os.getenv('GUNICORN_PROFILE', 'asgi')
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+if profile == 'asgi':
+    # One uvicorn event loop per core; each serves many concurrent requests
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+    # Async requests never close persistent connections (config/settings.py)
+    os.environ.setdefault('DB_CONN_MAX_AGE', '0')
+    # Streaming chat responses can stay open for the whole generation
+    timeout = 120
+    keepalive = 5
+else:
+    # Sync workers: concurrency == workers * threads, each blocked for the
+    # full length of any OpenAI call
+    worker_class = 'gthread'
+    workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+    threads = int(os.getenv('GUNICORN_THREADS', 4))
+    timeout = 60
+    # Each thread keeps its SQLite connection between requests
+    os.environ.setdefault('DB_CONN_MAX_AGE', '60')
+
+# /events/ streams (app/realtime.py): InProcessBroker only reaches the streams
+# of its own worker, so several ASGI workers default to DatabaseBroker. Asked
+# for explicitly, InProcessBroker gets a single worker.
+startup_warnings = []
+if profile == 'asgi' and workers > 1:
+    broker = os.environ.setdefault('REALTIME_BROKER', 'app.realtime.DatabaseBroker')
+    if broker.endswith('.InProcessBroker'):
+        startup_warnings.append(f"REALTIME_BROKER={broker} only reaches one worker's streams: "
+                                f"running 1 worker instead of {workers}")
+        workers = 1
+
+# Fragment stamps (app/fragments.py) and rate-limit buckets live in the Django
+# cache. locmem would give each worker its own, and a write in one worker
+# would leave the others serving stale fragments, so several workers default
+# to the file cache. Workers load the settings after the fork and inherit this.
+if workers > 1:
+    os.environ.setdefault('DJANGO_CACHE', 'file')
+
+graceful_timeout = 30
+accesslog = '-'
+
+
+def on_starting(server):
+    for message in startup_warnings:
+        server.log.warning(message)